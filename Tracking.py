@@ -1,11 +1,12 @@
 # Tracker.py
-from ultralytics import YOLO
 from deep_sort_realtime.deepsort_tracker import DeepSort
 import cv2
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 import csv
 import os
+from scipy.optimize import linear_sum_assignment
+from detector_backends import load_detector
 # === CLASS COLORS ===
 CLASS_COLORS = {
     0: (0, 0, 0),         # Ball - BLACK
@@ -14,17 +15,68 @@ CLASS_COLORS = {
     3: (150, 150, 255)    # Referee - Keep original (Light Blue)
 }
 # === YOLO MODEL LOADER ===
-def load_model(model_path):
-    return YOLO(model_path)
+def load_model(model_path, backend="torch", calibration_video=None):
+    # backend: "torch" (ultralytics PyTorch), "onnx" / "openvino" (exported + cached CPU runtimes)
+    # or "onnx-int8" (quantized ONNX, calibrated on frames from calibration_video)
+    return load_detector(model_path, backend=backend, calibration_video=calibration_video)
 # === DEEPSORT TRACKER ===
-def create_tracker(max_age=20, n_init=3, nn_budget=100, max_cosine_distance=0.3):
+TRACKER_BACKENDS = ("deepsort", "bytetrack")
+def create_tracker(max_age=20, n_init=3, nn_budget=100, max_cosine_distance=0.3, backend="deepsort"):
+    # backend: "deepsort" (appearance embedder + IoU) or "bytetrack" (motion-only, no embedder)
+    if backend == "bytetrack":
+        from byte_tracker import ByteTracker
+        return ByteTracker(max_age=max_age, n_init=n_init)
+    if backend != "deepsort":
+        raise ValueError(f"Unknown tracker backend '{backend}', expected one of {TRACKER_BACKENDS}")
     return DeepSort(max_age=max_age, nn_budget=nn_budget, max_cosine_distance=max_cosine_distance)
+def predict_tracks(tracker):
+    # Advance every track one Kalman step without detections or the appearance embedder.
+    # Frames without detections are not match opportunities, so they don't count as misses.
+    if hasattr(tracker, "predict_tracks"):
+        return tracker.predict_tracks()
+    inner = tracker.tracker
+    for track in inner.tracks:
+        track.predict(inner.kf)
+        track.time_since_update -= 1
+    return inner.tracks
 # === UTILITY FUNCTIONS ===
 def get_center_of_bbox(bbox):
     x1, y1, x2, y2 = bbox
     return int((x1 + x2) / 2), int((y1 + y2) / 2)
 def get_bbox_width(bbox):
     return int(bbox[2] - bbox[0])
+def bbox_iou_matrix(a, b):
+    # Pairwise IoU between (N, 4) and (M, 4) xyxy boxes -> (N, M)
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+def match_boxes(track_boxes, det_boxes, min_iou=0.3):
+    # Gated one-to-one assignment of tracks to detections maximizing IoU.
+    # IoU ties are broken by centre distance; pairs below min_iou are never matched.
+    # Returns the matched detection index per track, -1 for unmatched tracks.
+    track_boxes = np.asarray(track_boxes, dtype=np.float32).reshape(-1, 4)
+    det_boxes = np.asarray(det_boxes, dtype=np.float32).reshape(-1, 4)
+    matches = np.full(len(track_boxes), -1, dtype=np.int64)
+    if len(track_boxes) == 0 or len(det_boxes) == 0:
+        return matches
+    iou = bbox_iou_matrix(track_boxes, det_boxes)
+    track_centres = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+    det_centres = (det_boxes[:, :2] + det_boxes[:, 2:]) / 2
+    dist = np.linalg.norm(track_centres[:, None, :] - det_centres[None, :, :], axis=2)
+    cost = (1.0 - iou) + 1e-3 * dist / (1.0 + dist.max())
+    gated = iou < min_iou
+    cost[gated] = 1e6
+    rows, cols = linear_sum_assignment(cost)
+    keep = ~gated[rows, cols]
+    matches[rows[keep]] = cols[keep]
+    return matches
 def draw_ellipse(frame, bbox, color, track_id=None):
     try:
         y2 = int(bbox[3])
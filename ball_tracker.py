@@ -0,0 +1,110 @@
+"""
+Ball sub-pipeline
+Constant-velocity Kalman filter on the ball's image position, shifted by the
+camera movement estimate. While the ball is locked, frames where the full-frame
+detector has no ball (skip frames, or the ball lost in the 640x360 downscale) are
+filled by the prediction; only once it has gone without a measurement for a few
+frames is a native-resolution crop around the predicted position searched. Once the
+ball has been missed for max_lost frames it is unlocked and only full-frame
+detections can re-acquire it.
+"""
+
+import numpy as np
+
+
+class BallTracker:
+    def __init__(self, crop_size=(640, 360), max_lost=10, base_gate_px=40.0,
+                 accel_noise=3.0, measurement_noise=2.0):
+        self.crop_size = crop_size
+        self.max_lost = max_lost
+        self.base_gate_px = base_gate_px
+
+        # State (x, y, vx, vy), one frame per step
+        self.F = np.eye(4)
+        self.F[0, 2] = self.F[1, 3] = 1.0
+        self.H = np.eye(2, 4)
+        g = np.array([[0.5, 0], [0, 0.5], [1, 0], [0, 1]])
+        self.Q = g @ g.T * accel_noise ** 2
+        self.R = np.eye(2) * measurement_noise ** 2
+
+        self.x = None
+        self.P = None
+        self.size = None  # Last measured (w, h), used for predicted boxes
+        self.lost_frames = 0
+
+    @property
+    def locked(self):
+        return self.x is not None and self.lost_frames <= self.max_lost
+
+    def reset(self):
+        self.x = None
+        self.P = None
+        self.size = None
+        self.lost_frames = 0
+
+    def predict(self, camera_movement=(0, 0)):
+        """Advance one frame; returns the predicted (x, y) while locked, else None"""
+        if self.x is None:
+            return None
+        self.x = self.F @ self.x
+        # camera_movement is (old - new) of background features, so the image moves by its negative
+        self.x[0] -= camera_movement[0]
+        self.x[1] -= camera_movement[1]
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        return (float(self.x[0]), float(self.x[1])) if self.locked else None
+
+    def gate_px(self):
+        return self.base_gate_px + 3.0 * float(np.sqrt(self.P[0, 0] + self.P[1, 1]))
+
+    @staticmethod
+    def center(ball):
+        x1, y1, x2, y2 = ball['bbox']
+        return (x1 + x2) * 0.5, (y1 + y2) * 0.5
+
+    def select(self, ball_detections, predicted):
+        """Detection closest to the prediction inside the gate; the most confident one when unlocked"""
+        if not ball_detections:
+            return None
+        if predicted is None:
+            return max(ball_detections, key=lambda ball: ball['conf'])
+        centers = np.array([self.center(ball) for ball in ball_detections])
+        dist = np.hypot(centers[:, 0] - predicted[0], centers[:, 1] - predicted[1])
+        best = int(np.argmin(dist))
+        return ball_detections[best] if dist[best] <= self.gate_px() else None
+
+    def update(self, ball):
+        z = np.array(self.center(ball))
+        x1, y1, x2, y2 = ball['bbox']
+        self.size = (x2 - x1, y2 - y1)
+        if self.x is None or not self.locked:
+            self.x = np.array([z[0], z[1], 0.0, 0.0])
+            self.P = np.diag([self.R[0, 0], self.R[1, 1], 100.0, 100.0])
+        else:
+            S = self.H @ self.P @ self.H.T + self.R
+            K = self.P @ self.H.T @ np.linalg.inv(S)
+            self.x = self.x + K @ (z - self.H @ self.x)
+            self.P = (np.eye(4) - K @ self.H) @ self.P
+        self.lost_frames = 0
+
+    def should_search(self, crop_interval):
+        """Crop search on the crop_interval-th frame without a measurement, and every crop_interval after"""
+        return (self.lost_frames + 1) % max(1, int(crop_interval)) == 0
+
+    def predicted_ball(self):
+        """Box of the last measured size at the current prediction"""
+        w, h = self.size if self.size is not None else (10, 10)
+        x, y = float(self.x[0]), float(self.x[1])
+        return {'bbox': [int(x - w / 2), int(y - h / 2), int(x + w / 2), int(y + h / 2)],
+                'cls': 0, 'conf': 0.0, 'predicted': True}
+
+    def miss(self):
+        if self.x is not None:
+            self.lost_frames += 1
+
+    def crop_roi(self, predicted, frame_shape):
+        """Native-resolution window of crop_size centred on the prediction, kept inside the frame"""
+        h, w = frame_shape[:2]
+        cw, ch = min(self.crop_size[0], w), min(self.crop_size[1], h)
+        x1 = int(np.clip(predicted[0] - cw / 2, 0, w - cw))
+        y1 = int(np.clip(predicted[1] - ch / 2, 0, h - ch))
+        return x1, y1, x1 + cw, y1 + ch
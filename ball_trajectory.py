@@ -0,0 +1,179 @@
+"""
+Ball trajectory reconstruction
+Turns the raw per-frame ball detections in tracks["ball"] into a continuous
+trajectory in pixel and pitch coordinates:
+- detections are split into segments at gaps longer than max_gap_seconds
+- each segment runs a constant-acceleration Kalman filter with innovation gating
+  (outliers are rejected; a run of rejections re-initialises the filter, which
+  is how real kicks get through) followed by a Rauch-Tung-Striebel smoother,
+  which also fills the short gaps inside the segment
+The result is stored as NumPy arrays indexed by frame, so position and velocity
+are O(1) lookups.
+"""
+
+import numpy as np
+
+
+# Chi-square 99% quantile for 2 degrees of freedom
+GATE_CHI2 = 9.21
+
+
+class BallTrajectory:
+    """Frame-indexed ball state; NaN rows are frames without a trajectory"""
+
+    def __init__(self, fps, num_frames):
+        self.fps = fps
+        self.pixel = np.full((num_frames, 2), np.nan, dtype=np.float32)
+        self.pixel_velocity = np.full((num_frames, 2), np.nan, dtype=np.float32)  # px/s
+        self.pitch = np.full((num_frames, 2), np.nan, dtype=np.float32)
+        self.pitch_velocity = np.full((num_frames, 2), np.nan, dtype=np.float32)  # m/s
+        self.measured = np.zeros(num_frames, dtype=bool)  # Accepted detection on this frame
+        self.rejected = np.zeros(num_frames, dtype=bool)  # Detection rejected as an outlier
+
+    def __len__(self):
+        return len(self.pixel)
+
+    def _lookup(self, array, frame_idx):
+        if not 0 <= frame_idx < len(array) or np.isnan(array[frame_idx, 0]):
+            return None
+        return float(array[frame_idx, 0]), float(array[frame_idx, 1])
+
+    def position(self, frame_idx, pitch=True):
+        return self._lookup(self.pitch if pitch else self.pixel, frame_idx)
+
+    def velocity(self, frame_idx, pitch=True):
+        return self._lookup(self.pitch_velocity if pitch else self.pixel_velocity, frame_idx)
+
+    def speed(self, frame_idx, pitch=True):
+        velocity = self.velocity(frame_idx, pitch)
+        return None if velocity is None else float(np.hypot(*velocity))
+
+    def summary(self):
+        valid = ~np.isnan(self.pixel[:, 0])
+        return {
+            "frames": int(valid.sum()),
+            "measured": int(self.measured.sum()),
+            "interpolated": int((valid & ~self.measured).sum()),
+            "rejected": int(self.rejected.sum()),
+        }
+
+
+class BallTrajectoryReconstructor:
+    def __init__(self, fps, max_gap_seconds=0.5, pixel_noise=3.0, pixel_jerk=1.0,
+                 pitch_noise=0.3, pitch_jerk=0.05, max_rejections=3):
+        self.fps = max(1, int(fps))
+        self.max_gap_frames = max(1, int(max_gap_seconds * self.fps))
+        self.pixel_noise = pixel_noise
+        self.pixel_jerk = pixel_jerk  # Process noise, units per frame^3
+        self.pitch_noise = pitch_noise
+        self.pitch_jerk = pitch_jerk
+        self.max_rejections = max_rejections
+
+        # Per-frame constant-acceleration model, shared by the x and y axes
+        self.F = np.array([[1.0, 1.0, 0.5], [0.0, 1.0, 1.0], [0.0, 0.0, 1.0]])
+        self.Q_unit = np.array([[1 / 20, 1 / 8, 1 / 6], [1 / 8, 1 / 3, 1 / 2], [1 / 6, 1 / 2, 1.0]])
+
+    @staticmethod
+    def _measurements(tracks):
+        """Sorted frames with (pixel, pitch) ball positions; pitch is NaN when not transformed"""
+        rows = []
+        for frame_idx, frame_data in tracks.get("ball", {}).items():
+            info = frame_data.get("ball")
+            # Motion-model predictions are not measurements; the smoother fills those frames itself
+            if not info or info.get("position") is None or info.get("predicted"):
+                continue
+            pitch = info.get("position_transformed")
+            rows.append((frame_idx, *info["position"], *(pitch if pitch is not None else (np.nan, np.nan))))
+        rows.sort(key=lambda row: row[0])
+        data = np.array(rows, dtype=np.float64).reshape(-1, 5)
+        return data[:, 0].astype(np.int64), data[:, 1:3], data[:, 3:5]
+
+    def _smooth(self, frames, z, noise, jerk, gate):
+        """
+        Filter + RTS smoother over every frame from frames[0] to frames[-1].
+        Returns (positions (n, 2), velocities per frame (n, 2), accepted (len(frames),)).
+        """
+        n = int(frames[-1] - frames[0]) + 1
+        rows = frames - frames[0]
+        z_full = np.full((n, 2), np.nan)
+        z_full[rows] = z
+        R = noise ** 2
+        Q = self.Q_unit * jerk ** 2
+        P0 = np.diag([R, 25.0 * R, R])
+
+        # State is (3, 2): position / velocity / acceleration for x and y. The covariance
+        # only depends on when measurements arrive, so one (3, 3) matrix serves both axes.
+        x_pred = np.zeros((n, 3, 2))
+        P_pred = np.zeros((n, 3, 3))
+        x_filt = np.zeros((n, 3, 2))
+        P_filt = np.zeros((n, 3, 3))
+        restart = np.zeros(n, dtype=bool)
+        accepted_full = np.zeros(n, dtype=bool)
+
+        x = np.zeros((3, 2))
+        x[0] = z_full[0]
+        P = P0.copy()
+        rejections = 0
+        for t in range(n):
+            if t > 0:
+                x = self.F @ x
+                P = self.F @ P @ self.F.T + Q
+            x_pred[t], P_pred[t] = x, P
+            if not np.isnan(z_full[t, 0]):
+                S = P[0, 0] + R
+                y = z_full[t] - x[0]
+                if t == 0 or float(y @ y) / S <= gate:
+                    K = P[:, 0] / S
+                    x = x + np.outer(K, y)
+                    P = P - np.outer(K, P[0])
+                    rejections = 0
+                    accepted_full[t] = True
+                else:
+                    rejections += 1
+                    if rejections >= self.max_rejections:
+                        # Persistent disagreement is a real change of motion (a kick): restart here
+                        x = np.zeros((3, 2))
+                        x[0] = z_full[t]
+                        P = P0.copy()
+                        restart[t] = True
+                        rejections = 0
+                        accepted_full[t] = True
+            x_filt[t], P_filt[t] = x, P
+
+        x_smooth = x_filt.copy()
+        for t in range(n - 2, -1, -1):
+            if restart[t + 1]:
+                continue
+            C = P_filt[t] @ self.F.T @ np.linalg.inv(P_pred[t + 1])
+            x_smooth[t] = x_filt[t] + C @ (x_smooth[t + 1] - x_pred[t + 1])
+        return x_smooth[:, 0], x_smooth[:, 1], accepted_full[rows]
+
+    def build(self, tracks, num_frames=None):
+        frames, pixel, pitch = self._measurements(tracks)
+        if num_frames is None:
+            num_frames = int(frames[-1]) + 1 if len(frames) else 0
+        trajectory = BallTrajectory(self.fps, num_frames)
+        if len(frames) == 0:
+            return trajectory
+
+        breaks = np.flatnonzero(np.diff(frames) > self.max_gap_frames + 1) + 1
+        for seg in np.split(np.arange(len(frames)), breaks):
+            seg_frames = frames[seg]
+            if seg_frames[-1] >= num_frames:
+                continue
+            span = slice(int(seg_frames[0]), int(seg_frames[-1]) + 1)
+            pos, vel, accepted = self._smooth(seg_frames, pixel[seg], self.pixel_noise, self.pixel_jerk, GATE_CHI2)
+            trajectory.pixel[span] = pos
+            trajectory.pixel_velocity[span] = vel * self.fps if len(seg) > 1 else np.nan
+            trajectory.measured[seg_frames[accepted]] = True
+            trajectory.rejected[seg_frames[~accepted]] = True
+
+            # Pitch pass reuses the pixel-space outlier decisions
+            keep = accepted & ~np.isnan(pitch[seg, 0])
+            if keep.any():
+                kept = seg_frames[keep]
+                pos, vel, _ = self._smooth(kept, pitch[seg][keep], self.pitch_noise, self.pitch_jerk, np.inf)
+                pitch_span = slice(int(kept[0]), int(kept[-1]) + 1)
+                trajectory.pitch[pitch_span] = pos
+                trajectory.pitch_velocity[pitch_span] = vel * self.fps if len(kept) > 1 else np.nan
+        return trajectory
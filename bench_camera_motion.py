@@ -0,0 +1,135 @@
+"""
+Camera motion benchmark
+Compares the previous per-point Python loop (largest single displacement wins)
+with the vectorized RANSAC partial-affine FrameMotionEstimator: per-frame cost
+and, on the synthetic sequence where the true pan/zoom is known, accuracy.
+The new estimator is an accuracy/robustness change; its per-frame cost is on a
+par with the legacy loop (ratio around x1.0, run-to-run noise is +-20%).
+
+Usage:
+    python bench_camera_motion.py                      # synthetic pan + zoom with moving players
+    python bench_camera_motion.py --video match.mp4 --frames 500
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from camera_movement_estimator import FrameMotionEstimator
+
+
+def legacy_camera_movement(frames):
+    """The previous OptimizedTrackingProcessor.estimate_camera_movement loop"""
+    lk_params = dict(winSize=(15, 15), maxLevel=2,
+                     criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+    old_gray = cv2.cvtColor(frames[0], cv2.COLOR_BGR2GRAY)
+    mask = np.zeros_like(old_gray)
+    mask[:, 0:20] = 1
+    mask[:, -20:] = 1
+    old_features = cv2.goodFeaturesToTrack(old_gray, maxCorners=100, qualityLevel=0.3,
+                                           minDistance=3, blockSize=7, mask=mask)
+    movements = [(0.0, 0.0)]
+    for frame in frames[1:]:
+        frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        camera_dx, camera_dy = 0, 0
+        if old_features is not None and len(old_features) > 0:
+            new_features, _, _ = cv2.calcOpticalFlowPyrLK(old_gray, frame_gray, old_features, None, **lk_params)
+            max_distance = 0
+            for new, old in zip(new_features, old_features):
+                new_pt, old_pt = new.ravel(), old.ravel()
+                distance = np.sqrt((new_pt[0] - old_pt[0]) ** 2 + (new_pt[1] - old_pt[1]) ** 2)
+                if distance > max_distance:
+                    max_distance = distance
+                    camera_dx, camera_dy = old_pt[0] - new_pt[0], old_pt[1] - new_pt[1]
+            if max_distance > 5:
+                mask = np.zeros_like(frame_gray)
+                mask[:, 0:20] = 1
+                mask[:, -20:] = 1
+                old_features = cv2.goodFeaturesToTrack(frame_gray, maxCorners=100, qualityLevel=0.3,
+                                                       minDistance=3, blockSize=7, mask=mask)
+        old_gray = frame_gray
+        movements.append((float(camera_dx), float(camera_dy)))
+    return np.array(movements)
+
+
+def vectorized_camera_movement(frames):
+    estimator = FrameMotionEstimator(frames[0].shape)
+    estimator.reset(frames[0])
+    motions = [estimator.update(frame) for frame in frames[1:]]
+    return np.array([(0.0, 0.0)] + [(m.dx, m.dy) for m in motions]), np.array([1.0] + [m.scale for m in motions])
+
+
+def synthetic_frames(num_frames, size=(1280, 720), seed=0):
+    """Textured background under a known pan / slow zoom, with players crossing the edge strips"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    background = cv2.GaussianBlur(rng.integers(0, 255, (h * 2, w * 2, 3), dtype=np.uint8), (0, 0), 3)
+    frames, truth, scales = [], [(0.0, 0.0)], [1.0]
+    cx, cy, zoom = w * 0.5, h * 0.5, 1.0
+    for i in range(num_frames):
+        if i > 0:
+            step = np.array([6.0 * np.sin(i / 15.0), 2.0 * np.cos(i / 25.0)])
+            dzoom = 1.0 + 0.002 * np.sin(i / 40.0)
+            cx, cy, zoom = cx + step[0] / zoom, cy + step[1] / zoom, zoom * dzoom
+            # Background moves by -step in the image, so the camera movement (old - new) is +step
+            truth.append((step[0], step[1]))
+            scales.append(dzoom)
+        m = np.array([[zoom, 0, w / 2 - zoom * (cx + w / 2)], [0, zoom, h / 2 - zoom * (cy + h / 2)]])
+        frame = cv2.warpAffine(background, m, (w, h))
+        for k in range(6):
+            x = int((k * 230 + i * (9 if k % 2 else -7)) % w)
+            cv2.rectangle(frame, (x, 200 + 60 * k), (x + 30, 270 + 60 * k), (0, 0, 255), -1)
+        frames.append(frame)
+    return frames, np.array(truth), np.array(scales)
+
+
+def read_frames(video_path, num_frames):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < num_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def timed(fn, frames):
+    t0 = time.perf_counter()
+    result = fn(frames)
+    return result, (time.perf_counter() - t0) / max(1, len(frames) - 1) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark camera motion estimation")
+    parser.add_argument("--video", help="Real footage; omit for the synthetic sequence with ground truth")
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    if args.video:
+        frames = read_frames(args.video, args.frames)
+        truth = scales = None
+    else:
+        frames, truth, scales = synthetic_frames(args.frames)
+    print(f"🎥 {len(frames)} frames, {frames[0].shape[1]}x{frames[0].shape[0]}")
+
+    legacy, legacy_ms = timed(legacy_camera_movement, frames)
+    (vectorized, est_scales), vectorized_ms = timed(vectorized_camera_movement, frames)
+
+    print(f"\n  {'estimator':<12} {'ms/frame':>9} {'mean |err| px':>14} {'p95 |err| px':>13}")
+    for name, movement, ms in (("legacy", legacy, legacy_ms), ("vectorized", vectorized, vectorized_ms)):
+        if truth is not None:
+            err = np.hypot(*(movement - truth).T)[1:]
+            print(f"  {name:<12} {ms:>9.2f} {err.mean():>14.2f} {np.percentile(err, 95):>13.2f}")
+        else:
+            print(f"  {name:<12} {ms:>9.2f} {'-':>14} {'-':>13}")
+    if truth is not None:
+        print(f"\n  zoom error (vectorized): mean {np.abs(est_scales - scales)[1:].mean():.4f}")
+    print(f"  time ratio (legacy / vectorized): x{legacy_ms / max(vectorized_ms, 1e-9):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Detector backend benchmark
+Runs the PyTorch detector and an exported backend side by side on frames sampled
+from a local video and reports FPS and box agreement.
+With --backend onnx-int8 this is the INT8 accuracy/speed report: per-class recall
+against the FP32 detector, with ball recall broken out separately.
+
+Usage:
+    python bench_detector.py --weights best.pt --video match.mp4 --backend onnx
+    python bench_detector.py --weights best.pt --video match.mp4 --backend onnx-int8 \
+        --calibration-video other_match.mp4
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from detector_backends import load_detector
+from Tracking import bbox_iou_matrix
+
+
+CLASS_NAMES = {0: "ball", 1: "goalkeeper", 2: "player", 3: "referee"}
+INPUT_SIZE = (640, 360)
+
+
+def sample_frames(video_path, num_frames=200, size=INPUT_SIZE):
+    """Evenly sample frames across the video, resized to the detector input size."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video: {video_path}")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    indices = np.linspace(0, max(0, total - 1), num=min(num_frames, max(1, total)), dtype=int)
+    frames = []
+    for idx in indices:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(idx))
+        ret, frame = cap.read()
+        if ret:
+            frames.append(cv2.resize(frame, size))
+    cap.release()
+    return frames
+
+
+def run_detector(model, frames, conf=0.4, iou=0.5, warmup=3):
+    """Predict frame by frame; returns ([(xyxy, cls, conf)], fps)."""
+    for frame in frames[:warmup]:
+        model.predict(frame, conf=conf, iou=iou, device="cpu", verbose=False)
+
+    outputs = []
+    t0 = time.time()
+    for frame in frames:
+        boxes = model.predict(frame, conf=conf, iou=iou, device="cpu", verbose=False)[0].boxes
+        outputs.append((
+            boxes.xyxy.cpu().numpy(),
+            boxes.cls.cpu().numpy().astype(np.int32),
+            boxes.conf.cpu().numpy(),
+        ))
+    elapsed = time.time() - t0
+    return outputs, len(frames) / max(elapsed, 1e-6)
+
+
+def match_per_class(reference, candidate, iou_thr=0.5):
+    """
+    Count reference boxes recovered by the candidate, per class.
+    Returns {cls: (matched, reference_total, candidate_total)}.
+    """
+    counts = {c: [0, 0, 0] for c in CLASS_NAMES}
+    for (ref_xyxy, ref_cls, _), (cand_xyxy, cand_cls, _) in zip(reference, candidate):
+        for c in CLASS_NAMES:
+            ref_boxes = ref_xyxy[ref_cls == c]
+            cand_boxes = cand_xyxy[cand_cls == c]
+            counts[c][1] += len(ref_boxes)
+            counts[c][2] += len(cand_boxes)
+            if len(ref_boxes) == 0 or len(cand_boxes) == 0:
+                continue
+            iou = bbox_iou_matrix(ref_boxes, cand_boxes)
+            rows, cols = linear_sum_assignment(-iou)
+            counts[c][0] += int(np.sum(iou[rows, cols] >= iou_thr))
+    return {c: tuple(v) for c, v in counts.items()}
+
+
+def print_agreement(counts, label="agreement"):
+    total_matched = sum(v[0] for v in counts.values())
+    total_union = sum(max(v[1], v[2]) for v in counts.values())
+    agreement = total_matched / total_union if total_union else 1.0
+    print(f"  Box {label}: {agreement * 100:.1f}%"
+          f" ({total_matched}/{total_union} boxes @ IoU>=0.5)")
+    for c, (matched, ref_total, cand_total) in counts.items():
+        recall = matched / ref_total * 100 if ref_total else 0.0
+        print(f"    {CLASS_NAMES[c]:<10} ref={ref_total:<6} cand={cand_total:<6} recall={recall:.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark detector backends against PyTorch")
+    parser.add_argument("--weights", required=True, help="Path to best.pt")
+    parser.add_argument("--video", required=True, help="Local video to sample frames from")
+    parser.add_argument("--backend", default="onnx", choices=["onnx", "openvino", "onnx-int8"])
+    parser.add_argument("--calibration-video", default=None,
+                        help="INT8 calibration video (defaults to --video)")
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    frames = sample_frames(args.video, args.frames)
+    print(f"🎞️ Sampled {len(frames)} frames from {args.video}")
+
+    torch_out, torch_fps = run_detector(load_detector(args.weights, "torch"), frames)
+    backend_model = load_detector(args.weights, args.backend,
+                                  calibration_video=args.calibration_video or args.video)
+    backend_out, backend_fps = run_detector(backend_model, frames)
+
+    print(f"\n⚡ torch FP32: {torch_fps:.1f} FPS | {args.backend}: {backend_fps:.1f} FPS"
+          f" ({backend_fps / max(torch_fps, 1e-6):.2f}x)")
+    counts = match_per_class(torch_out, backend_out)
+    print_agreement(counts)
+
+    matched, ref_total, _ = counts[0]
+    if ref_total:
+        print(f"  ⚽ Ball recall vs FP32: {matched / ref_total * 100:.1f}% ({matched}/{ref_total})")
+    else:
+        print("  ⚽ Ball recall vs FP32: n/a (FP32 detected no balls in the sampled frames)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Tracker backend benchmark
+Replays the same cached detections (see detection_cache.py) through each tracker
+backend and reports tracker FPS, number of IDs and ID switches.
+Without ground truth, an ID switch is counted when a confirmed box continues from
+the previous frame (IoU >= 0.5 with a box there) but carries a different ID.
+
+Usage:
+    python bench_trackers.py --video match.mp4 --weights best.pt --frames 3000
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from detection_cache import DetectionCache
+from Tracking import TRACKER_BACKENDS, create_tracker, match_boxes
+from tracking_processor_optimized import OptimizedTrackingProcessor
+
+
+def load_cached_detections(args):
+    cache = DetectionCache(args.cache_dir)
+    key = DetectionCache.make_key(args.video, args.weights, tuple(args.input_size),
+                                  args.conf, args.iou, args.detector_backend, args.pitch_roi)
+    detections = cache.load(key)
+    if not detections:
+        raise SystemExit(f"No cached detections for {args.video} in {args.cache_dir};"
+                         " run the tracking pipeline once with the detection cache enabled")
+    return detections
+
+
+def run_tracker(backend, video_path, detections, frame_ids):
+    """Track the cached frames in order; returns (fps, unique ids, id switches)."""
+    tracker = create_tracker(backend=backend)
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_ids[0])
+    frame_idx = frame_ids[0]
+
+    elapsed = 0.0
+    ids = set()
+    switches = 0
+    prev_ids, prev_boxes = [], np.zeros((0, 4))
+    for target in frame_ids:
+        while frame_idx <= target:
+            ret, frame = cap.read()
+            frame_idx += 1
+            if not ret:
+                break
+        if not ret:
+            break
+        raw, _, _ = OptimizedTrackingProcessor._split_detections(*detections[target])
+
+        t0 = time.perf_counter()
+        tracks = tracker.update_tracks(raw, frame=frame)
+        elapsed += time.perf_counter() - t0
+
+        live = [t for t in tracks if t.is_confirmed() and t.time_since_update == 0]
+        cur_ids = [t.track_id for t in live]
+        cur_boxes = np.array([t.to_ltrb() for t in live]).reshape(-1, 4)
+        matches = match_boxes(cur_boxes, prev_boxes, min_iou=0.5)
+        switches += sum(1 for i, m in enumerate(matches.tolist()) if m >= 0 and cur_ids[i] != prev_ids[m])
+        ids.update(cur_ids)
+        prev_ids, prev_boxes = cur_ids, cur_boxes
+    cap.release()
+    return len(frame_ids) / max(elapsed, 1e-6), len(ids), switches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare tracker backends on cached detections")
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--weights", required=True, help="Weights the detections were cached with")
+    parser.add_argument("--detector-backend", default="torch")
+    parser.add_argument("--cache-dir", default="stub/detections")
+    parser.add_argument("--input-size", type=int, nargs=2, default=[640, 360])
+    parser.add_argument("--conf", type=float, default=0.4,
+                        help="Detector conf the detections were cached with (0.1 for bytetrack pipeline runs)")
+    parser.add_argument("--iou", type=float, default=0.5)
+    parser.add_argument("--pitch-roi", action=argparse.BooleanOptionalAction, default=True,
+                        help="Detections were cached with pitch-cropped inference")
+    parser.add_argument("--frames", type=int, default=3000, help="Cached frames to replay")
+    parser.add_argument("--backends", nargs="+", default=list(TRACKER_BACKENDS), choices=TRACKER_BACKENDS)
+    args = parser.parse_args()
+
+    detections = load_cached_detections(args)
+    frame_ids = sorted(detections)[:args.frames]
+    print(f"🗃️ Replaying {len(frame_ids)} cached detection frames from {args.video}")
+
+    print(f"\n  {'backend':<10} {'tracker FPS':>12} {'IDs':>6} {'ID switches':>12}")
+    for backend in args.backends:
+        fps, num_ids, switches = run_tracker(backend, args.video, detections, frame_ids)
+        print(f"  {backend:<10} {fps:>12.1f} {num_ids:>6} {switches:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+ByteTrack-style tracker
+Motion-only multi-object tracker: Kalman prediction plus two-stage IoU association
+(high-confidence detections first, then low-confidence ones for the remaining
+tracks), no appearance embedder. It exposes the same surface as
+deep_sort_realtime.DeepSort that OptimizedTrackingProcessor consumes:
+update_tracks() returning tracks with track_id / is_confirmed() / to_ltrb() /
+get_det_supplementary().
+"""
+
+import numpy as np
+from deep_sort_realtime.deep_sort.kalman_filter import KalmanFilter
+
+from Tracking import match_boxes
+
+
+class TrackState:
+    Tentative = 1
+    Confirmed = 2
+    Deleted = 3
+
+
+class ByteTrack:
+    """Single track; Kalman state is (x, y, a, h) centre / aspect / height plus velocities."""
+
+    def __init__(self, mean, covariance, track_id, n_init, max_age, det_conf=None, det_class=None, others=None):
+        self.mean = mean
+        self.covariance = covariance
+        self.track_id = track_id
+        self.hits = 1
+        self.age = 1
+        self.time_since_update = 0
+        self.state = TrackState.Tentative
+        self._n_init = n_init
+        self._max_age = max_age
+        self.det_conf = det_conf
+        self.det_class = det_class
+        self.others = others
+
+    def to_tlwh(self):
+        ret = self.mean[:4].copy()
+        ret[2] *= ret[3]
+        ret[:2] -= ret[2:] / 2
+        return ret
+
+    def to_ltrb(self):
+        ret = self.to_tlwh()
+        ret[2:] = ret[:2] + ret[2:]
+        return ret
+
+    def get_det_supplementary(self):
+        return self.others
+
+    def predict(self, kf):
+        self.mean, self.covariance = kf.predict(self.mean, self.covariance)
+        self.age += 1
+        self.time_since_update += 1
+        self.det_conf = None
+        self.others = None
+
+    def update(self, kf, measurement, det_conf, det_class, others):
+        self.mean, self.covariance = kf.update(self.mean, self.covariance, measurement)
+        self.hits += 1
+        self.time_since_update = 0
+        self.det_conf = det_conf
+        self.det_class = det_class
+        self.others = others
+        if self.state == TrackState.Tentative and self.hits >= self._n_init:
+            self.state = TrackState.Confirmed
+
+    def mark_missed(self):
+        if self.state == TrackState.Tentative or self.time_since_update > self._max_age:
+            self.state = TrackState.Deleted
+
+    def is_tentative(self):
+        return self.state == TrackState.Tentative
+
+    def is_confirmed(self):
+        return self.state == TrackState.Confirmed
+
+    def is_deleted(self):
+        return self.state == TrackState.Deleted
+
+
+class ByteTracker:
+    """
+    Two-stage association per update:
+    1. confirmed tracks vs high-confidence detections (IoU)
+    2. confirmed tracks still unmatched and seen last frame vs low-confidence detections
+    3. tentative tracks vs the remaining high-confidence detections
+    Unmatched high-confidence detections above new_track_thresh start new tracks.
+    Detections below low_thresh are ignored; the detector should run at that
+    score (not the usual ~0.4) so stage 2 sees the occluded, low-score boxes.
+    """
+
+    def __init__(self, max_age=30, n_init=3, high_thresh=0.6, new_track_thresh=0.6, low_thresh=0.1,
+                 first_min_iou=0.2, second_min_iou=0.5, tentative_min_iou=0.3):
+        self.max_age = max_age
+        self.n_init = n_init
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+        self.new_track_thresh = new_track_thresh
+        self.first_min_iou = first_min_iou
+        self.second_min_iou = second_min_iou
+        self.tentative_min_iou = tentative_min_iou
+        self.kf = KalmanFilter()
+        self.tracks = []
+        self._next_id = 1
+
+    @staticmethod
+    def _xyah(ltwh):
+        l, t, w, h = ltwh
+        return np.array([l + w / 2, t + h / 2, w / max(h, 1e-6), h], dtype=np.float64)
+
+    def _associate(self, track_idx, det_idx, track_boxes, det_boxes, min_iou):
+        """Match a subset of tracks to a subset of detections; returns (pairs, unmatched tracks, unmatched dets)."""
+        if not track_idx or not det_idx:
+            return [], list(track_idx), list(det_idx)
+        matches = match_boxes(track_boxes[track_idx], det_boxes[det_idx], min_iou)
+        pairs = [(track_idx[t], det_idx[d]) for t, d in enumerate(matches.tolist()) if d >= 0]
+        used = {d for _, d in pairs}
+        return (pairs,
+                [track_idx[t] for t, d in enumerate(matches.tolist()) if d < 0],
+                [d for d in det_idx if d not in used])
+
+    def predict_tracks(self):
+        """Advance all tracks one step without detections; not counted as misses."""
+        for track in self.tracks:
+            track.predict(self.kf)
+            track.time_since_update -= 1
+        return self.tracks
+
+    def update_tracks(self, raw_detections, embeds=None, frame=None, others=None):
+        """
+        raw_detections: [[left, top, w, h], confidence, class] as for DeepSort.
+        embeds and frame are accepted for interface compatibility and ignored.
+        """
+        keep = [i for i, d in enumerate(raw_detections)
+                if d[0][2] > 0 and d[0][3] > 0 and d[1] >= self.low_thresh]
+        raw_detections = [raw_detections[i] for i in keep]
+        if others is not None:
+            others = [others[i] for i in keep]
+        for track in self.tracks:
+            track.predict(self.kf)
+
+        det_boxes = np.array([[l, t, l + w, t + h] for (l, t, w, h), _, _ in raw_detections],
+                             dtype=np.float32).reshape(-1, 4)
+        confs = np.array([d[1] for d in raw_detections], dtype=np.float32)
+        track_boxes = np.array([track.to_ltrb() for track in self.tracks], dtype=np.float32).reshape(-1, 4)
+
+        high = [i for i in range(len(raw_detections)) if confs[i] >= self.high_thresh]
+        low = [i for i in range(len(raw_detections)) if confs[i] < self.high_thresh]
+        confirmed = [i for i, track in enumerate(self.tracks) if track.is_confirmed()]
+        tentative = [i for i, track in enumerate(self.tracks) if not track.is_confirmed()]
+
+        pairs, rest_tracks, rest_high = self._associate(confirmed, high, track_boxes, det_boxes, self.first_min_iou)
+        # Low-score boxes only rescue tracks that were matched on the previous step
+        recent = [i for i in rest_tracks if self.tracks[i].time_since_update == 1]
+        stale = [i for i in rest_tracks if self.tracks[i].time_since_update != 1]
+        low_pairs, rest_recent, _ = self._associate(recent, low, track_boxes, det_boxes, self.second_min_iou)
+        tent_pairs, rest_tent, new_dets = self._associate(tentative, rest_high, track_boxes, det_boxes,
+                                                          self.tentative_min_iou)
+
+        for t, d in pairs + low_pairs + tent_pairs:
+            ltwh, conf, cls = raw_detections[d]
+            self.tracks[t].update(self.kf, self._xyah(ltwh), conf, cls,
+                                  others[d] if others is not None else None)
+        for t in stale + rest_recent + rest_tent:
+            self.tracks[t].mark_missed()
+
+        for d in new_dets:
+            ltwh, conf, cls = raw_detections[d]
+            if conf < self.new_track_thresh:
+                continue
+            mean, covariance = self.kf.initiate(self._xyah(ltwh))
+            self.tracks.append(ByteTrack(
+                mean, covariance, str(self._next_id), self.n_init, self.max_age,
+                det_conf=conf, det_class=cls, others=others[d] if others is not None else None,
+            ))
+            self._next_id += 1
+
+        self.tracks = [track for track in self.tracks if not track.is_deleted()]
+        return self.tracks
@@ -0,0 +1,238 @@
+"""
+Persistent calibration store
+Keeps validated pitch homographies per venue/camera rig so a new match from a
+known mount does not need calibrating from scratch. Each entry holds the
+homography, the ViewTransformer pixel vertices, a 64-bit dHash of the reference
+frame and a small line mask of it. A lookup picks the stored frames with the
+nearest hash and aligns their line mask onto the new frame (ECC homography), so
+the rig's small week-to-week drift is refined away instead of trusted blindly.
+"""
+
+import json
+import os
+import re
+import time
+from typing import NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+from pitch_calibration import PitchCalibrator
+
+
+def frame_dhash(frame, hash_size=8):
+    """Difference hash: sign of horizontal gradients on a tiny grayscale thumbnail"""
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distances(hashes, query):
+    """Bit distance from each of `hashes` (uint64 array) to `query`"""
+    xor = np.bitwise_xor(np.asarray(hashes, dtype=np.uint64), np.uint64(query))
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def pitch_pixel_vertices(H, length=105.0, width=68.0):
+    """
+    ViewTransformer source points (bottom-left, bottom-right, top-right, top-left)
+    for a pixel -> metre homography centred on the centre spot
+    """
+    corners = np.array([
+        [-length / 2, -width / 2],
+        [length / 2, -width / 2],
+        [length / 2, width / 2],
+        [-length / 2, width / 2],
+    ], dtype=np.float64)
+    return cv2.perspectiveTransform(corners[None], np.linalg.inv(H))[0].astype(np.float32)
+
+
+class StoredCalibration(NamedTuple):
+    entry_id: str
+    homography: np.ndarray  # 3x3 pixel -> metres, refined for the query frame
+    pixel_vertices: np.ndarray  # (4, 2) ViewTransformer source points in the query frame
+    hash_distance: int
+    alignment: float  # ECC correlation of the line masks after refinement (1 = identical)
+    exact: bool
+
+
+class CalibrationStore:
+    """
+    Directory per camera: index.json with the entries and one PNG line mask per entry.
+    Entries are refreshed rather than duplicated when a near-identical view is added
+    again, and each camera keeps at most max_entries, dropping the least recently used.
+    """
+
+    def __init__(self, store_dir="stub/calibrations", max_hash_distance=20, duplicate_distance=3,
+                 max_entries=64, align_width=320, min_alignment=0.6, max_candidates=3):
+        self.store_dir = store_dir
+        self.max_hash_distance = max_hash_distance
+        self.duplicate_distance = duplicate_distance
+        self.max_entries = max_entries
+        self.align_width = align_width  # Line masks are stored and aligned at this width
+        self.min_alignment = min_alignment
+        self.max_candidates = max_candidates  # Nearest-hash entries tried per lookup
+        self._indexes = {}
+
+    # --------------------------------------------------------
+    # Index
+    # --------------------------------------------------------
+
+    def _camera_dir(self, camera_id):
+        return os.path.join(self.store_dir, re.sub(r"[^\w.-]", "_", str(camera_id)))
+
+    def _index(self, camera_id):
+        if camera_id not in self._indexes:
+            path = os.path.join(self._camera_dir(camera_id), "index.json")
+            entries = []
+            if os.path.exists(path):
+                try:
+                    with open(path) as f:
+                        entries = json.load(f)["entries"]
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"⚠️ Ignoring unreadable calibration index {path}: {e}")
+            self._indexes[camera_id] = entries
+        return self._indexes[camera_id]
+
+    def _save_index(self, camera_id):
+        camera_dir = self._camera_dir(camera_id)
+        os.makedirs(camera_dir, exist_ok=True)
+        path = os.path.join(camera_dir, "index.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump({"camera_id": str(camera_id), "entries": self._index(camera_id)}, f, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def _mask_path(self, camera_id, entry_id):
+        return os.path.join(self._camera_dir(camera_id), f"{entry_id}.png")
+
+    def entries(self, camera_id):
+        return list(self._index(camera_id))
+
+    # --------------------------------------------------------
+    # Line masks and refinement
+    # --------------------------------------------------------
+
+    def _align_mask(self, lines):
+        h, w = lines.shape[:2]
+        size = (self.align_width, max(1, round(h * self.align_width / w)))
+        return cv2.resize(lines, size, interpolation=cv2.INTER_AREA)
+
+    def _refine(self, reference, lines, full_width):
+        """
+        ECC homography mapping reference-frame pixels to query-frame pixels (full
+        resolution), coarse to fine on blurred line masks, and its final correlation
+        """
+        warp = np.eye(3, dtype=np.float32)
+        correlation = 0.0
+        criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 50, 1e-4)
+        for factor, blur in ((4, 3), (2, 3), (1, 2)):
+            size = (reference.shape[1] // factor, reference.shape[0] // factor)
+            template = cv2.GaussianBlur(cv2.resize(reference, size, interpolation=cv2.INTER_AREA).astype(np.float32), (0, 0), blur)
+            image = cv2.GaussianBlur(cv2.resize(lines, size, interpolation=cv2.INTER_AREA).astype(np.float32), (0, 0), blur)
+            try:
+                correlation, warp = cv2.findTransformECC(template, image, warp, cv2.MOTION_HOMOGRAPHY, criteria, None, 1)
+            except cv2.error:
+                return None, 0.0
+            if factor > 1:
+                warp = np.diag([2.0, 2.0, 1.0]).astype(np.float32) @ warp @ np.diag([0.5, 0.5, 1.0]).astype(np.float32)
+        scale = self.align_width / full_width
+        S = np.diag([scale, scale, 1.0])
+        return np.linalg.inv(S) @ warp.astype(np.float64) @ S, float(correlation)
+
+    # --------------------------------------------------------
+    # Add / lookup
+    # --------------------------------------------------------
+
+    def add(self, camera_id, frame, homography, pixel_vertices=None, lines=None,
+            reprojection_error=None, exact=True, source=None):
+        """Store a validated homography for this camera; returns the entry id (None if a better one exists)"""
+        entries = self._index(camera_id)
+        dhash = frame_dhash(frame)
+        error = float("inf") if reprojection_error is None else float(reprojection_error)
+
+        same_view = [e for e in entries if tuple(e["frame_shape"]) == frame.shape[:2]]
+        if same_view:
+            distances = hamming_distances([int(e["dhash"], 16) for e in same_view], dhash)
+            nearest = int(distances.argmin())
+            if distances[nearest] <= self.duplicate_distance:
+                previous = same_view[nearest]
+                previous_error = previous.get("reprojection_error")
+                if previous_error is not None and previous_error <= error and previous["exact"] >= exact:
+                    previous["last_used"] = time.time()
+                    self._save_index(camera_id)
+                    return None
+                entries.remove(previous)
+                if os.path.exists(self._mask_path(camera_id, previous["id"])):
+                    os.remove(self._mask_path(camera_id, previous["id"]))
+
+        if lines is None:
+            lines = PitchCalibrator.line_mask(frame)
+        if pixel_vertices is None:
+            pixel_vertices = pitch_pixel_vertices(homography)
+        entry_id = f"{dhash:016x}-{frame.shape[1]}x{frame.shape[0]}"
+        os.makedirs(self._camera_dir(camera_id), exist_ok=True)
+        cv2.imwrite(self._mask_path(camera_id, entry_id), self._align_mask(lines))
+        entries.append({
+            "id": entry_id,
+            "dhash": f"{dhash:016x}",
+            "frame_shape": list(frame.shape[:2]),
+            "homography": np.asarray(homography, dtype=np.float64).tolist(),
+            "pixel_vertices": np.asarray(pixel_vertices, dtype=np.float32).tolist(),
+            "reprojection_error": None if reprojection_error is None else error,
+            "exact": bool(exact),
+            "source": source,
+            "last_used": time.time(),
+        })
+
+        # Least recently used entries go first
+        entries.sort(key=lambda e: e["last_used"], reverse=True)
+        for old in entries[self.max_entries:]:
+            if os.path.exists(self._mask_path(camera_id, old["id"])):
+                os.remove(self._mask_path(camera_id, old["id"]))
+        del entries[self.max_entries:]
+        self._save_index(camera_id)
+        return entry_id
+
+    def lookup(self, camera_id, frame, lines=None, refine=True) -> Optional[StoredCalibration]:
+        """Calibration of the nearest stored view of this camera, aligned onto `frame`"""
+        entries = [e for e in self._index(camera_id) if tuple(e["frame_shape"]) == frame.shape[:2]]
+        if not entries:
+            return None
+        dhash = frame_dhash(frame)
+        distances = hamming_distances([int(e["dhash"], 16) for e in entries], dhash)
+        order = [i for i in np.argsort(distances, kind="stable")[:self.max_candidates]
+                 if distances[i] <= self.max_hash_distance]
+        if not order:
+            return None
+
+        if refine and lines is None:
+            lines = PitchCalibrator.line_mask(frame)
+        query = self._align_mask(lines) if refine else None
+        for i in order:
+            entry = entries[i]
+            H = np.array(entry["homography"], dtype=np.float64)
+            vertices = np.array(entry["pixel_vertices"], dtype=np.float32)
+            alignment = 1.0
+            if refine:
+                reference = cv2.imread(self._mask_path(camera_id, entry["id"]), cv2.IMREAD_GRAYSCALE)
+                if reference is None or reference.shape != query.shape:
+                    continue
+                W, alignment = self._refine(reference, query, frame.shape[1])
+                if W is None or alignment < self.min_alignment:
+                    continue
+                # Query pixel q = W @ reference pixel, so H_query = H_reference @ inv(W)
+                H = H @ np.linalg.inv(W)
+                H /= H[2, 2]
+                vertices = cv2.perspectiveTransform(vertices[None].astype(np.float64), W)[0].astype(np.float32)
+            entry["last_used"] = time.time()
+            self._save_index(camera_id)
+            return StoredCalibration(
+                entry_id=entry["id"],
+                homography=H,
+                pixel_vertices=vertices,
+                hash_distance=int(distances[i]),
+                alignment=alignment,
+                exact=bool(entry["exact"]),
+            )
+        return None
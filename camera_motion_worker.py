@@ -0,0 +1,87 @@
+"""
+Threaded camera motion
+Runs the per-frame camera movement step on a background thread, fed with the
+frames the detection stream has already decoded, so optical flow (which
+releases the GIL) overlaps with detection and tracking on the main thread.
+Results land in an ordered frame_idx -> movement buffer that the main loop
+reads only when it needs the value.
+"""
+
+import queue
+import threading
+import time
+
+
+class CameraMotionWorker:
+    """
+    Background executor for step(frame_idx, frame, tactical) -> movement or None.
+
+    Frames are processed strictly in submission order, since each movement is
+    relative to the previous frame. `results` can be a dict shared with the caller
+    (e.g. checkpointed movements already computed ahead of the main loop).
+    """
+
+    _END = object()
+
+    def __init__(self, step, depth=32, results=None):
+        self.step = step
+        self.depth = max(1, int(depth))
+        self.results = results if results is not None else {}
+
+        self.queue = queue.Queue(maxsize=self.depth)
+        self.wait_time = 0.0  # Time the consumer spent waiting on a movement
+        self._ready = threading.Condition()
+        self._error = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="camera-motion", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is self._END:
+                    return
+                if self._error is not None:
+                    continue
+                frame_idx, frame, tactical = item
+                try:
+                    movement = self.step(frame_idx, frame, tactical)
+                except Exception as exc:
+                    movement = None
+                    self._error = exc
+                with self._ready:
+                    if movement is not None:
+                        self.results[frame_idx] = movement
+                    self._ready.notify_all()
+            finally:
+                self.queue.task_done()
+
+    def submit(self, frame_idx, frame, tactical):
+        """Queue a frame; blocks only when `depth` frames are already waiting"""
+        self.queue.put((frame_idx, frame, tactical))
+
+    def get(self, frame_idx):
+        """Movement for frame_idx, waiting for the worker if it is not there yet"""
+        t0 = time.time()
+        with self._ready:
+            while frame_idx not in self.results:
+                if self._error is not None:
+                    raise RuntimeError(f"Camera motion failed before frame {frame_idx}") from self._error
+                self._ready.wait()
+            movement = self.results.pop(frame_idx)
+        self.wait_time += time.time() - t0
+        return movement
+
+    def wait_idle(self):
+        """Block until every submitted frame is processed (before checkpointing the state it owns)"""
+        self.queue.join()
+
+    def stop(self):
+        if self._thread is not None:
+            self.queue.put(self._END)
+            self._thread.join(timeout=2.0)
+            self._thread = None
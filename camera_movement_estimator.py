@@ -1,26 +1,163 @@
-import pickle
 import cv2
 import numpy as np
 import os
-class CameraMovementEstimator():
-    def __init__(self, frame):
-        self.minimum_distance = 5
+from typing import NamedTuple
+
+from detection_cache import video_fingerprint
+
+
+class CameraMotion(NamedTuple):
+    """Frame-to-frame camera motion in full-resolution pixels"""
+    dx: float  # Camera movement convention: old - new position of the background
+    dy: float
+    scale: float  # Zoom factor (>1 = zooming in)
+    rotation: float  # Degrees
+    matrix: np.ndarray  # 3x3 affine mapping previous-frame pixels to current-frame pixels
+
+
+# Motion matrix of frames with no estimate (first frame, cuts, replays)
+UNKNOWN_MOTION = np.full((3, 3), np.nan, dtype=np.float32)
+UNKNOWN_MOTION.flags.writeable = False
+
+
+def _identity_motion():
+    return CameraMotion(0.0, 0.0, 1.0, 0.0, np.eye(3))
+
+
+class FrameMotionEstimator:
+    """
+    Incremental camera motion from sparse optical flow on a downscaled pyramid level.
+    Only vertical bands around the static feature strips are converted, downscaled and
+    searched; their masks and the conversion buffers are built once. All tracked features enter one RANSAC
+    partial-affine fit (translation, uniform scale, rotation), so moving players are
+    rejected as outliers instead of the single largest displacement deciding the motion.
+    """
+
+    def __init__(self, frame_shape, pyramid_levels=1, max_corners=30, min_features=15, search_px=60,
+                 edge_columns=((0, 20), (-20, None)), ransac_threshold=1.0):
+        h, w = frame_shape[:2]
+        self.frame_size = (w, h)
+        self.pyramid_levels = pyramid_levels
+        self.factor = 2 ** pyramid_levels
+        self.min_features = min_features
+        self.ransac_threshold = ransac_threshold
+        self.feature_params = dict(maxCorners=max_corners, qualityLevel=0.1, minDistance=3, blockSize=7)
         self.lk_params = dict(
             winSize=(15, 15),
-            maxLevel=2,
+            maxLevel=1,
             criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
         )
-        first_frame_grayscale = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        mask_features = np.zeros_like(first_frame_grayscale)
-        mask_features[:, 0:20] = 1
-        mask_features[:, 900:1050] = 1
-        self.features = dict(
-            maxCorners=100,
-            qualityLevel=0.3,
-            minDistance=3,
-            blockSize=7,
-            mask=mask_features
+
+        # Bands: feature strip plus search_px of motion margin, aligned to the pyramid factor
+        self.bands = []
+        for start, end in edge_columns:
+            strip = slice(start, end).indices(w)[:2]
+            x0 = max(0, strip[0] - search_px) // self.factor * self.factor
+            x1 = min(w, -(-(strip[1] + search_px) // self.factor) * self.factor)
+            mask = np.zeros((-(-h // self.factor), (x1 - x0) // self.factor), dtype=np.uint8)
+            mask[:, (strip[0] - x0) // self.factor:(strip[1] - x0) // self.factor] = 255
+            self.bands.append((x0, x1, mask))
+        # The bands are copied side by side into one reused buffer, so each frame costs a
+        # single contiguous color conversion and pyramid step instead of one per strided slice
+        self.columns = np.cumsum([0] + [x1 - x0 for x0, x1, _ in self.bands])
+        self._bgr = np.empty((h, self.columns[-1], 3), dtype=np.uint8)
+        self._gray = np.empty((h, self.columns[-1]), dtype=np.uint8)
+        self.prev_bands = None
+        self.points = None
+
+    def _prepare(self, frame):
+        target = self._gray if frame.ndim == 2 else self._bgr
+        for (x0, x1, _), start in zip(self.bands, self.columns):
+            target[:, start:start + x1 - x0] = frame[:, x0:x1]
+        gray = self._gray if frame.ndim == 2 else cv2.cvtColor(self._bgr, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        for _ in range(self.pyramid_levels):
+            gray = cv2.pyrDown(gray)
+        return [np.ascontiguousarray(gray[:, start // self.factor:end // self.factor])
+                for start, end in zip(self.columns[:-1], self.columns[1:])]
+
+    def reset(self, frame):
+        """Start over from this frame (first frame, new shot, new shard)"""
+        self.prev_bands = self._prepare(frame)
+        self.points = [None] * len(self.bands)
+
+    def update(self, frame):
+        """Motion from the previous frame to this one"""
+        bands = self._prepare(frame)
+        prev_bands, self.prev_bands = self.prev_bands, bands
+        if prev_bands is None:
+            return _identity_motion()
+
+        old_pts, new_pts = [], []
+        for i, ((x0, _, mask), prev, cur) in enumerate(zip(self.bands, prev_bands, bands)):
+            points = self.points[i]
+            if points is None or len(points) < self.min_features:
+                # Features are only re-detected once too few of them survive
+                points = cv2.goodFeaturesToTrack(prev, mask=mask, **self.feature_params)
+            if points is None:
+                self.points[i] = None
+                continue
+            tracked, status, _ = cv2.calcOpticalFlowPyrLK(prev, cur, points, None, **self.lk_params)
+            ok = status.ravel() == 1
+            offset = np.array([x0 / self.factor, 0.0], dtype=np.float32)
+            old_pts.append(points.reshape(-1, 2)[ok] + offset)
+            new_pts.append(tracked.reshape(-1, 2)[ok] + offset)
+            # Keep the points still inside the band for the next frame
+            tracked = tracked.reshape(-1, 2)[ok]
+            inside = (tracked[:, 0] >= 0) & (tracked[:, 0] < cur.shape[1] - 1) & \
+                     (tracked[:, 1] >= 0) & (tracked[:, 1] < cur.shape[0] - 1)
+            self.points[i] = tracked[inside].reshape(-1, 1, 2)
+        old_pts = np.concatenate(old_pts) if old_pts else np.zeros((0, 2), np.float32)
+        new_pts = np.concatenate(new_pts) if new_pts else np.zeros((0, 2), np.float32)
+
+        affine = None
+        if len(old_pts) >= 3:
+            affine, _ = cv2.estimateAffinePartial2D(
+                old_pts, new_pts, method=cv2.RANSAC, ransacReprojThreshold=self.ransac_threshold
+            )
+        if affine is None:
+            # Too few points for a fit: plain median shift
+            shift = np.median(new_pts - old_pts, axis=0) if len(old_pts) else np.zeros(2)
+            affine = np.array([[1.0, 0.0, shift[0]], [0.0, 1.0, shift[1]]])
+
+        matrix = np.eye(3)
+        matrix[:2] = affine
+        matrix[:2, 2] *= self.factor
+        center = np.array(self.frame_size, dtype=np.float64) / 2
+        moved = matrix[:2, :2] @ center + matrix[:2, 2]
+        return CameraMotion(
+            dx=float(center[0] - moved[0]),
+            dy=float(center[1] - moved[1]),
+            scale=float(np.sqrt(abs(np.linalg.det(matrix[:2, :2])))),
+            rotation=float(np.degrees(np.arctan2(matrix[1, 0], matrix[0, 0]))),
+            matrix=matrix,
         )
+
+
+def iter_video_frames(video_path):
+    """Decode a video one frame at a time"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video: {video_path}")
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            yield frame
+    finally:
+        cap.release()
+
+
+def camera_movement_stub_path(video_path, stub_dir="stub/camera_movement"):
+    """Per-video .npy stub, keyed by the same content fingerprint as the detection cache"""
+    return os.path.join(stub_dir, f"{video_fingerprint(video_path)}.npy")
+
+
+class CameraMovementEstimator():
+    def __init__(self, frame):
+        self.frame_shape = frame.shape
+        # Static background strips at the frame edges (full-resolution columns)
+        self.edge_columns = ((0, 20), (900, 1050))
     def add_adjust_positions_to_tracks(self, tracks, camera_movement_per_frame):
         """Add adjusted positions to tracks based on camera movement"""
         for object_name, object_tracks in tracks.items():
@@ -30,55 +167,56 @@ class CameraMovementEstimator():
                     camera_movement = camera_movement_per_frame[frame_num]
                     position_adjusted = (
                         position[0] - camera_movement[0],
-                        position[1] - camera_movemodels/best.ptment[1]
+                        position[1] - camera_movement[1]
                     )
                     tracks[object_name][frame_num][track_id]['position_adjusted'] = position_adjusted
-    def get_camera_movement(self, frames, read_from_stub=False, stub_path=None):
-        """Calculate camera movement for all frames"""
-        # Read from stub if available
+    def get_camera_movement(self, frames, read_from_stub=False, stub_path=None, num_frames=None):
+        """
+        Camera movement for every frame as a (N, 2) float32 array.
+        `frames` is a video path or any iterable of BGR frames; it is consumed as a
+        stream, so memory stays constant however long the match is. For a video path
+        the stub defaults to stub/camera_movement/<video fingerprint>.npy, which is
+        read back memory-mapped.
+        """
+        if stub_path is None and isinstance(frames, str):
+            stub_path = camera_movement_stub_path(frames)
         if read_from_stub and stub_path is not None and os.path.exists(stub_path):
-            with open(stub_path, 'rb') as f:
-                return pickle.load(f)
-        camera_movement = [[0, 0]] * len(frames)
-        old_gray = cv2.cvtColor(frames[0], cv2.COLOR_BGR2GRAY)
-        old_features = cv2.goodFeaturesToTrack(old_gray, **self.features)
-        for frame_num in range(1, len(frames)):
-            frame_gray = cv2.cvtColor(frames[frame_num], cv2.COLOR_BGR2GRAY)
-            new_features, _, _ = cv2.calcOpticalFlowPyrLK(
-                old_gray, frame_gray, old_features, None, **self.lk_params
-            )
-            max_distance = 0
-            camera_movement_x, camera_movement_y = 0, 0
-            for i, (new, old) in enumerate(zip(new_features, old_features)):
-                new_features_point = new.ravel()
-                old_features_point = old.ravel()
-                distance = self._measure_distance(new_features_point, old_features_point)
-                if distance > max_distance:
-                    max_distance = distance
-                    camera_movement_x, camera_movement_y = self._measure_xy_distance(
-                        old_features_point, new_features_point
-                    )
-            if max_distance > self.minimum_distance:
-                camera_movement[frame_num] = [camera_movement_x, camera_movement_y]
-                old_features = cv2.goodFeaturesToTrack(frame_gray, **self.features)
-            
-            old_gray = frame_gray.copy()
-        
+            return np.load(stub_path, mmap_mode="r")
+
+        if isinstance(frames, str):
+            if num_frames is None:
+                cap = cv2.VideoCapture(frames)
+                num_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+                cap.release()
+            frames = iter_video_frames(frames)
+        elif num_frames is None and hasattr(frames, "__len__"):
+            num_frames = len(frames)
+
+        # Preallocated; grown by doubling only if the frame count was unknown or wrong
+        camera_movement = np.zeros((max(1, num_frames or 0), 2), dtype=np.float32)
+        estimator = FrameMotionEstimator(self.frame_shape, edge_columns=self.edge_columns)
+        count = 0
+        for frame in frames:
+            if count == 0:
+                estimator.reset(frame)
+            else:
+                if count >= len(camera_movement):
+                    camera_movement = np.concatenate([camera_movement, np.zeros_like(camera_movement)])
+                motion = estimator.update(frame)
+                camera_movement[count] = (motion.dx, motion.dy)
+            count += 1
+        camera_movement = camera_movement[:count]
+
         # Save to stub if path provided
         if stub_path is not None:
-            with open(stub_path, 'wb') as f:
-                pickle.dump(camera_movement, f)
+            os.makedirs(os.path.dirname(stub_path) or ".", exist_ok=True)
+            tmp_path = stub_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, camera_movement)
+            os.replace(tmp_path, stub_path)
         
         return camera_movement
     
-    def _measure_distance(self, p1, p2):
-        """Measure Euclidean distance between two points"""
-        return ((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)**0.5
-    
-    def _measure_xy_distance(self, p1, p2):
-        """Measure X and Y distance separately"""
-        return p1[0] - p2[0], p1[1] - p2[1]
-    
     def draw_camera_movement(self, frames, camera_movement_per_frame):
         """Draw camera movement overlay on frames"""
         output_frames = []
@@ -0,0 +1,99 @@
+"""
+Per-frame crop feature service
+Every consumer of a person crop (DeepSort re-ID, StableIDManager histograms,
+SigLIP team embeddings) asks this service instead of cropping and extracting on
+its own. Features are computed at most once per box per frame, and the deep ones
+are computed for all boxes of a frame in one batched forward pass.
+"""
+
+import cv2
+
+
+def clamp_bbox(bbox, width, height):
+    """Clip an xyxy box to the frame; None if nothing is left."""
+    x1, y1, x2, y2 = bbox
+    x1 = max(0, min(width - 1, x1))
+    x2 = max(0, min(width - 1, x2))
+    y1 = max(0, min(height - 1, y1))
+    y2 = max(0, min(height - 1, y2))
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return [x1, y1, x2, y2]
+
+
+def hsv_histogram(frame, bbox, bins=16):
+    """Normalized 2D hue/saturation histogram of a box, or None for tiny boxes."""
+    h, w = frame.shape[:2]
+    bbox = clamp_bbox(bbox, w, h)
+    if bbox is None:
+        return None
+    x1, y1, x2, y2 = map(int, bbox)
+    if (x2 - x1) < 8 or (y2 - y1) < 8:
+        return None
+    crop = frame[y1:y2, x1:x2]
+    hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1], None, [bins, bins], [0, 180, 0, 256])
+    hist = cv2.normalize(hist, hist).flatten()
+    return hist
+
+
+class CropFeatureService:
+    """
+    Caches crop features for the current frame, keyed by box.
+    - reid_embeddings: DeepSort appearance vectors for the frame's detections,
+      passed to update_tracks(embeds=...) so the tracker never embeds on its own
+    - hist: HSV histogram used by StableIDManager
+    - team_embeddings: SigLIP (or color fallback) torso embeddings for team clustering
+    """
+
+    def __init__(self, reid_embedder=None, team_embed_fn=None, hist_bins=16):
+        self.reid_embedder = reid_embedder
+        self.team_embed_fn = team_embed_fn
+        self.hist_bins = hist_bins
+        self.frame = None
+        self._hists = {}
+        self._team = {}
+        self.stats = {'reid': 0, 'hist': 0, 'team': 0, 'reused': 0}
+
+    def begin_frame(self, frame):
+        """Drop the previous frame's features"""
+        self.frame = frame
+        self._hists = {}
+        self._team = {}
+
+    def reid_embeddings(self, raw_detections):
+        """
+        Batched re-ID embeddings for [[l, t, w, h], conf, cls] detections.
+        Returns None when no embedder is available (the tracker then embeds itself).
+        """
+        if self.reid_embedder is None:
+            return None
+        if not raw_detections:
+            return []
+        height, width = self.frame.shape[:2]
+        crops = []
+        for (l, t, w, h), _, _ in raw_detections:
+            l, t, w, h = int(l), int(t), int(w), int(h)
+            crops.append(self.frame[max(0, t):min(height, t + h), max(0, l):min(width, l + w)])
+        self.stats['reid'] += len(crops)
+        return self.reid_embedder.predict(crops)
+
+    def hist(self, bbox):
+        key = tuple(bbox)
+        if key in self._hists:
+            self.stats['reused'] += 1
+        else:
+            self._hists[key] = hsv_histogram(self.frame, bbox, self.hist_bins)
+            self.stats['hist'] += 1
+        return self._hists[key]
+
+    def team_embeddings(self, bboxes):
+        """Team embeddings for several boxes; uncached ones go through one batched call"""
+        keys = [tuple(bbox) for bbox in bboxes]
+        missing = list(dict.fromkeys(k for k in keys if k not in self._team))
+        self.stats['reused'] += len(keys) - len(missing)
+        if missing:
+            for key, emb in zip(missing, self.team_embed_fn(self.frame, [list(k) for k in missing])):
+                self._team[key] = emb
+            self.stats['team'] += len(missing)
+        return [self._team[k] for k in keys]
@@ -0,0 +1,165 @@
+"""
+Persistent detection cache
+Stores raw per-frame detector output (full-resolution boxes, classes, confidences)
+on disk so re-runs of the pipeline can replay detections instead of running the
+detector again. Entries are keyed by a fingerprint of the video content, the
+weights, the detector input size and the conf/iou settings, and the cache directory
+is kept under a byte budget by evicting least-recently-used entries.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from detector_backends import file_hash
+
+
+def video_fingerprint(video_path, sample_bytes=1 << 20):
+    """
+    Content fingerprint of a video: file size plus head, middle and tail chunks.
+    Hashing a multi-gigabyte match file in full would cost more than it saves.
+    """
+    size = os.path.getsize(video_path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(video_path, "rb") as f:
+        for offset in (0, max(0, size // 2 - sample_bytes // 2), max(0, size - sample_bytes)):
+            f.seek(offset)
+            digest.update(f.read(sample_bytes))
+    return digest.hexdigest()[:16]
+
+
+class DetectionCache:
+    """
+    Compact .npz store of per-frame detections.
+    One entry holds flat arrays for every cached frame:
+    frames (F,), offsets (F+1,), boxes (N, 4) int32, cls (N,) uint8, conf (N,) float16.
+    """
+
+    def __init__(self, cache_dir="stub/detections", max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(video_path, weights_path, input_size, conf, iou, backend="torch", pitch_roi=False,
+                 roi_settings=None, ball_crop=False):
+        params = {
+            "video": video_fingerprint(video_path),
+            "weights": file_hash(weights_path),
+            "input_size": list(input_size),
+            "conf": conf,
+            "iou": iou,
+            "backend": backend,
+        }
+        if pitch_roi:
+            # Pitch-cropped inference gives different boxes, and so does any change to how
+            # the crop is built (PitchMasker settings); plain keys stay unchanged
+            params["pitch_roi"] = roi_settings if roi_settings else True
+        if ball_crop:
+            # Ball crop searches live in their own entry, stored with each frame's crop window
+            params["ball_crop"] = True
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:20]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def load(self, key, with_rois=False):
+        """
+        Return {frame_idx: (xyxy, cls, conf)} or None if the key is not cached.
+        with_rois=True returns {frame_idx: (roi, (xyxy, cls, conf))} instead, roi being the
+        crop window the frame was detected in (None if the entry has no windows).
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                frames, offsets = data["frames"], data["offsets"]
+                boxes, cls, conf = data["boxes"], data["cls"], data["conf"]
+                rois = data["rois"] if "rois" in data.files else None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable detection cache {path}: {e}")
+            return None
+        os.utime(path)  # Mark as recently used for LRU eviction
+
+        detections = {}
+        for i, frame_idx in enumerate(frames.tolist()):
+            lo, hi = offsets[i], offsets[i + 1]
+            arrays = (
+                boxes[lo:hi].astype(np.int32),
+                cls[lo:hi].astype(np.int32),
+                conf[lo:hi].astype(np.float32),
+            )
+            if with_rois:
+                # Frames saved without a window are padded with -1 rows
+                roi = tuple(rois[i].tolist()) if rois is not None and rois[i][0] >= 0 else None
+                detections[frame_idx] = (roi, arrays)
+            else:
+                detections[frame_idx] = arrays
+        return detections
+
+    def save(self, key, detections, rois=None):
+        """
+        Merge {frame_idx: (xyxy, cls, conf)} into the entry for `key` and write it atomically.
+        rois ({frame_idx: (x1, y1, x2, y2)}) stores the crop window of each frame alongside.
+        """
+        merged_rois = None
+        if rois is None:
+            merged = self.load(key) or {}
+        else:
+            previous = self.load(key, with_rois=True) or {}
+            merged = {f: arrays for f, (_, arrays) in previous.items()}
+            merged_rois = {f: roi for f, (roi, _) in previous.items() if roi is not None}
+            merged_rois.update(rois)
+        merged.update(detections)
+        if not merged:
+            return
+
+        frames = np.array(sorted(merged), dtype=np.int32)
+        counts = np.array([len(merged[f][1]) for f in frames.tolist()], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        parts = [merged[f] for f in frames.tolist()]
+        boxes = np.concatenate([p[0].reshape(-1, 4) for p in parts]).astype(np.int32)
+        cls = np.concatenate([p[1] for p in parts]).astype(np.uint8)
+        conf = np.concatenate([p[2] for p in parts]).astype(np.float16)
+
+        extra = {}
+        if merged_rois is not None:
+            extra["rois"] = np.array([merged_rois.get(f, (-1, -1, -1, -1)) for f in frames.tolist()],
+                                     dtype=np.int32).reshape(-1, 4)
+        # Unique temporary file per writer, so concurrent saves never interleave in one file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix=".tmp.npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, frames=frames, offsets=offsets, boxes=boxes, cls=cls, conf=conf, **extra)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """
+        Delete least-recently-used entries until the cache fits in max_bytes.
+        The `keep` entry (the one just written) is never evicted, even if it alone
+        exceeds the budget.
+        """
+        keep_path = self._path(keep) if keep is not None else None
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz") and ".tmp" not in name:
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                total += stat.st_size
+                if path != keep_path:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
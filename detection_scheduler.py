@@ -0,0 +1,140 @@
+"""
+Motion-adaptive detection scheduling
+Decides per frame whether the detector runs. The interval between detections
+shrinks as soon as the scene gets hard (fast camera pan, uncertain track
+predictions, lost ball, many unconfirmed tracks) and grows back slowly while it
+stays calm, always within [min_interval, max_interval]. Frames are decided ahead
+of the frames being observed, so a shrinking interval flags them to be decided
+again. Every interval change is recorded in a decision trace.
+"""
+
+import csv
+
+import numpy as np
+
+
+class DetectionScheduler:
+    def __init__(
+        self,
+        base_interval: int = 2,
+        min_interval: int = 1,
+        max_interval: int = 6,
+        adaptive: bool = True,
+        fast_camera_px: float = 8.0,
+        calm_camera_px: float = 2.0,
+        max_uncertainty: float = 0.2,
+        calm_uncertainty: float = 0.12,
+        max_unconfirmed: int = 3,
+        calm_frames_to_grow: int = 12,
+    ):
+        self.min_interval = max(1, int(min_interval))
+        self.max_interval = max(self.min_interval, int(max_interval))
+        self.interval = int(np.clip(base_interval, self.min_interval, self.max_interval))
+        self.adaptive = adaptive
+        self.fast_camera_px = fast_camera_px
+        self.calm_camera_px = calm_camera_px
+        self.max_uncertainty = max_uncertainty
+        self.calm_uncertainty = calm_uncertainty
+        self.max_unconfirmed = max_unconfirmed
+        self.calm_frames_to_grow = calm_frames_to_grow
+
+        self.next_detection_frame = None
+        self.calm_streak = 0
+        self.ball_missing = False
+        self.detection_frames = 0
+        self.crop_frames = 0  # Ball crop searches: extra detector calls outside the schedule
+        self.urgent = False  # Interval shrank: frames decided ahead of it must be decided again
+        self.trace = []
+
+    def should_detect(self, frame_idx):
+        """Called by the frame stream, in frame order, for every decoded frame."""
+        if not self.adaptive:
+            detect = frame_idx % self.interval == 0
+        else:
+            detect = self.next_detection_frame is None or frame_idx >= self.next_detection_frame
+            if detect:
+                self.next_detection_frame = frame_idx + self.interval
+        self.detection_frames += detect
+        return detect
+
+    def redecide(self, frame_idx, detected):
+        """
+        Decide again, in frame order, for a frame decided before the interval shrank.
+        Frames already scheduled for detection keep it and restart the interval there.
+        """
+        if not detected:
+            return self.should_detect(frame_idx)
+        if self.adaptive and (self.next_detection_frame is None or frame_idx >= self.next_detection_frame):
+            self.next_detection_frame = frame_idx + self.interval
+        return True
+
+    @staticmethod
+    def track_uncertainty(tracks):
+        """Mean Kalman position std of confirmed tracks, in box heights."""
+        values = []
+        for track in tracks:
+            if not track.is_confirmed():
+                continue
+            height = max(float(track.mean[3]), 1.0)
+            values.append(np.sqrt(track.covariance[0, 0] + track.covariance[1, 1]) / height)
+        return float(np.mean(values)) if values else 0.0
+
+    def observe(self, frame_idx, camera_movement, tracks, detected, ball_detected, crop_searched=False):
+        """Update the interval from the signals of a processed frame."""
+        self.crop_frames += crop_searched
+        if detected:
+            self.ball_missing = not ball_detected
+        if not self.adaptive:
+            return
+
+        camera = float(np.hypot(*camera_movement))
+        uncertainty = self.track_uncertainty(tracks)
+        unconfirmed = sum(1 for track in tracks if not track.is_confirmed())
+
+        reasons = []
+        if self.ball_missing:
+            reasons.append("ball lost")
+        if camera >= self.fast_camera_px:
+            reasons.append(f"camera {camera:.1f}px")
+        if uncertainty >= self.max_uncertainty:
+            reasons.append(f"uncertainty {uncertainty:.2f}")
+        if unconfirmed >= self.max_unconfirmed:
+            reasons.append(f"{unconfirmed} unconfirmed")
+
+        new_interval = self.interval
+        if reasons:
+            # Hard scene: go straight to the minimum interval
+            self.calm_streak = 0
+            new_interval = self.min_interval
+        elif camera <= self.calm_camera_px and uncertainty <= self.calm_uncertainty:
+            self.calm_streak += 1
+            if self.calm_streak >= self.calm_frames_to_grow:
+                self.calm_streak = 0
+                new_interval = min(self.max_interval, self.interval + 1)
+                reasons.append("calm")
+        else:
+            self.calm_streak = 0
+
+        if new_interval != self.interval:
+            self.trace.append({
+                'frame': frame_idx,
+                'old_interval': self.interval,
+                'interval': new_interval,
+                'reason': ", ".join(reasons),
+                'camera_px': round(camera, 2),
+                'uncertainty': round(uncertainty, 3),
+                'unconfirmed': unconfirmed,
+            })
+            self.urgent = self.urgent or new_interval < self.interval
+            self.interval = new_interval
+            if self.next_detection_frame is not None:
+                # Pull the next detection in when the interval shrinks
+                self.next_detection_frame = min(self.next_detection_frame, frame_idx + new_interval)
+
+    def save_trace(self, path):
+        """Write the decision trace as CSV."""
+        fields = ['frame', 'old_interval', 'interval', 'reason', 'camera_px', 'uncertainty', 'unconfirmed']
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(self.trace)
@@ -0,0 +1,161 @@
+"""
+Detector backends
+Exports the YOLO weights once to an optimized CPU runtime (ONNX Runtime or OpenVINO),
+optionally INT8-quantized, and caches the artifact next to the weights, keyed by the
+weights hash. The exported model is loaded back through ultralytics' YOLO class, so
+predict() keeps the same interface and result objects as the PyTorch path.
+"""
+
+import hashlib
+import os
+import shutil
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+
+BACKENDS = ("torch", "onnx", "openvino", "onnx-int8")
+
+# Static detector input (height, width): 640x360 frames letterboxed to a stride-32 shape
+EXPORT_IMGSZ = (384, 640)
+
+
+def file_hash(path, length=12, chunk_size=1 << 20):
+    """Short SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+def exported_model_path(weights_path, backend):
+    """Cache location for an exported model, next to the weights."""
+    stem, _ = os.path.splitext(weights_path)
+    key = file_hash(weights_path)
+    if backend == "onnx":
+        return f"{stem}_{key}.onnx"
+    if backend == "openvino":
+        # ultralytics detects OpenVINO models by the '_openvino_model' directory suffix
+        return f"{stem}_{key}_openvino_model"
+    if backend == "onnx-int8":
+        return f"{stem}_{key}_int8.onnx"
+    raise ValueError(f"Unknown export backend '{backend}', expected 'onnx', 'openvino' or 'onnx-int8'")
+
+
+def export_model(weights_path, backend, imgsz=EXPORT_IMGSZ):
+    """Export weights to `backend` once; later calls reuse the cached artifact."""
+    target = exported_model_path(weights_path, backend)
+    if os.path.exists(target):
+        return target
+
+    print(f"📦 Exporting {weights_path} to {backend} (one-time)...")
+    exported = YOLO(weights_path).export(format=backend, imgsz=imgsz, half=False, dynamic=False)
+    if os.path.isdir(exported):
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        shutil.move(exported, target)
+    else:
+        os.replace(exported, target)
+    print(f"✅ Exported detector cached at {target}")
+    return target
+
+
+def _letterbox(frame, imgsz=EXPORT_IMGSZ, input_size=(640, 360)):
+    """Replicate the detector preprocessing: resize, letterbox, BGR->RGB, NCHW float32."""
+    frame = cv2.resize(frame, input_size)
+    h, w = frame.shape[:2]
+    scale = min(imgsz[0] / h, imgsz[1] / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top = (imgsz[0] - new_h) // 2
+    left = (imgsz[1] - new_w) // 2
+    frame = cv2.copyMakeBorder(frame, top, imgsz[0] - new_h - top, left, imgsz[1] - new_w - left,
+                               cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    blob = frame[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return blob[None]
+
+
+def sample_calibration_frames(video_path, num_frames=128):
+    """Evenly spaced frames from a local video for INT8 calibration."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open calibration video: {video_path}")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    for idx in np.linspace(0, max(0, total - 1), num=min(num_frames, max(1, total)), dtype=int):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(idx))
+        ret, frame = cap.read()
+        if ret:
+            frames.append(frame)
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"No calibration frames could be read from {video_path}")
+    return frames
+
+
+def quantize_model(weights_path, calibration_video, num_frames=128):
+    """
+    Post-training static INT8 quantization of the ONNX export, calibrated on frames
+    sampled from a local video. The detection head stays in FP32 to protect the
+    small-object (ball) boxes. Cached next to the weights like other exports.
+    """
+    target = exported_model_path(weights_path, "onnx-int8")
+    if os.path.exists(target):
+        return target
+    if calibration_video is None:
+        raise ValueError("INT8 detector is not cached yet; a calibration video is required")
+
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_static,
+    )
+
+    fp32_path = export_model(weights_path, "onnx")
+    fp32_model = onnx.load(fp32_path)
+    input_name = fp32_model.graph.input[0].name
+    head_idx = len(YOLO(weights_path).model.model) - 1
+    head_nodes = [n.name for n in fp32_model.graph.node if n.name.startswith(f"/model.{head_idx}/")]
+
+    frames = sample_calibration_frames(calibration_video, num_frames)
+
+    class _VideoFrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._blobs = iter(_letterbox(frame) for frame in frames)
+
+        def get_next(self):
+            blob = next(self._blobs, None)
+            return None if blob is None else {input_name: blob}
+
+    print(f"🧮 Calibrating INT8 detector on {len(frames)} frames from {calibration_video}...")
+    tmp_path = target + ".tmp"
+    quantize_static(
+        fp32_path, tmp_path, _VideoFrameReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        nodes_to_exclude=head_nodes,
+    )
+
+    # Carry over ultralytics metadata (class names, imgsz, stride) so YOLO() can load it
+    int8_model = onnx.load(tmp_path)
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, tmp_path)
+    os.replace(tmp_path, target)
+    print(f"✅ INT8 detector cached at {target}")
+    return target
+
+
+def load_detector(weights_path, backend="torch", calibration_video=None):
+    """Load the detector for `backend`; all backends expose the same predict() API."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{backend}', expected one of {BACKENDS}")
+    if backend == "torch":
+        return YOLO(weights_path)
+    if backend == "onnx-int8":
+        return YOLO(quantize_model(weights_path, calibration_video), task="detect")
+    return YOLO(export_model(weights_path, backend), task="detect")
@@ -0,0 +1,111 @@
+"""
+Threaded frame prefetcher
+Decodes video frames on a background thread into a bounded queue so that
+decoding overlaps with detection / tracking on the main thread.
+"""
+
+import queue
+import threading
+import time
+
+import cv2
+
+
+class FramePrefetcher:
+    """
+    Background decoder feeding a bounded queue of (frame_idx, frame) items.
+
+    Back-pressure policies when the queue is full:
+    - "block": the decoder waits for the consumer (no frames are lost)
+    - "drop_oldest": the oldest queued frame is discarded to make room
+      (keeps latency bounded for live feeds; frame indices stay correct,
+      so the consumer sees gaps in frame_idx)
+    """
+
+    POLICIES = ("block", "drop_oldest")
+    _END = object()
+
+    def __init__(self, cap: cv2.VideoCapture, depth: int = 8, policy: str = "block",
+                 start_frame: int = 0, frames_limit=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown prefetch policy '{policy}', expected one of {self.POLICIES}")
+        self.cap = cap
+        self.depth = max(1, int(depth))
+        self.policy = policy
+        self.start_frame = start_frame
+        self.frames_limit = frames_limit
+
+        self.queue = queue.Queue(maxsize=self.depth)
+        self.stall_time = 0.0  # Time the consumer spent waiting on the decoder
+        self.dropped_frames = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+        self._thread = threading.Thread(target=self._run, name="frame-prefetch", daemon=True)
+        self._thread.start()
+        return self
+
+    def _put(self, item):
+        if self.policy == "drop_oldest" and item is not self._END:
+            while not self._stop.is_set():
+                try:
+                    self.queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                        self.dropped_frames += 1
+                    except queue.Empty:
+                        pass
+            return
+
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self):
+        frame_idx = self.start_frame
+        try:
+            while not self._stop.is_set():
+                if self.frames_limit and frame_idx >= self.frames_limit:
+                    break
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                self._put((frame_idx, frame))
+                frame_idx += 1
+        finally:
+            self._put(self._END)
+
+    def read(self):
+        """Return the next (frame_idx, frame) or None at end of stream."""
+        t0 = time.time()
+        item = self.queue.get()
+        self.stall_time += time.time() - t0
+        if item is self._END:
+            return None
+        return item
+
+    def __iter__(self):
+        while True:
+            item = self.read()
+            if item is None:
+                return
+            yield item
+
+    def stop(self):
+        self._stop.set()
+        # Unblock a decoder waiting on a full queue
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
@@ -6,13 +6,16 @@ Uses MANUAL keyframe homography for real-world speed & distance estimation
 + Foul Risk Estimation
 """
 
+import argparse
 import cv2
+import json
 import numpy as np
 import os
 import shutil
 from datetime import datetime, timedelta, timezone
 
 from tracking_processor_optimized import OptimizedTrackingProcessor
+from parallel_tracking import ShardedTrackingProcessor
 from video_renderer import VideoRenderer
 
 from speed_and_distance_estimator import (
@@ -23,6 +26,10 @@ from speed_and_distance_estimator import (
 from foul_risk_estimator import FoulRiskEstimator
 from dribbling_analyzer import DribblingAnalyzer
 from shooting_analyzer import ShootingAnalyzer
+from ball_trajectory import BallTrajectoryReconstructor
+from pitch_calibration import PitchCalibrator
+from calibration_store import CalibrationStore
+from view_transformer import ViewTransformer
 from passing_analyzer import PassingAnalyzer
 from substitution_recommender import SubstitutionRecommender
 from formation_analyzer import FormationAnalyzer
@@ -39,6 +46,21 @@ MODEL_PATH = "/home/areeba/Downloads/weights/best.pt"
 OUTPUT_VIDEO_PATH = "video_results/advanced_player_tracking_output.mp4"
 STATS_CSV_PATH = "video_results/player_stats_advanced.csv"
 
+# Tracking checkpoints: set RESUME_TRACKING=1 to continue an interrupted run
+CHECKPOINT_DIR = "stub/checkpoints"
+RESUME_TRACKING = os.getenv("RESUME_TRACKING", "0") == "1"
+
+# Time-sharded parallel tracking: TRACKING_SHARDS=K > 1 tracks K segments in parallel processes
+TRACKING_SHARDS = int(os.getenv("TRACKING_SHARDS", "1"))
+
+# Pitch calibration: "auto" (manual clicks only when automatic calibration is not confident),
+# "unattended" (never opens a window) or "manual"
+CALIBRATION_MODE = os.getenv("CALIBRATION_MODE", "auto")
+CALIBRATION_DIR = "video_results/calibration"
+# Venue/camera rig id (e.g. "home-main"): reuse and extend the stored calibrations of that rig
+CAMERA_ID = os.getenv("CAMERA_ID")
+CALIBRATION_STORE_DIR = "stub/calibrations"
+
 DISPLAY_SIZE = (900, 600)
 SPRINT_THRESHOLD_MS = 7.0  # ~25.2 km/h
 
@@ -175,6 +197,105 @@ def select_circle_points(video_path, frame_idx):
     return points
 
 
+def read_frame(video_path, frame_idx):
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+    ret, frame = cap.read()
+    cap.release()
+    return frame if ret else None
+
+
+def stored_view_transformer(video_path, camera_id, store, total_frames):
+    """ViewTransformer with the rig's stored pixel vertices aligned onto this video, or None"""
+    for frame_idx in PitchCalibrator().candidate_frames(total_frames):
+        frame = read_frame(video_path, frame_idx)
+        stored = store.lookup(camera_id, frame) if frame is not None else None
+        if stored is not None:
+            print(f"📦 Pitch vertices from stored calibration {stored.entry_id} (alignment {stored.alignment:.2f})")
+            return ViewTransformer(pixel_vertices=stored.pixel_vertices)
+    return None
+
+
+def calibrate_homography(video_path, total_frames, non_tactical_ranges=None, mode=CALIBRATION_MODE,
+                         camera_id=CAMERA_ID):
+    """
+    KeyframeHomography for the video. Confident automatic fits (stored calibrations
+    of the camera rig first) become the keyframes; the manual click tool is only used
+    when there are none (never in unattended mode).
+    """
+    homography = KeyframeHomography()
+    store = CalibrationStore(CALIBRATION_STORE_DIR) if camera_id else None
+
+    if mode != "manual":
+        print("🤖 Auto-calibrating from the centre circle and halfway line...")
+        calibrations = PitchCalibrator().calibrate_video(
+            video_path, skip_ranges=non_tactical_ranges, store=store, camera_id=camera_id
+        )
+        confident = [c for c in calibrations if c.confident]
+        for c in confident:
+            homography.set_keyframe(c.frame_idx, c.homography)
+        print(f"📐 {len(confident)}/{len(calibrations)} candidate frames calibrated with confidence")
+        if confident:
+            return homography
+
+        if mode == "unattended":
+            if not calibrations:
+                raise RuntimeError("❌ No centre circle found for automatic calibration; "
+                                   "rerun with CALIBRATION_MODE=manual")
+            best = min(calibrations, key=lambda c: c.reprojection_error)
+            print(f"⚠️ Using low-confidence calibration of frame {best.frame_idx}"
+                  f" ({best.reprojection_error:.2f}px reprojection error)")
+            homography.set_keyframe(best.frame_idx, best.homography)
+            return homography
+        print("⚠️ Automatic calibration not confident, falling back to manual point selection")
+
+    keyframe_1, keyframe_2 = choose_homography_keyframes(total_frames)
+    print(f"🎞️ Auto-selected homography frames: {keyframe_1}, {keyframe_2}")
+
+    print("\n🎯 Select points for FIRST keyframe")
+    points1 = select_circle_points(video_path, frame_idx=keyframe_1)
+    homography.add_keyframe(keyframe_1, points1)
+
+    print("\n🎯 Select points for SECOND keyframe")
+    points2 = select_circle_points(video_path, frame_idx=keyframe_2)
+    homography.add_keyframe(keyframe_2, points2)
+
+    if store is not None:
+        # Clicked keyframes are operator-validated: the next match from this rig can reuse them
+        for frame_idx, H in homography.keyframes.items():
+            frame = read_frame(video_path, frame_idx)
+            if frame is not None:
+                store.add(camera_id, frame, H, source=f"{os.path.basename(video_path)}:{frame_idx}:manual")
+    return homography
+
+
+def calibrate_only(video_paths, camera_id=CAMERA_ID):
+    """Calibration-only mode: fit keyframes for many clips without tracking and save them as JSON"""
+    os.makedirs(CALIBRATION_DIR, exist_ok=True)
+    calibrator = PitchCalibrator()
+    store = CalibrationStore(CALIBRATION_STORE_DIR) if camera_id else None
+    for video_path in video_paths:
+        calibrations = calibrator.calibrate_video(video_path, store=store, camera_id=camera_id)
+        confident = [c for c in calibrations if c.confident]
+        name = os.path.splitext(os.path.basename(video_path))[0]
+        output_path = os.path.join(CALIBRATION_DIR, f"{name}.json")
+        with open(output_path, "w") as f:
+            json.dump({
+                "video": video_path,
+                "keyframes": [{
+                    "frame": c.frame_idx,
+                    "homography": c.homography.tolist(),
+                    "reprojection_error": c.reprojection_error,
+                    "support": c.support,
+                    "exact": c.exact,
+                    "confident": c.confident,
+                } for c in calibrations],
+            }, f, indent=2)
+        best = min((c.reprojection_error for c in confident), default=None)
+        print(f"📐 {name}: {len(confident)}/{len(calibrations)} confident keyframes"
+              + (f", best {best:.2f}px" if best is not None else "") + f" -> {output_path}")
+
+
 def choose_homography_keyframes(total_frames):
     """
     Choose two valid keyframes within the video duration.
@@ -197,11 +318,11 @@ def choose_homography_keyframes(total_frames):
 # MAIN PIPELINE
 # ============================================================
 
-def main():
+def main(camera_id=CAMERA_ID):
     print("=" * 70)
     print("🎯 Football Player Tracking System (REAL-WORLD METRICS)")
     print("=" * 70)
-    print("📐 Mode: Manual Keyframe Homography")
+    print(f"📐 Mode: Keyframe Homography (calibration: {CALIBRATION_MODE})")
     print("⚽ Field reference: Center Circle (radius = 9.15m)")
     print()
 
@@ -212,13 +333,33 @@ def main():
     print("STEP 1: Video Processing & Tracking")
     print("-" * 70)
 
-    processor = OptimizedTrackingProcessor(
-        video_path=VIDEO_PATH,
-        model_path=MODEL_PATH,
-        pixels_per_meter=None
-    )
-
-    processor.process_video(frames_limit=None)
+    if TRACKING_SHARDS > 1:
+        processor = ShardedTrackingProcessor(
+            video_path=VIDEO_PATH,
+            model_path=MODEL_PATH,
+            pixels_per_meter=None,
+            num_shards=TRACKING_SHARDS
+        )
+    else:
+        processor = OptimizedTrackingProcessor(
+            video_path=VIDEO_PATH,
+            model_path=MODEL_PATH,
+            pixels_per_meter=None
+        )
+        processor.checkpoint_dir = CHECKPOINT_DIR
+    if camera_id:
+        view_transformer = stored_view_transformer(
+            VIDEO_PATH, camera_id, CalibrationStore(CALIBRATION_STORE_DIR), processor.total_frames
+        )
+        if view_transformer is not None:
+            processor.view_transformer = view_transformer
+
+    if TRACKING_SHARDS > 1:
+        if RESUME_TRACKING:
+            print("⚠️ RESUME_TRACKING is not supported with TRACKING_SHARDS > 1; tracking from the start")
+        processor.process_video(frames_limit=None)
+    else:
+        processor.process_video(frames_limit=None, resume=RESUME_TRACKING)
     processor.post_process()
     results = processor.get_results()
 
@@ -233,27 +374,20 @@ def main():
     total_frames = results["total_frames"]
 
     # --------------------------------------------------------
-    # STEP 2: MANUAL HOMOGRAPHY CALIBRATION
+    # STEP 2: HOMOGRAPHY CALIBRATION
     # --------------------------------------------------------
 
     print("\n" + "=" * 70)
-    print("STEP 2: Manual Homography Calibration")
+    print("STEP 2: Homography Calibration")
     print("-" * 70)
 
-    homography = KeyframeHomography()
-
-    keyframe_1, keyframe_2 = choose_homography_keyframes(total_frames)
-    print(f"🎞️ Auto-selected homography frames: {keyframe_1}, {keyframe_2}")
-
-    print("\n🎯 Select points for FIRST keyframe")
-    points1 = select_circle_points(VIDEO_PATH, frame_idx=keyframe_1)
-    homography.add_keyframe(keyframe_1, points1)
-
-    print("\n🎯 Select points for SECOND keyframe")
-    points2 = select_circle_points(VIDEO_PATH, frame_idx=keyframe_2)
-    homography.add_keyframe(keyframe_2, points2)
+    homography = calibrate_homography(
+        VIDEO_PATH, total_frames, non_tactical_ranges=results.get("non_tactical_ranges"), camera_id=camera_id
+    )
 
     print(f"✅ Added {len(homography.keyframes)} homography keyframes")
+    # Carry the keyframes through the camera motion so panning between them is followed
+    homography.build_frame_homographies(results["camera_matrices"], num_frames=total_frames)
 
     # --------------------------------------------------------
     # STEP 3: PIXEL → REAL-WORLD TRANSFORMATION
@@ -266,6 +400,13 @@ def main():
     apply_homography_to_tracks(tracks, homography)
     print("✅ Player coordinates mapped to meters")
 
+    print("⚽ Reconstructing ball trajectory...")
+    ball_trajectory = BallTrajectoryReconstructor(fps=fps).build(tracks, num_frames=total_frames)
+    ball_summary = ball_trajectory.summary()
+    print(f"✅ Ball trajectory on {ball_summary['frames']} frames"
+          f" ({ball_summary['measured']} measured, {ball_summary['interpolated']} interpolated,"
+          f" {ball_summary['rejected']} outliers rejected)")
+
     # --------------------------------------------------------
     # STEP 4: SPEED & DISTANCE ESTIMATION
     # --------------------------------------------------------
@@ -295,7 +436,7 @@ def main():
 
     print("🚀 Analyzing shooting statistics...")
     shooting_analyzer = ShootingAnalyzer(fps=fps)
-    shooting_data = shooting_analyzer.analyze_tracks(tracks)
+    shooting_data = shooting_analyzer.analyze_tracks(tracks, ball_trajectory=ball_trajectory)
     print(f"📊 Shots detected: {len(shooting_data['shot_events'])}")
 
     print("🎯 Analyzing passing accuracy...")
@@ -370,7 +511,8 @@ def main():
         fps=fps,
         width=width,
         height=height,
-        total_frames=total_frames
+        total_frames=total_frames,
+        non_tactical_ranges=results.get("non_tactical_ranges")
     )
     
     # --------------------------------------------------------
@@ -405,4 +547,13 @@ def main():
 # ============================================================
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Football player tracking pipeline")
+    parser.add_argument("--calibrate-only", nargs="+", metavar="VIDEO",
+                        help="Only run automatic pitch calibration on these clips")
+    parser.add_argument("--camera-id", default=CAMERA_ID,
+                        help="Camera rig whose calibration store is used and extended")
+    args = parser.parse_args()
+    if args.calibrate_only:
+        calibrate_only(args.calibrate_only, camera_id=args.camera_id)
+    else:
+        main(camera_id=args.camera_id)
@@ -0,0 +1,377 @@
+"""
+Time-sharded parallel tracking
+Splits a video into K overlapping time segments, runs OptimizedTrackingProcessor
+on each segment in its own process and stitches the per-segment results back into
+the structure returned by OptimizedTrackingProcessor.get_results().
+
+Each shard starts `overlap_frames` before its core range so the tracker, the
+StableIDManager and the team classifier are warmed up at the seam. Stable IDs
+are re-mapped across seams by matching boxes in that shared window, and team
+labels are re-aligned because each shard clusters teams independently.
+"""
+
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from detection_cache import DetectionCache
+from detector_backends import export_model, quantize_model
+from Tracking import bbox_iou_matrix
+from tracklet_stitcher import TrackletStitcher
+from speed_and_distance_estimator import SpeedAndDistance_Estimator
+from view_transformer import ViewTransformer
+
+
+PERSON_GROUPS = ("players", "goalkeepers", "referees")
+
+
+def plan_shards(total_frames, num_shards, overlap_frames):
+    """
+    Return [(start, core_start, end)] per shard.
+    Frames [core_start, end) belong to the shard; [start, core_start) is warm-up.
+    """
+    num_shards = max(1, min(int(num_shards), max(1, total_frames)))
+    bounds = [k * total_frames // num_shards for k in range(num_shards + 1)]
+    shards = []
+    for k in range(num_shards):
+        core_start, end = bounds[k], bounds[k + 1]
+        start = max(0, core_start - overlap_frames) if k > 0 else 0
+        shards.append((start, core_start, end))
+    return shards
+
+
+def _process_shard(args):
+    """Worker entry point: track one time segment and return picklable results."""
+    video_path, model_path, start, end, detector_backend, tracker_backend, settings, torch_threads = args
+
+    import torch
+    from tracking_processor_optimized import OptimizedTrackingProcessor
+
+    # Avoid oversubscription: each shard gets its share of the cores
+    torch.set_num_threads(max(1, torch_threads))
+    cv2.setNumThreads(max(1, torch_threads))
+
+    processor = OptimizedTrackingProcessor(video_path, model_path, detector_backend=detector_backend,
+                                           tracker_backend=tracker_backend)
+    for key, value in settings.items():
+        setattr(processor, key, value)
+    # Shards share cache entries; the parent writes them once so workers don't race on them
+    processor.detection_cache_writeback = False
+    processor.process_video(frames_limit=end, start_frame=start)
+    results = processor.get_results()
+
+    return {
+        "start": start,
+        "end": end,
+        "tracks": {group: {f: dict(data) for f, data in frames.items()}
+                   for group, frames in results["tracks"].items()},
+        "track_class_map": dict(results["track_class_map"]),
+        "stable_class_map": dict(results["stable_class_map"]),
+        "camera_movement": [list(m) for m in results["camera_movement"]],
+        "camera_matrices": results["camera_matrices"],
+        "id_appearance": dict(processor.id_appearance),
+        "non_tactical_ranges": [list(r) for r in results["non_tactical_ranges"]],
+        "performance": dict(results["performance"]),
+        "detection_cache": (processor.detection_cache_dir, processor.detection_cache_max_bytes),
+        "cache_writes": processor.pending_cache_writes(),
+    }
+
+
+def save_shard_caches(shard_results):
+    """Merge the shards' new detection cache entries per key and write each key once."""
+    merged = {}
+    for result in shard_results:
+        for key, detections, rois in result.get("cache_writes", []):
+            cache_dir, max_bytes = result["detection_cache"]
+            entry = merged.setdefault((cache_dir, key), {"max_bytes": max_bytes, "detections": {}, "rois": None})
+            entry["detections"].update(detections)
+            if rois is not None:
+                entry["rois"] = {**(entry["rois"] or {}), **rois}
+    for (cache_dir, key), entry in merged.items():
+        DetectionCache(cache_dir, entry["max_bytes"]).save(key, entry["detections"], rois=entry["rois"])
+    return sum(len(entry["detections"]) for entry in merged.values())
+
+
+def _boxes_by_frame(tracks, frame_range):
+    """{frame_idx: {stable_id: (bbox, team_id)}} for person groups inside frame_range."""
+    out = defaultdict(dict)
+    lo, hi = frame_range
+    for group in PERSON_GROUPS:
+        for frame_idx, frame_data in tracks.get(group, {}).items():
+            if lo <= frame_idx < hi:
+                for sid, info in frame_data.items():
+                    out[frame_idx][sid] = (info["bbox"], info.get("team_id"))
+    return out
+
+
+def match_seam(prev_tracks, next_tracks, overlap_range, min_iou=0.5, min_votes=3, num_teams=2):
+    """
+    Match stable IDs of the next shard to the previous shard over the overlap window.
+    Returns (id_map next->prev, team_map next->prev).
+    """
+    prev_boxes = _boxes_by_frame(prev_tracks, overlap_range)
+    next_boxes = _boxes_by_frame(next_tracks, overlap_range)
+
+    votes = defaultdict(int)
+    team_votes = np.zeros((num_teams, num_teams), dtype=np.int64)
+    for frame_idx, next_frame in next_boxes.items():
+        prev_frame = prev_boxes.get(frame_idx)
+        if not prev_frame:
+            continue
+        prev_ids = list(prev_frame.keys())
+        next_ids = list(next_frame.keys())
+        iou = bbox_iou_matrix([prev_frame[i][0] for i in prev_ids], [next_frame[i][0] for i in next_ids])
+        rows, cols = linear_sum_assignment(-iou)
+        for r, c in zip(rows, cols):
+            if iou[r, c] < min_iou:
+                continue
+            votes[(next_ids[c], prev_ids[r])] += 1
+            prev_team, next_team = prev_frame[prev_ids[r]][1], next_frame[next_ids[c]][1]
+            if prev_team is not None and next_team is not None \
+                    and prev_team < num_teams and next_team < num_teams:
+                team_votes[next_team, prev_team] += 1
+
+    id_map = {}
+    if votes:
+        next_ids = sorted({n for n, _ in votes})
+        prev_ids = sorted({p for _, p in votes})
+        counts = np.zeros((len(next_ids), len(prev_ids)), dtype=np.int64)
+        n_index = {sid: i for i, sid in enumerate(next_ids)}
+        p_index = {sid: i for i, sid in enumerate(prev_ids)}
+        for (n, p), count in votes.items():
+            counts[n_index[n], p_index[p]] = count
+        rows, cols = linear_sum_assignment(-counts)
+        for r, c in zip(rows, cols):
+            if counts[r, c] >= min_votes:
+                id_map[next_ids[r]] = prev_ids[c]
+
+    # Team labels are arbitrary per shard: pick the permutation that agrees most
+    rows, cols = linear_sum_assignment(-team_votes)
+    team_map = {int(r): int(c) for r, c in zip(rows, cols)}
+    return id_map, team_map
+
+
+def stitch_shards(shard_results, shards, prefer_class):
+    """Merge per-shard results into one get_results()-compatible dict."""
+    tracks = defaultdict(lambda: defaultdict(dict))
+    track_class_map = {}
+    stable_class_map = {}
+    id_appearance = {}
+    camera_movement = []
+
+    next_global_id = 1
+    prev_local_to_global = {}
+    prev_team_to_global = None
+    prev_result = None
+
+    for k, (result, (start, core_start, end)) in enumerate(zip(shard_results, shards)):
+        local_to_global = {}
+        team_to_global = {t: t for t in range(2)}
+        if prev_result is not None and core_start > start:
+            id_map, team_map = match_seam(prev_result["tracks"], result["tracks"], (start, core_start))
+            for local_id, prev_local_id in id_map.items():
+                if prev_local_id in prev_local_to_global:
+                    local_to_global[local_id] = prev_local_to_global[prev_local_id]
+            team_to_global = {t: prev_team_to_global.get(team_map.get(t, t), t) for t in range(2)}
+
+        def global_id(local_id):
+            nonlocal next_global_id
+            if local_id not in local_to_global:
+                local_to_global[local_id] = next_global_id
+                next_global_id += 1
+            return local_to_global[local_id]
+
+        # People first, so the ball's possession ID below resolves to an already mapped player
+        groups = sorted(result["tracks"], key=lambda group: group == "ball")
+        for group in groups:
+            for frame_idx, frame_data in result["tracks"][group].items():
+                if not (core_start <= frame_idx < end):
+                    continue
+                for local_id, info in frame_data.items():
+                    if group == "ball":
+                        if info.get("assigned_track_id") is not None:
+                            info = dict(info)
+                            gid = local_to_global.get(info["assigned_track_id"])
+                            if gid is None:
+                                # The player only exists in the warm-up window: no global ID to point at
+                                for key in ("assigned_track_id", "assigned_group", "assigned_distance"):
+                                    info.pop(key, None)
+                            else:
+                                info["assigned_track_id"] = gid
+                        tracks[group][frame_idx][local_id] = info
+                        continue
+                    info = dict(info)
+                    if info.get("team_id") is not None:
+                        info["team_id"] = team_to_global.get(info["team_id"], info["team_id"])
+                    tracks[group][frame_idx][global_id(local_id)] = info
+
+        for local_id, cls in result["stable_class_map"].items():
+            if local_id not in local_to_global:
+                continue  # Only seen in the warm-up window
+            gid = local_to_global[local_id]
+            stable_class_map[gid] = prefer_class(stable_class_map.get(gid), cls)
+        for local_id, hist in result.get("id_appearance", {}).items():
+            if local_id in local_to_global:
+                gid = local_to_global[local_id]
+                id_appearance[gid] = id_appearance[gid] + hist if gid in id_appearance else hist
+        for tid, cls in result["track_class_map"].items():
+            # DeepSort track IDs restart in every shard, so namespace them by shard
+            track_class_map[f"{k}_{tid}"] = cls
+
+        camera_movement.extend(result["camera_movement"][core_start:end])
+
+        prev_result = result
+        prev_local_to_global = local_to_global
+        prev_team_to_global = team_to_global
+
+    return tracks, track_class_map, stable_class_map, camera_movement, id_appearance
+
+
+class ShardedTrackingProcessor:
+    """
+    Drop-in replacement for OptimizedTrackingProcessor that processes K time
+    shards in parallel processes. process_video / post_process / get_results
+    keep the same signatures and result structure.
+    """
+
+    def __init__(self, video_path, model_path, pixels_per_meter=30, num_shards=None,
+                 overlap_seconds=2.0, processor_settings=None, detector_backend="torch",
+                 tracker_backend="deepsort"):
+        self.video_path = video_path
+        self.model_path = model_path
+        self.pixels_per_meter = pixels_per_meter
+        self.detector_backend = detector_backend
+        self.tracker_backend = tracker_backend
+        self.num_shards = num_shards or max(1, os.cpu_count() or 1)
+        self.processor_settings = processor_settings or {}
+
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Could not open video: {video_path}")
+        self.fps = int(cap.get(cv2.CAP_PROP_FPS))
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        self.overlap_frames = max(1, int(overlap_seconds * max(1, self.fps)))
+        self.speed_estimator = SpeedAndDistance_Estimator(fps=self.fps, frame_window=5)
+        self.view_transformer = ViewTransformer()
+
+        self.tracks = defaultdict(lambda: defaultdict(dict))
+        self.track_class_map = {}
+        self.stable_class_map = {}
+        self.camera_movement_per_frame = []
+        self.camera_matrices_per_frame = np.zeros((0, 3, 3), dtype=np.float32)
+        self.id_appearance = {}
+        self.tracklet_id_map = {}
+        self.non_tactical_ranges = []
+        self.stitch_tracklets = True
+        self.timers = {}
+
+        print("✅ Sharded Tracking Processor Initialized")
+        print(f"📊 Video: {self.fps} FPS, {self.width}x{self.height}, {self.total_frames} frames")
+        print(f"🧩 Shards: {self.num_shards}, overlap {self.overlap_frames} frames")
+
+    def process_video(self, frames_limit=None):
+        """Track all shards in parallel and stitch them at the seams"""
+        from tracking_processor_optimized import OptimizedTrackingProcessor
+
+        total = min(self.total_frames, frames_limit) if frames_limit else self.total_frames
+        shards = plan_shards(total, self.num_shards, self.overlap_frames)
+        threads_per_shard = max(1, (os.cpu_count() or 1) // len(shards))
+        if self.detector_backend == "onnx-int8":
+            # Export once in the parent so workers don't race on the cache
+            quantize_model(self.model_path, self.video_path)
+        elif self.detector_backend != "torch":
+            export_model(self.model_path, self.detector_backend)
+        jobs = [(self.video_path, self.model_path, start, end, self.detector_backend,
+                 self.tracker_backend, self.processor_settings, threads_per_shard)
+                for start, _, end in shards]
+
+        print(f"\n🎬 Processing {len(shards)} shards in parallel...")
+        t0 = time.time()
+        # Spawn (not fork) so torch / OpenCV thread pools start clean in every worker
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(shards), mp_context=ctx) as pool:
+            shard_results = list(pool.map(_process_shard, jobs))
+        wall = time.time() - t0
+
+        saved = save_shard_caches(shard_results)
+        if saved:
+            print(f"🗃️ Detection cache updated with {saved} new frames from all shards")
+
+        print("🧵 Stitching shards...")
+        (self.tracks, self.track_class_map, self.stable_class_map,
+         self.camera_movement_per_frame, self.id_appearance) = stitch_shards(
+            shard_results, shards, OptimizedTrackingProcessor._prefer_class
+        )
+        self.camera_matrices_per_frame = np.concatenate([
+            result["camera_matrices"][core_start:end] for result, (_, core_start, end) in zip(shard_results, shards)
+        ])
+        # Non-tactical ranges come from each shard's core window only
+        self.non_tactical_ranges = []
+        for result, (_, core_start, end) in zip(shard_results, shards):
+            for lo, hi in result["non_tactical_ranges"]:
+                lo, hi = max(lo, core_start), min(hi, end)
+                if lo >= hi:
+                    continue
+                if self.non_tactical_ranges and self.non_tactical_ranges[-1][1] == lo:
+                    self.non_tactical_ranges[-1][1] = hi
+                else:
+                    self.non_tactical_ranges.append([lo, hi])
+
+        self.timers = defaultdict(float)
+        for result in shard_results:
+            for key, value in result["performance"].items():
+                self.timers[key] += value
+        self.timers = dict(self.timers)
+        self.timers['wall'] = wall
+
+        print(f"\n✅ Tracking complete for {total} frames in {wall:.1f}s wall time")
+        print(f"⚡ Average processing speed: {total / max(wall, 1e-6):.1f} FPS")
+
+    def post_process(self):
+        """Apply transformations and calculate physics"""
+        if self.stitch_tracklets:
+            from tracking_processor_optimized import OptimizedTrackingProcessor
+
+            print("\n🧵 Stitching fragmented tracklets...")
+            self.tracklet_id_map, stats = TrackletStitcher(fps=self.fps).stitch(
+                self.tracks, self.stable_class_map, self.id_appearance,
+                OptimizedTrackingProcessor._prefer_class,
+            )
+            print(f"🧵 Tracklet stitching: {stats['ids_before']} -> {stats['ids_after']} IDs"
+                  f" (fragment reduction {stats['fragment_reduction'] * 100:.1f}%)")
+
+        print("\n📐 Applying Perspective Transform...")
+        self.view_transformer.add_transformed_position_to_tracks(self.tracks)
+
+        print("🌊 Smoothing trajectories...")
+        self.speed_estimator.smooth_positions(self.tracks)
+
+        print("⚡ Calculating speed and distance...")
+        self.speed_estimator.add_speed_and_distance_to_tracks(self.tracks)
+        print("✅ Post-processing complete")
+
+    def get_results(self):
+        """Return processed data"""
+        return {
+            'tracks': self.tracks,
+            'track_class_map': self.track_class_map,
+            'stable_class_map': self.stable_class_map,
+            'camera_movement': self.camera_movement_per_frame,
+            'camera_matrices': self.camera_matrices_per_frame,
+            'fps': self.fps,
+            'width': self.width,
+            'height': self.height,
+            'total_frames': self.total_frames,
+            'non_tactical_ranges': self.non_tactical_ranges,
+            'performance': self.timers
+        }
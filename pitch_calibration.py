@@ -0,0 +1,359 @@
+"""
+Automatic pitch calibration
+Finds the centre circle (an ellipse in the broadcast view) and the halfway line
+among the white line pixels on the grass, turns them into the same four
+centre-circle landmarks the manual tool asks for (pinned exactly by a touchline
+crossing the halfway line), and fits the pixel → metre homography. Each fit is scored by reprojecting the whole circle (and the halfway
+line) into the image and measuring its distance to the detected line pixels, so
+the caller can keep confident keyframes and fall back to manual clicks otherwise.
+"""
+
+import os
+from typing import NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+from shot_classifier import GREEN_LOWER, GREEN_UPPER, in_ranges
+from speed_and_distance_estimator import CENTER_CIRCLE_RADIUS, REAL_WORLD_POINTS
+
+
+WHITE_LOWER = np.array([0, 0, 160], dtype=np.uint8)
+WHITE_UPPER = np.array([180, 70, 255], dtype=np.uint8)
+
+
+class CalibrationResult(NamedTuple):
+    frame_idx: int
+    homography: np.ndarray  # 3x3 pixel -> metres, as in KeyframeHomography
+    image_points: np.ndarray  # (N, 2) left, right, bottom, top of the centre circle, then touchline crossings
+    reprojection_error: float  # Mean px distance of the reprojected markings to line pixels
+    support: float  # Fraction of the fitted ellipse covered by line pixels
+    exact: bool  # Landmarks pinned by halfway line + touchline, not approximated from the ellipse
+    confident: bool
+
+
+class PitchCalibrator:
+    def __init__(self, max_reprojection_px=3.0, min_support=0.6, min_circle_width=0.08,
+                 max_circle_width=0.6, num_candidates=12, band_px=3, pitch_width=68.0):
+        self.max_reprojection_px = max_reprojection_px
+        self.min_support = min_support
+        self.min_circle_width = min_circle_width  # Ellipse width as a fraction of the frame width
+        self.max_circle_width = max_circle_width
+        self.num_candidates = num_candidates
+        self.band_px = band_px  # Line pixels this close to an ellipse are taken as part of it
+        self.pitch_width = pitch_width  # Touchline to touchline, metres
+
+    # --------------------------------------------------------
+    # Line pixels and landmarks
+    # --------------------------------------------------------
+
+    @staticmethod
+    def line_mask(frame):
+        """White pixels on or next to grass"""
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        grass = cv2.inRange(hsv, GREEN_LOWER, GREEN_UPPER)
+        grass = cv2.dilate(grass, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (15, 15)))
+        return cv2.inRange(hsv, WHITE_LOWER, WHITE_UPPER) & grass
+
+    @staticmethod
+    def _segments(lines, min_length):
+        """Long straight markings, each refitted to the centre of its painted line"""
+        segments = cv2.HoughLinesP(lines, 1, np.pi / 180, threshold=60,
+                                   minLineLength=min_length, maxLineGap=10)
+        if segments is None:
+            return np.zeros((0, 4))
+        refined = []
+        for x1, y1, x2, y2 in segments.reshape(-1, 4):
+            band = np.zeros_like(lines)
+            cv2.line(band, (int(x1), int(y1)), (int(x2), int(y2)), 255, 7)
+            points = cv2.findNonZero(lines & band)
+            vx, vy, x0, y0 = cv2.fitLine(points, cv2.DIST_HUBER, 0, 0.01, 0.01).ravel()
+            d, p0 = np.array([vx, vy]), np.array([x0, y0])
+            # Keep the Hough extent, projected onto the refitted line
+            ends = [p0 + ((np.array(p) - p0) @ d) * d for p in ((x1, y1), (x2, y2))]
+            refined.append(np.concatenate(ends))
+        return np.array(refined, dtype=np.float64)
+
+    @staticmethod
+    def _ellipse_points(ellipse, num=72):
+        (cx, cy), (w, h), angle = ellipse
+        t = np.radians(angle)
+        phi = np.linspace(0, 2 * np.pi, num, endpoint=False)
+        u, v = w / 2 * np.cos(phi), h / 2 * np.sin(phi)
+        return np.stack([cx + u * np.cos(t) - v * np.sin(t), cy + u * np.sin(t) + v * np.cos(t)], axis=1)
+
+    @staticmethod
+    def _lookup(distance, points):
+        """Distance-to-line at each point; points outside the frame count as far away"""
+        h, w = distance.shape
+        xi, yi = np.round(points[:, 0]).astype(int), np.round(points[:, 1]).astype(int)
+        inside = (xi >= 0) & (xi < w) & (yi >= 0) & (yi < h)
+        values = np.full(len(points), np.inf)
+        values[inside] = distance[yi[inside], xi[inside]]
+        return values
+
+    def detect_circle(self, lines, distance, segments):
+        """Best centre-circle ellipse as (ellipse, support), or (None, 0)"""
+        frame_w = lines.shape[1]
+        # Straight markings would drag the fit; the circle arcs survive their removal
+        arcs = lines.copy()
+        for x1, y1, x2, y2 in segments.astype(int):
+            cv2.line(arcs, (x1, y1), (x2, y2), 0, 5)
+        contours, _ = cv2.findContours(arcs, cv2.RETR_LIST, cv2.CHAIN_APPROX_NONE)
+
+        best, best_score = None, 0.0
+        for contour in contours:
+            if len(contour) < 30:
+                continue
+            ellipse = cv2.fitEllipse(contour)
+            for _ in range(2):
+                # Regroup every arc lying on this ellipse (the halfway line splits the circle) and refit
+                band = np.zeros_like(arcs)
+                cv2.ellipse(band, ellipse, 255, 2 * self.band_px + 1)
+                points = cv2.findNonZero(arcs & band)
+                if points is None or len(points) < 30:
+                    break
+                ellipse = cv2.fitEllipse(points)
+            (_, _), (w, h), _ = ellipse
+            major, minor = max(w, h), min(w, h)
+            if not (self.min_circle_width * frame_w <= major <= self.max_circle_width * frame_w):
+                continue
+            if minor < 0.1 * major:
+                continue
+            support = float(np.mean(self._lookup(distance, self._ellipse_points(ellipse)) <= 2.0))
+            score = support * major
+            if score > best_score:
+                best, best_score = (ellipse, support), score
+        return best if best is not None else (None, 0.0)
+
+    @staticmethod
+    def _halfway_line(ellipse, segments):
+        """Longest segment through the ellipse centre, crossing its major axis"""
+        (cx, cy), (w, h), angle = ellipse
+        minor = min(w, h)
+        major_dir = np.radians(angle if w >= h else angle + 90)
+        major_vec = np.array([np.cos(major_dir), np.sin(major_dir)])
+        best, best_len = None, 0.0
+        for x1, y1, x2, y2 in segments:
+            d = np.array([x2 - x1, y2 - y1])
+            length = float(np.hypot(*d))
+            if length < minor:
+                continue
+            d /= length
+            # Distance from the ellipse centre to the infinite line
+            offset = abs((cx - x1) * d[1] - (cy - y1) * d[0])
+            if offset > 0.15 * minor or abs(d @ major_vec) > 0.8:
+                continue
+            if length > best_len:
+                best, best_len = (np.array([x1, y1]), d), length
+        return best
+
+    @staticmethod
+    def _ellipse_frame(ellipse):
+        (cx, cy), (w, h), angle = ellipse
+        t = np.radians(angle)
+        e1, e2 = np.array([np.cos(t), np.sin(t)]), np.array([-np.sin(t), np.cos(t)])
+        return np.array([cx, cy]), w / 2, h / 2, e1, e2
+
+    def _extreme_points(self, ellipse, direction):
+        """The two ellipse points furthest along +/- direction"""
+        c, a, b, e1, e2 = self._ellipse_frame(ellipse)
+        phi = np.arctan2(b * (direction @ e2), a * (direction @ e1))
+        p = c + a * np.cos(phi) * e1 + b * np.sin(phi) * e2
+        return p, 2 * c - p
+
+    def _line_intersections(self, ellipse, line):
+        c, a, b, e1, e2 = self._ellipse_frame(ellipse)
+        p0, d = line
+        u0, v0 = (p0 - c) @ e1, (p0 - c) @ e2
+        du, dv = d @ e1, d @ e2
+        qa = du ** 2 / a ** 2 + dv ** 2 / b ** 2
+        qb = 2 * (u0 * du / a ** 2 + v0 * dv / b ** 2)
+        qc = u0 ** 2 / a ** 2 + v0 ** 2 / b ** 2 - 1
+        disc = qb ** 2 - 4 * qa * qc
+        if disc <= 0:
+            return None
+        roots = (-qb + np.array([-1.0, 1.0]) * np.sqrt(disc)) / (2 * qa)
+        return p0 + roots[0] * d, p0 + roots[1] * d
+
+    def _touchline_crossings(self, ellipse, halfway, segments):
+        """
+        Where the nearest long line above / below the circle crosses the halfway line:
+        the images of (0, +half_width) and (0, -half_width). Either can be None.
+        """
+        p0, d = halfway
+        crossings = {}
+        for x1, y1, x2, y2 in segments:
+            e = np.array([x2 - x1, y2 - y1])
+            e /= np.hypot(*e)
+            if abs(e @ d) > 0.7 or self._line_intersections(ellipse, (np.array([x1, y1]), e)) is not None:
+                continue
+            # Solve p0 + s d = q0 + u e for s
+            A = np.array([d, -e]).T
+            if abs(np.linalg.det(A)) < 1e-6:
+                continue
+            s_cross = np.linalg.solve(A, np.array([x1, y1]) - p0)[0]
+            point = p0 + s_cross * d
+            side = "far" if point[1] < ellipse[0][1] else "near"
+            if side not in crossings or abs(point[1] - ellipse[0][1]) < abs(crossings[side][1] - ellipse[0][1]):
+                crossings[side] = point
+        return crossings.get("far"), crossings.get("near")
+
+    def _conic(self, ellipse):
+        c, a, b, e1, e2 = self._ellipse_frame(ellipse)
+        A = np.outer(e1, e1) / a ** 2 + np.outer(e2, e2) / b ** 2
+        C = np.empty((3, 3))
+        C[:2, :2] = A
+        C[:2, 2] = C[2, :2] = -A @ c
+        C[2, 2] = c @ A @ c - 1
+        return C
+
+    def landmarks(self, ellipse, halfway, segments):
+        """
+        Matching (image_points, world_points) and whether they are exact.
+        The circle plus its diameter leave one projective degree of freedom, so the
+        exact solution also needs a touchline crossing the halfway line: the known
+        positions along the halfway line fix the image of the centre spot and the
+        halfway line's vanishing point, whose polar is the centre line through (±R, 0).
+        Otherwise left / right fall back to the ellipse extremes, as in the manual tool.
+        """
+        R = CENTER_CIRCLE_RADIUS
+        half_width = self.pitch_width / 2
+        crossing = self._line_intersections(ellipse, halfway) if halfway is not None else None
+        if crossing is None:
+            top, bottom = self._extreme_points(ellipse, np.array([0.0, -1.0]))
+            left, right = sorted(self._extreme_points(ellipse, np.array([1.0, 0.0])), key=lambda p: p[0])
+            return np.array([left, right, bottom, top]), REAL_WORLD_POINTS.astype(np.float64), False
+
+        p0, d = halfway
+        top, bottom = sorted(crossing, key=lambda p: p[1])
+        image = [bottom, top]
+        world = [(0.0, -R), (0.0, R)]
+        far, near = self._touchline_crossings(ellipse, halfway, segments)
+        for point, y in ((far, half_width), (near, -half_width)):
+            if point is not None:
+                image.append(point)
+                world.append((0.0, y))
+
+        if len(image) >= 3:
+            # 1-D projectivity along the halfway line: world y = (a s + b) / (c s + e), s = image position
+            s = np.array([(p - p0) @ d for p in image])
+            y = np.array([w[1] for w in world])
+            rows = np.stack([s, np.ones_like(s), -y * s, -y], axis=1)
+            a_, b_, c_, e_ = np.linalg.svd(rows)[2][-1]
+            vanishing = np.append(c_ * p0 - e_ * d, c_)  # y = infinity, homogeneous
+            center = p0 + (-b_ / a_) * d  # y = 0
+            axis = self._conic(ellipse) @ vanishing  # Polar line: the image of the centre line
+            ends = self._line_intersections(ellipse, (center, np.array([axis[1], -axis[0]]) / np.hypot(*axis[:2])))
+            exact = ends is not None
+        else:
+            exact, ends = False, None
+        if ends is None:
+            across = np.array([d[1], -d[0]])
+            ends = self._extreme_points(ellipse, across)
+        left, right = sorted(ends, key=lambda p: p[0])
+        image = [left, right] + image
+        world = [(-R, 0.0), (R, 0.0)] + world
+        return np.array(image), np.array(world), exact
+
+    def reprojection_error(self, H, distance):
+        """Mean px distance from the projected circle and halfway line to the line pixels"""
+        phi = np.linspace(0, 2 * np.pi, 72, endpoint=False)
+        ys = np.linspace(-self.pitch_width / 2, self.pitch_width / 2, 48)
+        world = np.concatenate([
+            np.stack([CENTER_CIRCLE_RADIUS * np.cos(phi), CENTER_CIRCLE_RADIUS * np.sin(phi)], axis=1),
+            np.stack([np.zeros_like(ys), ys], axis=1),
+        ]).astype(np.float32)
+        image = cv2.perspectiveTransform(world[None], np.linalg.inv(H))[0]
+        values = self._lookup(distance, image)
+        # Markings projected outside the frame say nothing; the circle must be in view
+        if np.isinf(values[:len(phi)]).mean() > 0.2:
+            return float("inf")
+        return float(np.mean(np.minimum(values[np.isfinite(values)], 50.0)))
+
+    # --------------------------------------------------------
+    # Frames and videos
+    # --------------------------------------------------------
+
+    def calibrate_frame(self, frame, frame_idx=0) -> Optional[CalibrationResult]:
+        lines = self.line_mask(frame)
+        distance = cv2.distanceTransform(255 - lines, cv2.DIST_L2, 3)
+        segments = self._segments(lines, min_length=int(0.2 * min(frame.shape[:2])))
+        ellipse, support = self.detect_circle(lines, distance, segments)
+        if ellipse is None:
+            return None
+        image_points, world_points, exact = self.landmarks(ellipse, self._halfway_line(ellipse, segments), segments)
+        H, _ = cv2.findHomography(image_points.astype(np.float32), world_points.astype(np.float32))
+        if H is None:
+            return None
+        error = self.reprojection_error(H, distance)
+        return CalibrationResult(
+            frame_idx=frame_idx,
+            homography=H,
+            image_points=image_points.astype(np.float32),
+            reprojection_error=error,
+            support=support,
+            exact=exact,
+            confident=exact and error <= self.max_reprojection_px and support >= self.min_support,
+        )
+
+    def calibrate_from_store(self, store, camera_id, frame, frame_idx=0) -> Optional[CalibrationResult]:
+        """
+        Stored calibration of this camera aligned onto the frame, re-scored against
+        its own line pixels like a fresh fit
+        """
+        lines = self.line_mask(frame)
+        stored = store.lookup(camera_id, frame, lines=lines)
+        if stored is None:
+            return None
+        distance = cv2.distanceTransform(255 - lines, cv2.DIST_L2, 3)
+        H = stored.homography
+        error = self.reprojection_error(H, distance)
+        phi = np.linspace(0, 2 * np.pi, 72, endpoint=False)
+        circle = np.stack([CENTER_CIRCLE_RADIUS * np.cos(phi), CENTER_CIRCLE_RADIUS * np.sin(phi)], axis=1)
+        inv = np.linalg.inv(H)
+        support = float(np.mean(self._lookup(distance, cv2.perspectiveTransform(circle[None], inv)[0]) <= self.band_px))
+        return CalibrationResult(
+            frame_idx=frame_idx,
+            homography=H,
+            image_points=cv2.perspectiveTransform(REAL_WORLD_POINTS[None].astype(np.float64), inv)[0].astype(np.float32),
+            reprojection_error=error,
+            support=support,
+            exact=stored.exact,
+            confident=stored.exact and error <= self.max_reprojection_px and support >= self.min_support,
+        )
+
+    def candidate_frames(self, total_frames, skip_ranges=None):
+        """Evenly spread frames, leaving out replays / close-ups"""
+        frames = np.linspace(0, max(0, total_frames - 1), self.num_candidates + 2)[1:-1].astype(int)
+        return [int(f) for f in dict.fromkeys(frames.tolist())
+                if not (skip_ranges and in_ranges(f, skip_ranges))]
+
+    def calibrate_video(self, video_path, candidate_frames=None, skip_ranges=None, store=None, camera_id=None):
+        """
+        CalibrationResult for each candidate frame where a centre circle was found.
+        With a CalibrationStore and camera_id, known views are looked up first and
+        new confident fits are added to the store.
+        """
+        use_store = store is not None and camera_id is not None
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Could not open video: {video_path}")
+        if candidate_frames is None:
+            candidate_frames = self.candidate_frames(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), skip_ranges)
+        results = []
+        for frame_idx in candidate_frames:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            result = self.calibrate_from_store(store, camera_id, frame, frame_idx) if use_store else None
+            if result is None or not result.confident:
+                result = self.calibrate_frame(frame, frame_idx)
+                if use_store and result is not None and result.confident:
+                    store.add(camera_id, frame, result.homography, reprojection_error=result.reprojection_error,
+                              exact=result.exact, source=f"{os.path.basename(video_path)}:{frame_idx}")
+            if result is not None:
+                results.append(result)
+        cap.release()
+        return results
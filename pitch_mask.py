@@ -0,0 +1,123 @@
+"""
+Pitch mask for region-of-interest inference
+Finds the playing surface on a downscaled frame (HSV grass segmentation, closed
+and filled to the convex hull of the largest grass region) and tracks it between
+refreshes by the low-resolution frame shift. The mask gives:
+- a pitch crop for the detector, letterboxed into the usual input size so the
+  pitch is seen at a higher effective resolution
+- an on-pitch test that drops stand / ad-board detections before tracking
+"""
+
+import cv2
+import numpy as np
+
+from shot_classifier import GREEN_LOWER, GREEN_UPPER
+
+
+class PitchMasker:
+    def __init__(self, frame_shape, size=(160, 90), refresh_interval=10, close_px=5,
+                 margin_px=3, head_margin=0.08, min_coverage=0.2, max_roi_fraction=0.9):
+        self.frame_h, self.frame_w = frame_shape[:2]
+        # Everything that changes the crops / filtering; part of the detection cache key
+        self.settings = dict(size=list(size), refresh_interval=refresh_interval, close_px=close_px,
+                             margin_px=margin_px, head_margin=head_margin, min_coverage=min_coverage,
+                             max_roi_fraction=max_roi_fraction)
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (close_px, close_px))
+        self.margin_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2 * margin_px + 1, 2 * margin_px + 1))
+        self.head_margin = head_margin  # Crop extends above the pitch by this fraction of the frame height
+        self.min_coverage = min_coverage
+        self.max_roi_fraction = max_roi_fraction
+
+        self.mask = None
+        self.prev_gray = None
+        self.last_frame = None
+        self.last_refresh = None
+        self.refreshes = 0
+
+    def _pitch_region(self, grass):
+        """Convex hull of the largest closed grass region, or None if there is no pitch"""
+        closed = cv2.morphologyEx(grass, cv2.MORPH_CLOSE, self.kernel)
+        n, labels, stats, _ = cv2.connectedComponentsWithStats(closed)
+        if n <= 1:
+            return None
+        largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+        if stats[largest, cv2.CC_STAT_AREA] < self.min_coverage * grass.size:
+            return None
+        points = cv2.findNonZero((labels == largest).astype(np.uint8))
+        mask = np.zeros_like(grass)
+        cv2.fillConvexPoly(mask, cv2.convexHull(points), 255)
+        return cv2.dilate(mask, self.margin_kernel)
+
+    def update(self, frame_idx, frame, small=None, force_refresh=False):
+        """
+        Mask for this frame, at the downscaled size (None = no pitch found).
+        `small` is the frame already downscaled to `size`, if the caller has it.
+        """
+        if small is None:
+            small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = np.float32(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+
+        refresh = (
+            force_refresh or self.mask is None or self.last_frame != frame_idx - 1
+            or frame_idx - self.last_refresh >= self.refresh_interval
+        )
+        if refresh:
+            grass = cv2.inRange(cv2.cvtColor(small, cv2.COLOR_BGR2HSV), GREEN_LOWER, GREEN_UPPER)
+            self.mask = self._pitch_region(grass)
+            self.last_refresh = frame_idx
+            self.refreshes += 1
+        elif self.mask is not None:
+            # Shift the mask with the camera instead of re-segmenting
+            (dx, dy), _ = cv2.phaseCorrelate(self.prev_gray, gray)
+            shift = np.float32([[1, 0, dx], [0, 1, dy]])
+            self.mask = cv2.warpAffine(self.mask, shift, self.size, flags=cv2.INTER_NEAREST,
+                                       borderMode=cv2.BORDER_REPLICATE)
+        self.prev_gray = gray
+        self.last_frame = frame_idx
+        return self.mask
+
+    def roi(self, mask):
+        """Full-resolution (x1, y1, x2, y2) crop around the pitch, or None when cropping gains nothing"""
+        if mask is None:
+            return None
+        points = cv2.findNonZero(mask)
+        if points is None:
+            return None
+        x, y, w, h = cv2.boundingRect(points)
+        sx, sy = self.frame_w / self.size[0], self.frame_h / self.size[1]
+        x1 = int(x * sx)
+        x2 = min(self.frame_w, int(np.ceil((x + w) * sx)))
+        y1 = max(0, int(y * sy - self.head_margin * self.frame_h))
+        y2 = min(self.frame_h, int(np.ceil((y + h) * sy)))
+        if (x2 - x1) * (y2 - y1) > self.max_roi_fraction * self.frame_w * self.frame_h:
+            return None
+        return x1, y1, x2, y2
+
+    def on_pitch(self, mask, xyxy):
+        """Boolean per box: is its foot point inside the pitch mask"""
+        if mask is None or len(xyxy) == 0:
+            return np.ones(len(xyxy), dtype=bool)
+        xyxy = np.asarray(xyxy).reshape(-1, 4)
+        fx = ((xyxy[:, 0] + xyxy[:, 2]) * 0.5 * self.size[0] / self.frame_w).astype(np.int32)
+        fy = (xyxy[:, 3] * self.size[1] / self.frame_h).astype(np.int32)
+        fx = np.clip(fx, 0, self.size[0] - 1)
+        fy = np.clip(fy, 0, self.size[1] - 1)
+        return mask[fy, fx] > 0
+
+
+def letterbox_crop(frame, roi, input_size, pad_value=114):
+    """
+    Crop `roi` from the frame and fit it into input_size with a uniform scale.
+    Returns (image, (scale, offset_x, offset_y)) so that full = input * scale + offset.
+    """
+    in_w, in_h = input_size
+    x1, y1, x2, y2 = roi
+    crop = frame[y1:y2, x1:x2]
+    s = min(in_w / crop.shape[1], in_h / crop.shape[0])
+    new_w, new_h = max(1, int(round(crop.shape[1] * s))), max(1, int(round(crop.shape[0] * s)))
+    image = np.full((in_h, in_w, 3), pad_value, dtype=frame.dtype)
+    pad_x, pad_y = (in_w - new_w) // 2, (in_h - new_h) // 2
+    image[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(crop, (new_w, new_h))
+    return image, (1.0 / s, x1 - pad_x / s, y1 - pad_y / s)
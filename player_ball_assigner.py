@@ -28,7 +28,8 @@ def assign_ball_to_players(
         return None
 
     ball_info = tracks["ball"][frame_idx].get("ball")
-    if not ball_info:
+    # Motion-model predictions are not observations of the ball, so nobody possesses them
+    if not ball_info or ball_info.get("predicted"):
         return None
 
     # Prefer camera-adjusted position if available
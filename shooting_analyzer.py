@@ -52,9 +52,11 @@ class ShootingAnalyzer:
         
         self.shot_events: List[ShotEvent] = []
 
-    def analyze_tracks(self, tracks: Dict) -> Dict:
+    def analyze_tracks(self, tracks: Dict, ball_trajectory=None) -> Dict:
         """
         Scan tracks for shooting events.
+        With a BallTrajectory, ball position and velocity come from the reconstructed
+        trajectory instead of the holder's position.
         """
         self.shot_events = []
         player_stats = {}
@@ -64,7 +66,7 @@ class ShootingAnalyzer:
             return {"shot_events": [], "player_shooting_stats": {}}
 
         # 1. Identify ball velocity and holder history
-        ball_history = self._get_ball_history(tracks, frame_indices)
+        ball_history = self._get_ball_history(tracks, frame_indices, ball_trajectory)
         
         # 2. Detect spikes and attribute to last holder
         for i in range(1, len(frame_indices)):
@@ -74,13 +76,19 @@ class ShootingAnalyzer:
             curr_ball = ball_history.get(curr_frame)
             prev_ball = ball_history.get(prev_frame)
             
-            if not curr_ball or not prev_ball or not curr_ball['pos'] or not prev_ball['pos']:
-                continue
-                
-            # Calculate instantaneous velocity
-            dist = math.sqrt((curr_ball['pos'][0] - prev_ball['pos'][0])**2 + 
-                             (curr_ball['pos'][1] - prev_ball['pos'][1])**2)
-            velocity = dist * self.fps
+            if ball_trajectory is not None:
+                # Smoothed ball velocity, O(1) per frame
+                velocity = ball_trajectory.speed(curr_frame)
+                if velocity is None or not curr_ball or not curr_ball['pos']:
+                    continue
+            else:
+                if not curr_ball or not prev_ball or not curr_ball['pos'] or not prev_ball['pos']:
+                    continue
+                    
+                # Calculate instantaneous velocity
+                dist = math.sqrt((curr_ball['pos'][0] - prev_ball['pos'][0])**2 + 
+                                 (curr_ball['pos'][1] - prev_ball['pos'][1])**2)
+                velocity = dist * self.fps
             
             # If spike detected and ball was not just held
             if velocity > self.shot_velocity_threshold and not curr_ball['held']:
@@ -103,7 +111,7 @@ class ShootingAnalyzer:
             "player_shooting_stats": player_stats
         }
 
-    def _get_ball_history(self, tracks: Dict, frame_indices: List[int]) -> Dict:
+    def _get_ball_history(self, tracks: Dict, frame_indices: List[int], ball_trajectory=None) -> Dict:
         history = {}
         for f in frame_indices:
             ball_info = {"pos": None, "held": False, "holder": None, "team": None}
@@ -116,10 +124,11 @@ class ShootingAnalyzer:
                         ball_info["team"] = info.get("team_id")
                         ball_info["pos"] = info.get("position_transformed")
                         break
-            # Fallback to pure ball track if available (though pipeline uses 'has_ball' on players)
-            if not ball_info["pos"]:
-                 # Search for ball object if separate
-                 pass
+            # The reconstructed ball trajectory beats the holder's position when available
+            if ball_trajectory is not None:
+                ball_pos = ball_trajectory.position(f)
+                if ball_pos is not None:
+                    ball_info["pos"] = ball_pos
             history[f] = ball_info
         return history
 
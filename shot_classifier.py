@@ -0,0 +1,82 @@
+"""
+Shot boundary and wide-view classification
+Cheap per-frame test on a downscaled frame that tells tactical (wide pitch view)
+footage apart from replays, close-ups and crowd shots:
+- a shot boundary is a large hue/saturation histogram change between frames
+- a shot is tactical while its running pitch-green ratio stays high enough
+"""
+
+import bisect
+
+import cv2
+import numpy as np
+
+
+# HSV range of grass (OpenCV hue is 0-179)
+GREEN_LOWER = np.array([35, 40, 40], dtype=np.uint8)
+GREEN_UPPER = np.array([85, 255, 255], dtype=np.uint8)
+
+
+class ShotClassifier:
+    def __init__(self, size=(160, 90), cut_threshold=0.45, min_green_ratio=0.35,
+                 hysteresis=0.05, hist_bins=16):
+        self.size = size
+        self.cut_threshold = cut_threshold
+        self.min_green_ratio = min_green_ratio
+        self.hysteresis = hysteresis
+        self.hist_bins = hist_bins
+
+        self.prev_hist = None
+        self.shot_start = None
+        self.shot_green_sum = 0.0
+        self.shot_frames = 0
+        self.tactical = True
+        self.cuts = 0
+        self.small = None  # Last downscaled frame, shared with the pitch masker
+
+    def update(self, frame_idx, frame):
+        """Classify one frame; returns True for tactical (wide view) footage."""
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        self.small = small
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        green_ratio = float(np.count_nonzero(cv2.inRange(hsv, GREEN_LOWER, GREEN_UPPER))) / (
+            self.size[0] * self.size[1])
+        hist = cv2.calcHist([hsv], [0, 1], None, [self.hist_bins, self.hist_bins], [0, 180, 0, 256])
+        cv2.normalize(hist, hist, 1.0, 0.0, cv2.NORM_L1)
+
+        is_cut = self.prev_hist is None or cv2.compareHist(
+            self.prev_hist, hist, cv2.HISTCMP_BHATTACHARYYA) > self.cut_threshold
+        self.prev_hist = hist
+        if is_cut:
+            if self.shot_start is not None:
+                self.cuts += 1
+            self.shot_start = frame_idx
+            self.shot_green_sum = 0.0
+            self.shot_frames = 0
+
+        self.shot_green_sum += green_ratio
+        self.shot_frames += 1
+        shot_green = self.shot_green_sum / self.shot_frames
+
+        # Hysteresis keeps a zoom-in or crowd pan from flickering the label
+        if is_cut:
+            self.tactical = shot_green >= self.min_green_ratio
+        elif self.tactical:
+            self.tactical = shot_green >= self.min_green_ratio - self.hysteresis
+        else:
+            self.tactical = shot_green >= self.min_green_ratio + self.hysteresis
+        return self.tactical
+
+
+def add_frame_to_ranges(ranges, frame_idx):
+    """Append frame_idx to a list of [start, end) ranges built in frame order."""
+    if ranges and ranges[-1][1] == frame_idx:
+        ranges[-1][1] = frame_idx + 1
+    else:
+        ranges.append([frame_idx, frame_idx + 1])
+
+
+def in_ranges(frame_idx, ranges):
+    """True if frame_idx falls into one of the sorted [start, end) ranges."""
+    pos = bisect.bisect_right(ranges, [frame_idx, float("inf")]) - 1
+    return pos >= 0 and ranges[pos][0] <= frame_idx < ranges[pos][1]
@@ -1,3 +1,4 @@
+import bisect
 import cv2
 import numpy as np
 import os
@@ -73,16 +74,40 @@ def select_circle_points(video_path, frame_idx):
     cv2.destroyAllWindows()
     return points
 
+def _normalized(H):
+    return H / H[2, 2]
+
+
+def _apply_homography(H, point):
+    """Pixel [x, y] → [X, Y] through a 3x3 homography"""
+    p = np.array([[point[0], point[1], 1.0]])
+    mapped = H @ p.T
+    mapped /= mapped[2]
+    return [mapped[0][0], mapped[1][0]]
+
+
+def _apply_homographies(H, points):
+    """Pixel points (N, 2) → (N, 2) through one 3x3 homography or one per point (N, 3, 3)"""
+    homogeneous = np.column_stack([points, np.ones(len(points))])
+    if H.ndim == 2:
+        mapped = homogeneous @ H.T
+    else:
+        mapped = np.einsum("nij,nj->ni", H, homogeneous)
+    return mapped[:, :2] / mapped[:, 2:]
+
+
 class KeyframeHomography:
     """
     Handles:
     - Storing homography matrices at keyframes
-    - Interpolating homographies between frames
+    - Interpolating homographies between frames, or a per-frame chain built from camera motion
     - Transforming pixel points → real-world meters
     """
 
     def __init__(self):
         self.keyframes = {}  # frame_idx -> 3x3 homography matrix
+        self.frame_homographies = None  # (num_frames, 3, 3) from build_frame_homographies
+        self._sorted_keys = None  # sorted(self.keyframes), rebuilt when keyframes change
 
     def add_keyframe(self, frame_idx, image_points):
         """
@@ -90,10 +115,86 @@ class KeyframeHomography:
         """
         image_points = np.array(image_points, dtype=np.float32)
         H, _ = cv2.findHomography(image_points, REAL_WORLD_POINTS)
+        self.set_keyframe(frame_idx, H)
+
+    def set_keyframe(self, frame_idx, H):
+        """Keyframe from a ready pixel → metre homography (automatic or stored calibration)"""
         self.keyframes[frame_idx] = H
+        self._sorted_keys = None
+
+    def _keys(self):
+        if self._sorted_keys is None or len(self._sorted_keys) != len(self.keyframes):
+            self._sorted_keys = sorted(self.keyframes)
+        return self._sorted_keys
+
+    def build_frame_homographies(self, camera_matrices, num_frames=None):
+        """
+        Precompute one homography per frame by chaining the frame-to-frame camera
+        motion (camera_matrices[t] maps frame t-1 pixels to frame t) onto the keyframes.
+        Each keyframe is carried forward and backward; between two keyframes the two
+        chains are blended linearly, so drift is pulled back to zero at each keyframe.
+        NaN motion (cuts, replays) stops a chain; frames no chain reaches use the
+        nearest keyframe.
+        """
+        motion = np.asarray(camera_matrices, dtype=np.float64).reshape(-1, 3, 3)
+        n = len(motion) if num_frames is None else int(num_frames)
+        keys = [k for k in sorted(self.keyframes) if 0 <= k < n]
+        if not keys:
+            raise ValueError("❌ No keyframe inside the video for the homography chain")
+        valid = np.zeros(n, dtype=bool)
+        valid[:len(motion)] = ~np.isnan(motion[:n]).any(axis=(1, 2))
+
+        forward = np.full((n, 3, 3), np.nan)
+        backward = np.full((n, 3, 3), np.nan)
+        forward_key = np.full(n, -1)
+        backward_key = np.full(n, -1)
+        for i, key in enumerate(keys):
+            H = _normalized(self.keyframes[key])
+            prev_key = keys[i - 1] if i > 0 else -1
+            next_key = keys[i + 1] if i + 1 < len(keys) else n
+
+            # Forward: pitch = H(t-1) @ prev_pixel = H(t-1) @ inv(M_t) @ pixel
+            forward[key], backward[key] = H, H
+            forward_key[key] = backward_key[key] = key
+            H_t = H
+            for t in range(key + 1, next_key):
+                if not valid[t]:
+                    break
+                H_t = _normalized(H_t @ np.linalg.inv(motion[t]))
+                forward[t], forward_key[t] = H_t, key
+            # Backward: H(t-1) = H(t) @ M_t
+            H_t = H
+            for t in range(key - 1, prev_key, -1):
+                if not valid[t + 1]:
+                    break
+                H_t = _normalized(H_t @ motion[t + 1])
+                backward[t], backward_key[t] = H_t, key
+
+        result = np.empty((n, 3, 3))
+        has_forward = forward_key >= 0
+        has_backward = backward_key >= 0
+        both = has_forward & has_backward
+        span = np.maximum(backward_key - forward_key, 1)
+        alpha = ((np.arange(n) - forward_key) / span)[:, None, None]
+        result[both] = ((1 - alpha) * forward + alpha * backward)[both]
+        result[has_forward & ~both] = forward[has_forward & ~both]
+        result[has_backward & ~both] = backward[has_backward & ~both]
+        unreached = ~(has_forward | has_backward)
+        if unreached.any():
+            key_array = np.array(keys)
+            nearest = key_array[np.abs(np.flatnonzero(unreached)[:, None] - key_array).argmin(axis=1)]
+            result[unreached] = np.array([_normalized(self.keyframes[k]) for k in nearest])
+
+        self.frame_homographies = result
+        print(f"✅ Homography chain: {n} frames, {len(keys)} keyframes,"
+              f" {int(unreached.sum())} frames on the nearest keyframe only")
+        return result
 
     def get_homography(self, frame_idx):
-        keys = sorted(self.keyframes.keys())
+        if self.frame_homographies is not None and 0 <= frame_idx < len(self.frame_homographies):
+            return self.frame_homographies[frame_idx]
+
+        keys = self._keys()
 
         if frame_idx <= keys[0]:
             return self.keyframes[keys[0]]
@@ -101,21 +202,39 @@ class KeyframeHomography:
         if frame_idx >= keys[-1]:
             return self.keyframes[keys[-1]]
 
-        for i in range(len(keys) - 1):
-            f1, f2 = keys[i], keys[i + 1]
-            if f1 <= frame_idx <= f2:
-                alpha = (frame_idx - f1) / (f2 - f1)
-                return (1 - alpha) * self.keyframes[f1] + alpha * self.keyframes[f2]
+        i = bisect.bisect_right(keys, frame_idx)
+        f1, f2 = keys[i - 1], keys[i]
+        alpha = (frame_idx - f1) / (f2 - f1)
+        return (1 - alpha) * self.keyframes[f1] + alpha * self.keyframes[f2]
 
     def transform_point(self, point, frame_idx):
         """
         Convert pixel [x, y] → real-world [X, Y] in meters
         """
-        H = self.get_homography(frame_idx)
-        p = np.array([[point[0], point[1], 1.0]])
-        mapped = H @ p.T
-        mapped /= mapped[2]
-        return [mapped[0][0], mapped[1][0]]
+        return _apply_homography(self.get_homography(frame_idx), point)
+
+    def transform_points(self, points, frame_indices, chunk_size=1 << 18):
+        """
+        Convert pixel points (N, 2) → real-world (N, 2) in meters.
+        frame_indices is one frame for all points or one per point; the matrix of
+        each distinct frame is looked up once and points are mapped in chunks.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        frames = np.asarray(frame_indices)
+        if frames.ndim == 0:
+            return _apply_homographies(np.asarray(self.get_homography(int(frames)), dtype=np.float64), points)
+
+        unique, inverse = np.unique(frames, return_inverse=True)
+        chain = self.frame_homographies
+        if chain is not None and len(unique) and unique[0] >= 0 and unique[-1] < len(chain):
+            matrices = chain[unique]
+        else:
+            matrices = np.array([self.get_homography(int(f)) for f in unique], dtype=np.float64)
+        result = np.empty_like(points)
+        for lo in range(0, len(points), chunk_size):
+            hi = lo + chunk_size
+            result[lo:hi] = _apply_homographies(matrices[inverse[lo:hi]], points[lo:hi])
+        return result
 
 
 # ============================================================
@@ -126,7 +245,10 @@ def apply_homography_to_tracks(tracks, homography_manager):
     """
     Adds 'position_transformed' (meters) to each track.
     Using Bottom-Center (Feet) logic to fix perspective error.
+    The foot points of the whole match are gathered into one (N, 2) array and
+    transformed in a single batch, with one matrix lookup per frame.
     """
+    track_infos, pixel_points, frame_indices = [], [], []
     for object_name, object_tracks in tracks.items():
         if object_name in ["referees"]:
             continue
@@ -148,8 +270,17 @@ def apply_homography_to_tracks(tracks, homography_manager):
                 if pixel_pos is None:
                     continue
 
-                real_pos = homography_manager.transform_point(pixel_pos, frame_idx)
-                track_info["position_transformed"] = real_pos
+                track_infos.append(track_info)
+                pixel_points.append(pixel_pos[:2])
+                frame_indices.append(frame_idx)
+
+    if not track_infos:
+        return
+    real_positions = homography_manager.transform_points(
+        np.array(pixel_points, dtype=np.float64), np.array(frame_indices)
+    )
+    for track_info, real_pos in zip(track_infos, real_positions.tolist()):
+        track_info["position_transformed"] = real_pos
 
 
 # ============================================================
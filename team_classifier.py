@@ -122,23 +122,29 @@ class SiglipTeamClassifier:
             self.model = None
             self.siglip_available = False
 
-    def _prepare_input(self, crop: np.ndarray):
+    def _prepare_input(self, crops: List[np.ndarray]):
         if not self.siglip_available or self.processor is None:
             return None
-        rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+        rgb = [cv2.cvtColor(crop, cv2.COLOR_BGR2RGB) for crop in crops]
         return self.processor(images=rgb, return_tensors="pt").to(self.device)
 
     def _extract_embedding(self, frame: np.ndarray, bbox: Tuple[int, int, int, int]) -> Optional[np.ndarray]:
+        return self.extract_embeddings(frame, [bbox])[0]
+
+    def extract_embeddings(self, frame: np.ndarray, bboxes: List[Tuple[int, int, int, int]]) -> List[Optional[np.ndarray]]:
+        """Embed the torso crops of several boxes of one frame in a single SigLIP forward pass."""
         if not self.siglip_available or self.model is None:
             # Fallback: use simple color-based feature
-            return self._extract_color_feature(frame, bbox)
-        
-        crop = _torso_crop(frame, bbox, padding=4)
-        if crop is None:
-            return None
-        inputs = self._prepare_input(crop)
+            return [self._extract_color_feature(frame, bbox) for bbox in bboxes]
+
+        crops = [_torso_crop(frame, bbox, padding=4) for bbox in bboxes]
+        valid = [i for i, crop in enumerate(crops) if crop is not None]
+        embeddings: List[Optional[np.ndarray]] = [None] * len(bboxes)
+        if not valid:
+            return embeddings
+        inputs = self._prepare_input([crops[i] for i in valid])
         if inputs is None:
-            return self._extract_color_feature(frame, bbox)
+            return [self._extract_color_feature(frame, bbox) for bbox in bboxes]
         with torch.no_grad():
             # Transformers versions differ: some return Tensor, others return output objects.
             try:
@@ -154,14 +160,15 @@ class SiglipTeamClassifier:
             emb_t = out.pooler_output
         else:
             # Last resort: fallback to color features if the output is unexpected
-            return self._extract_color_feature(frame, bbox)
+            return [self._extract_color_feature(frame, bbox) for bbox in bboxes]
 
-        emb = emb_t.detach().cpu().numpy().flatten()
+        embs = emb_t.detach().cpu().numpy().reshape(len(valid), -1)
         # L2 normalize for cosine-like separation
-        norm = np.linalg.norm(emb)
-        if norm > 0:
-            emb = emb / norm
-        return emb
+        norms = np.linalg.norm(embs, axis=1, keepdims=True)
+        embs = np.where(norms > 0, embs / np.maximum(norms, 1e-12), embs)
+        for row, i in enumerate(valid):
+            embeddings[i] = embs[row]
+        return embeddings
     
     def _extract_color_feature(self, frame: np.ndarray, bbox: Tuple[int, int, int, int]) -> np.ndarray:
         """Fallback color-based feature extraction"""
@@ -188,9 +195,11 @@ class SiglipTeamClassifier:
         
         return feature
 
-    def add_sample(self, frame: np.ndarray, bbox: Tuple[int, int, int, int], track_id: int):
+    def add_sample(self, frame: np.ndarray, bbox: Tuple[int, int, int, int], track_id: int,
+                   embedding: Optional[np.ndarray] = None):
+        # embedding: precomputed crop embedding (e.g. from CropFeatureService) to skip extraction
         self.frame_count += 1
-        emb = self._extract_embedding(frame, bbox)
+        emb = embedding if embedding is not None else self._extract_embedding(frame, bbox)
         if emb is None:
             return
         # KMeans expects float64; enforce dtype to avoid buffer mismatch errors
@@ -217,11 +226,12 @@ class SiglipTeamClassifier:
                 self.track_team[track_id] = int(lbl)
         print("[Team/SigLIP] Clustering ready.")
 
-    def predict(self, frame: np.ndarray, bbox: Tuple[int, int, int, int], track_id: int, smooth_window: int = 8) -> Optional[int]:
+    def predict(self, frame: np.ndarray, bbox: Tuple[int, int, int, int], track_id: int, smooth_window: int = 8,
+                embedding: Optional[np.ndarray] = None) -> Optional[int]:
         if self.kmeans is None or self.pca is None:
             return self.track_team.get(track_id)
 
-        emb = self._extract_embedding(frame, bbox)
+        emb = embedding if embedding is not None else self._extract_embedding(frame, bbox)
         if emb is None:
             return self.track_team.get(track_id)
 
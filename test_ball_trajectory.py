@@ -0,0 +1,95 @@
+
+import unittest
+import numpy as np
+
+from ball_trajectory import BallTrajectoryReconstructor
+
+FPS = 25
+
+
+def ball_tracks(positions, pitch_scale=None):
+    """{frame: (x, y)} -> tracks["ball"]; pitch position = pixel * pitch_scale when given"""
+    ball = {}
+    for frame_idx, (x, y) in positions.items():
+        info = {"position": (float(x), float(y)), "position_transformed": None}
+        if pitch_scale is not None:
+            info["position_transformed"] = (x * pitch_scale, y * pitch_scale)
+        ball[frame_idx] = {"ball": info}
+    return {"ball": ball}
+
+
+def line(frames, start=(100.0, 200.0), velocity=(5.0, -2.0)):
+    return {f: (start[0] + velocity[0] * f, start[1] + velocity[1] * f) for f in frames}
+
+
+class TestBallTrajectory(unittest.TestCase):
+    def setUp(self):
+        self.reconstructor = BallTrajectoryReconstructor(fps=FPS)
+
+    def test_empty_input(self):
+        trajectory = self.reconstructor.build({"ball": {}})
+        self.assertEqual(len(trajectory), 0)
+        trajectory = self.reconstructor.build({}, num_frames=10)
+        self.assertEqual(len(trajectory), 10)
+        self.assertEqual(trajectory.summary(), {"frames": 0, "measured": 0, "interpolated": 0, "rejected": 0})
+        self.assertIsNone(trajectory.position(3, pitch=False))
+
+    def test_gaps_inside_a_segment_are_filled(self):
+        positions = line([f for f in range(30) if f not in (10, 11, 12)])
+        trajectory = self.reconstructor.build(ball_tracks(positions), num_frames=30)
+        self.assertEqual(trajectory.summary(), {"frames": 30, "measured": 27, "interpolated": 3, "rejected": 0})
+        expected = line([11])[11]
+        np.testing.assert_allclose(trajectory.position(11, pitch=False), expected, atol=0.5)
+        # Velocity in px/s
+        np.testing.assert_allclose(trajectory.velocity(20, pitch=False), (5.0 * FPS, -2.0 * FPS), atol=2.0)
+        self.assertAlmostEqual(trajectory.speed(20, pitch=False), np.hypot(5.0, 2.0) * FPS, delta=2.0)
+
+    def test_outlier_is_rejected(self):
+        positions = line(range(30))
+        positions[15] = (positions[15][0] + 150.0, positions[15][1] - 80.0)
+        trajectory = self.reconstructor.build(ball_tracks(positions), num_frames=30)
+        self.assertTrue(trajectory.rejected[15])
+        self.assertFalse(trajectory.measured[15])
+        self.assertEqual(int(trajectory.rejected.sum()), 1)
+        np.testing.assert_allclose(trajectory.position(15, pitch=False), line([15])[15], atol=1.0)
+
+    def test_consecutive_off_model_detections_restart_the_filter(self):
+        # A kick at frame 15: the ball leaves on a new line
+        positions = line(range(15))
+        kick_start = positions[14]
+        positions.update({f: (kick_start[0] - 25.0 * (f - 14), kick_start[1] + 60.0 + 20.0 * (f - 14))
+                          for f in range(15, 30)})
+        trajectory = self.reconstructor.build(ball_tracks(positions), num_frames=30)
+        # Two rejections, then the third disagreeing detection restarts the filter
+        self.assertEqual(np.flatnonzero(trajectory.rejected).tolist(), [15, 16])
+        self.assertTrue(trajectory.measured[17:].all())
+        np.testing.assert_allclose(trajectory.position(25, pitch=False), positions[25], atol=1.0)
+        np.testing.assert_allclose(trajectory.velocity(25, pitch=False), (-25.0 * FPS, 20.0 * FPS), atol=5.0)
+        # The smoother does not blend across the restart
+        np.testing.assert_allclose(trajectory.position(10, pitch=False), positions[10], atol=1.0)
+
+    def test_long_gap_splits_segments(self):
+        max_gap = self.reconstructor.max_gap_frames
+        frames = list(range(10)) + list(range(10 + max_gap + 5, 30 + max_gap))
+        trajectory = self.reconstructor.build(ball_tracks(line(frames)), num_frames=30 + max_gap)
+        gap = np.arange(10, 10 + max_gap + 5)
+        self.assertTrue(np.isnan(trajectory.pixel[gap]).all())
+        self.assertFalse(np.isnan(trajectory.pixel[frames]).any())
+        # A gap of exactly max_gap_frames missing frames is still filled
+        frames = list(range(10)) + list(range(10 + max_gap, 20 + max_gap))
+        trajectory = self.reconstructor.build(ball_tracks(line(frames)), num_frames=20 + max_gap)
+        self.assertEqual(trajectory.summary()["interpolated"], max_gap)
+
+    def test_pitch_positions_and_predicted_entries(self):
+        tracks = ball_tracks(line(range(20)), pitch_scale=0.1)
+        # Predictions are not measurements
+        tracks["ball"][20] = {"ball": {"position": (0.0, 0.0), "position_transformed": None, "predicted": True}}
+        trajectory = self.reconstructor.build(tracks, num_frames=21)
+        self.assertEqual(trajectory.summary()["measured"], 20)
+        self.assertIsNone(trajectory.position(20, pitch=False))
+        np.testing.assert_allclose(trajectory.position(10), np.array(line([10])[10]) * 0.1, atol=0.1)
+        np.testing.assert_allclose(trajectory.velocity(10), (0.5 * FPS, -0.2 * FPS), atol=0.3)
+
+
+if __name__ == '__main__':
+    unittest.main()
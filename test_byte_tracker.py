@@ -0,0 +1,90 @@
+
+import unittest
+
+from byte_tracker import ByteTracker
+
+
+def det(left, top, conf, cls=2, w=20, h=40):
+    return [[left, top, w, h], conf, cls]
+
+
+class TestByteTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = ByteTracker(max_age=5, n_init=3)
+
+    def walk(self, frames, conf=0.9, start=100, step=4):
+        # One player walking right, seen on `frames` consecutive updates
+        tracks = None
+        for k in range(frames):
+            tracks = self.tracker.update_tracks([det(start + step * k, 200, conf)])
+        return tracks
+
+    def test_track_is_confirmed_after_n_init_hits(self):
+        tracks = self.walk(1)
+        self.assertEqual(len(tracks), 1)
+        self.assertTrue(tracks[0].is_tentative())
+        tracks = self.walk(3)
+        self.assertEqual([t.track_id for t in tracks], ["1"])
+        self.assertTrue(tracks[0].is_confirmed())
+        self.assertEqual(tracks[0].det_class, 2)
+
+    def test_low_confidence_detection_never_starts_a_track(self):
+        self.assertEqual(self.tracker.update_tracks([det(100, 200, 0.3)]), [])
+
+    def test_low_confidence_detection_keeps_a_recent_track(self):
+        track = self.walk(4)[0]
+        # Occluded: only a low-score box, close to the prediction
+        tracks = self.tracker.update_tracks([det(116, 200, 0.3)])
+        self.assertEqual(tracks, [track])
+        self.assertEqual(track.time_since_update, 0)
+        self.assertAlmostEqual(track.det_conf, 0.3, places=6)
+
+    def test_detections_below_low_thresh_are_ignored(self):
+        track = self.walk(4)[0]
+        self.tracker.update_tracks([det(116, 200, 0.05)])
+        self.assertEqual(track.time_since_update, 1)
+        # Just above it, the same box keeps a recent track
+        self.tracker = ByteTracker(max_age=5, n_init=3, low_thresh=0.1)
+        track = self.walk(4)[0]
+        self.tracker.update_tracks([det(116, 200, 0.15)])
+        self.assertEqual(track.time_since_update, 0)
+
+    def test_low_confidence_detection_does_not_revive_a_missed_track(self):
+        track = self.walk(4)[0]
+        self.tracker.update_tracks([])
+        self.tracker.update_tracks([det(120, 200, 0.3)])
+        self.assertEqual(track.time_since_update, 2)
+
+    def test_tentative_track_matches_remaining_high_detections(self):
+        self.walk(4)
+        # A second player appears; its first two frames are only matched in the tentative stage
+        self.tracker.update_tracks([det(116, 200, 0.9), det(400, 200, 0.9)])
+        tracks = self.tracker.update_tracks([det(120, 200, 0.9), det(402, 200, 0.9)])
+        self.assertEqual(sorted(t.track_id for t in tracks), ["1", "2"])
+        tracks = self.tracker.update_tracks([det(124, 200, 0.9), det(404, 200, 0.9)])
+        self.assertTrue(all(t.is_confirmed() for t in tracks))
+
+    def test_missed_tracks_are_deleted(self):
+        self.walk(1)
+        self.assertEqual(self.tracker.update_tracks([]), [])  # Tentative: dropped at the first miss
+        self.walk(4)
+        for _ in range(5):
+            self.assertEqual(len(self.tracker.update_tracks([])), 1)
+        self.assertEqual(self.tracker.update_tracks([]), [])  # Confirmed: dropped after max_age
+
+    def test_ids_are_not_reused(self):
+        self.walk(4)
+        for _ in range(6):
+            self.tracker.update_tracks([])
+        tracks = self.walk(1, start=500)
+        self.assertEqual([t.track_id for t in tracks], ["2"])
+
+    def test_zero_size_boxes_are_ignored(self):
+        tracks = self.tracker.update_tracks([det(100, 200, 0.9, w=0), det(300, 200, 0.9)],
+                                            others=["empty", "player"])
+        self.assertEqual(len(tracks), 1)
+        self.assertEqual(tracks[0].get_det_supplementary(), "player")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+
+import os
+import tempfile
+import time
+import unittest
+import cv2
+import numpy as np
+
+from calibration_store import CalibrationStore, frame_dhash, hamming_distances, pitch_pixel_vertices
+from test_pitch_calibration import pitch_camera, render_pitch, world_error
+
+
+def noise_frame(seed):
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, (9, 16, 3), dtype=np.uint8)
+    return cv2.resize(small, (1280, 720), interpolation=cv2.INTER_NEAREST)
+
+
+class TestCalibrationStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CalibrationStore(os.path.join(self.tmp.name, "calibrations"))
+        self.G = pitch_camera()
+        self.frame = render_pitch(self.G)
+        self.H = np.linalg.inv(self.G)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_dhash(self):
+        self.assertEqual(frame_dhash(self.frame), frame_dhash(self.frame.copy()))
+        self.assertEqual(hamming_distances([frame_dhash(self.frame)], frame_dhash(self.frame)).tolist(), [0])
+        self.assertEqual(hamming_distances(np.array([0b1011], dtype=np.uint64), 0b0001).tolist(), [2])
+
+    def test_pixel_vertices(self):
+        vertices = pitch_pixel_vertices(self.H)
+        corners = cv2.perspectiveTransform(np.float64([[[-52.5, -34], [52.5, -34], [52.5, 34], [-52.5, 34]]]), self.G)[0]
+        np.testing.assert_allclose(vertices, corners, atol=1e-2)
+
+    def test_round_trip(self):
+        entry_id = self.store.add("rig", self.frame, self.H, reprojection_error=0.5)
+        self.assertIsNotNone(entry_id)
+        # A fresh store reads the index back from disk
+        stored = CalibrationStore(self.store.store_dir).lookup("rig", self.frame)
+        self.assertEqual(stored.entry_id, entry_id)
+        self.assertEqual(stored.hash_distance, 0)
+        self.assertGreater(stored.alignment, 0.95)
+        self.assertTrue(stored.exact)
+        self.assertLess(world_error(stored.homography, self.G), 0.05)
+        np.testing.assert_allclose(stored.pixel_vertices, pitch_pixel_vertices(self.H), atol=1.0)
+
+    def test_lookup_is_per_camera_and_frame_shape(self):
+        self.store.add("rig", self.frame, self.H)
+        self.assertIsNone(self.store.lookup("other rig", self.frame))
+        self.assertIsNone(self.store.lookup("rig", cv2.resize(self.frame, (640, 360))))
+        self.assertIsNone(self.store.lookup("rig", noise_frame(1)))
+
+    def test_drifted_view_is_refined(self):
+        self.store.add("rig", self.frame, self.H, reprojection_error=0.5)
+        G = pitch_camera(pan=0.03, zoom=1.02)
+        stored = self.store.lookup("rig", render_pitch(G))
+        self.assertIsNotNone(stored)
+        self.assertGreater(world_error(self.H, G), 0.5)
+        self.assertLess(world_error(stored.homography, G), 0.2)
+
+    def test_near_duplicate_is_not_stored_twice(self):
+        self.assertIsNotNone(self.store.add("rig", self.frame, self.H, reprojection_error=0.5))
+        # Same view, worse fit: the existing entry is kept
+        self.assertIsNone(self.store.add("rig", self.frame, self.H, reprojection_error=1.0))
+        self.assertEqual(len(self.store.entries("rig")), 1)
+        # Same view, better fit: it replaces the entry
+        self.assertIsNotNone(self.store.add("rig", self.frame, self.H, reprojection_error=0.2))
+        entries = self.store.entries("rig")
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["reprojection_error"], 0.2)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        store = CalibrationStore(self.store.store_dir, max_entries=3)
+        frames = [noise_frame(seed) for seed in range(4)]
+        ids = []
+        for frame in frames[:3]:
+            ids.append(store.add("rig", frame, np.eye(3)))
+            time.sleep(0.01)
+        # Using the oldest entry makes the second one the least recently used
+        self.assertEqual(store.lookup("rig", frames[0], refine=False).entry_id, ids[0])
+        time.sleep(0.01)
+        ids.append(store.add("rig", frames[3], np.eye(3)))
+        kept = {entry["id"] for entry in store.entries("rig")}
+        self.assertEqual(kept, {ids[0], ids[2], ids[3]})
+        self.assertFalse(os.path.exists(store._mask_path("rig", ids[1])))
+        self.assertTrue(os.path.exists(store._mask_path("rig", ids[3])))
+
+
+if __name__ == '__main__':
+    unittest.main()
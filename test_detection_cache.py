@@ -0,0 +1,170 @@
+
+import os
+import tempfile
+import threading
+import unittest
+import numpy as np
+
+from detection_cache import DetectionCache, video_fingerprint
+from parallel_tracking import save_shard_caches
+
+
+def frame_detections(seed, n=3):
+    rng = np.random.default_rng(seed)
+    xy = rng.integers(0, 1000, (n, 2))
+    xyxy = np.concatenate([xy, xy + rng.integers(10, 100, (n, 2))], axis=1).astype(np.int32)
+    return xyxy, rng.integers(0, 4, n).astype(np.int32), rng.uniform(0.1, 1.0, n).astype(np.float32)
+
+
+def assert_detections_equal(test, loaded, expected):
+    test.assertEqual(sorted(loaded), sorted(expected))
+    for f, (xyxy, cls, conf) in expected.items():
+        np.testing.assert_array_equal(loaded[f][0], xyxy)
+        np.testing.assert_array_equal(loaded[f][1], cls)
+        np.testing.assert_allclose(loaded[f][2], conf, atol=1e-3)
+
+
+class TestDetectionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = DetectionCache(os.path.join(self.tmp.name, "detections"))
+        self.video = self.write_file("match.mp4", bytes(range(256)) * 64)
+        self.weights = self.write_file("best.pt", b"weights")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_file(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def key(self, **overrides):
+        settings = dict(video_path=self.video, weights_path=self.weights, input_size=(640, 640), conf=0.4, iou=0.5)
+        settings.update(overrides)
+        return DetectionCache.make_key(**settings)
+
+    def test_video_fingerprint(self):
+        content = os.urandom(3 * 4096)
+        fingerprint = video_fingerprint(self.write_file("a.mp4", content), sample_bytes=1024)
+        self.assertEqual(fingerprint, video_fingerprint(self.write_file("b.mp4", content), sample_bytes=1024))
+        # Head, middle and tail chunks each change the fingerprint
+        for offset in (0, len(content) // 2, len(content) - 1):
+            changed = bytearray(content)
+            changed[offset] ^= 0xFF
+            path = self.write_file("c.mp4", bytes(changed))
+            self.assertNotEqual(fingerprint, video_fingerprint(path, sample_bytes=1024), offset)
+        # So does the size
+        self.assertNotEqual(fingerprint, video_fingerprint(self.write_file("d.mp4", content + b"\0"), sample_bytes=1024))
+
+    def test_changing_a_setting_misses(self):
+        key = self.key()
+        self.cache.save(key, {0: frame_detections(0)})
+        self.assertEqual(key, self.key())
+        changes = {
+            "video": dict(video_path=self.write_file("other.mp4", b"other video")),
+            "weights": dict(weights_path=self.write_file("other.pt", b"other weights")),
+            "input_size": dict(input_size=(1280, 1280)),
+            "conf": dict(conf=0.1),
+            "iou": dict(iou=0.7),
+            "backend": dict(backend="onnx"),
+            "pitch_roi": dict(pitch_roi=True),
+            "roi_settings": dict(pitch_roi=True, roi_settings={"margin": 0.1}),
+            "ball_crop": dict(ball_crop=True),
+        }
+        keys = {key}
+        for name, overrides in changes.items():
+            with self.subTest(setting=name):
+                changed = self.key(**overrides)
+                self.assertNotIn(changed, keys)
+                self.assertIsNone(self.cache.load(changed))
+                keys.add(changed)
+
+    def test_save_merges_into_existing_entry(self):
+        key = self.key()
+        first = {0: frame_detections(0), 2: frame_detections(2)}
+        self.cache.save(key, first)
+        second = {2: frame_detections(20), 4: frame_detections(4, n=0)}
+        self.cache.save(key, second)
+        assert_detections_equal(self, self.cache.load(key), {0: first[0], **second})
+
+    def test_rois_round_trip(self):
+        key = self.key(ball_crop=True)
+        detections = {0: frame_detections(0), 1: frame_detections(1)}
+        self.cache.save(key, detections, rois={0: (10, 20, 330, 340)})
+        self.cache.save(key, {2: frame_detections(2)}, rois={2: (0, 0, 320, 320)})
+        loaded = self.cache.load(key, with_rois=True)
+        self.assertEqual({f: roi for f, (roi, _) in loaded.items()}, {0: (10, 20, 330, 340), 1: None, 2: (0, 0, 320, 320)})
+        assert_detections_equal(self, {f: arrays for f, (_, arrays) in loaded.items()},
+                                {**detections, 2: frame_detections(2)})
+        # Entries saved without windows load with None
+        plain = self.key()
+        self.cache.save(plain, detections)
+        self.assertEqual([roi for roi, _ in self.cache.load(plain, with_rois=True).values()], [None, None])
+
+    def test_evict_keeps_the_entry_just_written(self):
+        big = {f: frame_detections(f, n=50) for f in range(20)}
+        keys = [self.key(conf=conf) for conf in (0.1, 0.2, 0.3)]
+        for i, key in enumerate(keys):
+            self.cache.save(key, big)
+            os.utime(self.cache._path(key), (i, i))
+        # A budget smaller than one entry leaves only the kept one
+        self.cache.max_bytes = 1
+        self.cache.evict(keep=keys[1])
+        self.assertEqual(os.listdir(self.cache.cache_dir), [f"{keys[1]}.npz"])
+        # Without keep, least recently used entries go first
+        self.cache.max_bytes = 10 ** 9
+        for i, key in enumerate(keys):
+            self.cache.save(key, big)
+            os.utime(self.cache._path(key), (i, i))
+        self.cache.max_bytes = os.path.getsize(self.cache._path(keys[2])) * 2
+        self.cache.evict()
+        self.assertEqual(sorted(os.listdir(self.cache.cache_dir)), sorted(f"{k}.npz" for k in keys[1:]))
+
+    def test_concurrent_saves_leave_a_valid_entry(self):
+        key = self.key()
+        chunks = [{f: frame_detections(f) for f in range(start, start + 10)} for start in range(0, 80, 10)]
+        errors = []
+
+        def save(chunk):
+            try:
+                self.cache.save(key, chunk)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=save, args=(chunk,)) for chunk in chunks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(os.listdir(self.cache.cache_dir), [f"{key}.npz"])
+        loaded = self.cache.load(key)
+        self.assertIsNotNone(loaded)
+        for f, arrays in loaded.items():
+            np.testing.assert_array_equal(arrays[0], frame_detections(f)[0])
+
+    def test_shard_writes_are_merged_and_saved_once(self):
+        key, crop_key = self.key(), self.key(ball_crop=True)
+        cache = (self.cache.cache_dir, self.cache.max_bytes)
+        shards = [
+            {"detection_cache": cache, "cache_writes": [
+                (key, {f: frame_detections(f) for f in range(0, 30)}, None),
+                (crop_key, {3: frame_detections(3)}, {3: (0, 0, 320, 320)}),
+            ]},
+            {"detection_cache": cache, "cache_writes": [
+                (key, {f: frame_detections(f) for f in range(20, 50)}, None),
+                (crop_key, {40: frame_detections(40)}, {40: (100, 0, 420, 320)}),
+            ]},
+            {"detection_cache": None},
+        ]
+        self.assertEqual(save_shard_caches(shards), 52)
+        self.assertEqual(sorted(self.cache.load(key)), list(range(50)))
+        rois = {f: roi for f, (roi, _) in self.cache.load(crop_key, with_rois=True).items()}
+        self.assertEqual(rois, {3: (0, 0, 320, 320), 40: (100, 0, 420, 320)})
+        self.assertEqual(len(os.listdir(self.cache.cache_dir)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+
+import csv
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from detection_scheduler import DetectionScheduler
+
+
+def track(confirmed=True, std_px=2.0, height=100.0):
+    return SimpleNamespace(
+        is_confirmed=lambda: confirmed,
+        mean=np.array([0.0, 0.0, 0.5, height]),
+        covariance=np.diag([std_px ** 2 / 2, std_px ** 2 / 2, 1.0, 1.0]),
+    )
+
+
+CALM = [track(), track()]
+
+
+class TestDetectionScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = DetectionScheduler(base_interval=2, min_interval=1, max_interval=4, calm_frames_to_grow=3)
+
+    def run_frames(self, frames, camera=(0.0, 0.0), tracks=CALM, ball=True):
+        decisions = []
+        for f in frames:
+            detect = self.scheduler.should_detect(f)
+            decisions.append(detect)
+            self.scheduler.observe(f, camera, tracks, detect, ball)
+        return decisions
+
+    def test_fixed_interval_when_not_adaptive(self):
+        scheduler = DetectionScheduler(base_interval=3, adaptive=False)
+        self.assertEqual([scheduler.should_detect(f) for f in range(7)],
+                         [True, False, False, True, False, False, True])
+        self.assertEqual(scheduler.detection_frames, 3)
+
+    def test_interval_grows_while_calm(self):
+        decisions = self.run_frames(range(12))
+        self.assertEqual(self.scheduler.interval, 4)
+        self.assertEqual([t["interval"] for t in self.scheduler.trace], [3, 4])
+        self.assertTrue(all(t["reason"] == "calm" for t in self.scheduler.trace))
+        self.assertEqual(self.scheduler.detection_frames, sum(decisions))
+
+    def test_hard_scene_resets_to_min_interval(self):
+        hard = {
+            "camera": dict(camera=(9.0, 0.0)),
+            "uncertainty": dict(tracks=[track(std_px=30.0)]),
+            "unconfirmed": dict(tracks=[track(confirmed=False)] * 3),
+        }
+        for reason, signals in hard.items():
+            with self.subTest(reason=reason):
+                self.setUp()
+                self.run_frames(range(12))
+                self.run_frames([12], **signals)
+                self.assertEqual(self.scheduler.interval, 1)
+                self.assertIn(reason, self.scheduler.trace[-1]["reason"])
+                self.assertEqual(self.scheduler.trace[-1]["old_interval"], 4)
+                # The next detection is pulled in to the new interval
+                self.assertTrue(self.scheduler.should_detect(13))
+
+    def test_ball_lost_only_counts_on_detection_frames(self):
+        self.scheduler.observe(0, (0.0, 0.0), CALM, detected=False, ball_detected=False)
+        self.assertEqual(self.scheduler.trace, [])
+        self.scheduler.observe(1, (0.0, 0.0), CALM, detected=True, ball_detected=False)
+        self.assertEqual(self.scheduler.trace[-1]["reason"], "ball lost")
+        self.assertEqual(self.scheduler.interval, 1)
+
+    def test_shrinking_interval_redecides_frames_decided_ahead(self):
+        self.run_frames(range(12))
+        # Frames 12-23 were decided ahead under interval 4
+        ahead = [self.scheduler.should_detect(f) for f in range(12, 24)]
+        self.assertEqual(sum(ahead), 3)
+        self.assertFalse(self.scheduler.urgent)
+        self.scheduler.observe(12, (20.0, 0.0), CALM, ahead[0], True)
+        self.assertTrue(self.scheduler.urgent)
+        redecided = [self.scheduler.redecide(f, detected) for f, detected in zip(range(13, 24), ahead[1:])]
+        self.assertTrue(all(redecided))
+        # Growing back never asks for a redecision
+        self.scheduler.urgent = False
+        self.run_frames(range(24, 30))
+        self.assertFalse(self.scheduler.urgent)
+
+    def test_crop_searches_are_counted(self):
+        self.scheduler.observe(0, (0.0, 0.0), CALM, False, False, crop_searched=True)
+        self.scheduler.observe(1, (0.0, 0.0), CALM, False, False, crop_searched=False)
+        self.assertEqual(self.scheduler.crop_frames, 1)
+
+    def test_trace_csv(self):
+        self.run_frames(range(12))
+        self.run_frames([12], camera=(9.0, 0.0))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.csv")
+            self.scheduler.save_trace(path)
+            with open(path, newline="") as f:
+                rows = list(csv.DictReader(f))
+        self.assertEqual([(r["frame"], r["old_interval"], r["interval"]) for r in rows],
+                         [("2", "2", "3"), ("5", "3", "4"), ("12", "4", "1")])
+        self.assertEqual(rows[-1]["reason"], "camera 9.0px")
+        self.assertEqual(rows[-1]["camera_px"], "9.0")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+
+import unittest
+import numpy as np
+
+from speed_and_distance_estimator import KeyframeHomography
+
+
+def translation(dx, dy):
+    return np.array([[1.0, 0.0, dx], [0.0, 1.0, dy], [0.0, 0.0, 1.0]])
+
+
+# Pixel -> metre homography of frame 0: 10 px per metre, centre spot at (640, 360)
+H0 = np.array([[0.1, 0.0, -64.0], [0.0, 0.1, -36.0], [0.0, 0.0, 1.0]])
+PAN = 4.0  # Camera motion: every pixel moves PAN px right per frame
+
+
+def true_homography(t):
+    # Frame t pixel p was at p - PAN * t in frame 0
+    return H0 @ translation(-PAN * t, 0.0)
+
+
+class TestHomographyChain(unittest.TestCase):
+    def setUp(self):
+        self.n = 50
+        self.motion = np.array([np.eye(3)] + [translation(PAN, 0.0)] * (self.n - 1))
+        self.homography = KeyframeHomography()
+
+    def assert_maps_like(self, H, expected, point=(700.0, 400.0)):
+        p = np.array([*point, 1.0])
+        a, b = H @ p, expected @ p
+        np.testing.assert_allclose(a[:2] / a[2], b[:2] / b[2], atol=1e-6)
+
+    def test_single_keyframe_chains_both_ways(self):
+        self.homography.set_keyframe(20, true_homography(20))
+        chain = self.homography.build_frame_homographies(self.motion)
+        self.assertEqual(chain.shape, (self.n, 3, 3))
+        for t in (0, 10, 20, 35, self.n - 1):
+            self.assert_maps_like(chain[t], true_homography(t))
+
+    def test_drift_is_pulled_back_at_each_keyframe(self):
+        # The second keyframe disagrees with the chain by 2 m; it must still be hit exactly
+        wrong = translation(2.0, 0.0) @ true_homography(40)
+        self.homography.set_keyframe(0, true_homography(0))
+        self.homography.set_keyframe(40, wrong)
+        chain = self.homography.build_frame_homographies(self.motion)
+        self.assert_maps_like(chain[0], true_homography(0))
+        self.assert_maps_like(chain[40], wrong)
+        # Halfway between, the error is split linearly
+        p = np.array([700.0, 400.0, 1.0])
+        error = (chain[20] @ p)[0] / (chain[20] @ p)[2] - (true_homography(20) @ p)[0]
+        self.assertAlmostEqual(error, 1.0, places=6)
+
+    def test_cut_stops_the_chain(self):
+        self.motion[30] = np.nan
+        self.homography.set_keyframe(10, true_homography(10))
+        chain = self.homography.build_frame_homographies(self.motion)
+        self.assert_maps_like(chain[29], true_homography(29))
+        # Nothing reaches past the cut: those frames fall back to the keyframe itself
+        for t in (30, 45):
+            self.assert_maps_like(chain[t], true_homography(10))
+
+    def test_transform_points_matches_per_point_lookup(self):
+        self.homography.set_keyframe(5, true_homography(5))
+        self.homography.build_frame_homographies(self.motion)
+        rng = np.random.default_rng(0)
+        points = rng.uniform(0, 1280, size=(100, 2))
+        frames = rng.integers(0, self.n, size=100)
+        batched = self.homography.transform_points(points, frames)
+        single = np.array([self.homography.transform_point(p, int(f)) for p, f in zip(points, frames)])
+        np.testing.assert_allclose(batched, single, atol=1e-6)
+
+    def test_no_keyframe_inside_video(self):
+        self.homography.set_keyframe(self.n + 10, H0)
+        with self.assertRaises(ValueError):
+            self.homography.build_frame_homographies(self.motion)
+
+
+if __name__ == '__main__':
+    unittest.main()
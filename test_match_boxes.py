@@ -0,0 +1,50 @@
+
+import unittest
+import numpy as np
+
+from Tracking import bbox_iou_matrix, match_boxes
+
+
+class TestMatchBoxes(unittest.TestCase):
+    def test_iou_matrix(self):
+        a = [[0, 0, 10, 10], [20, 20, 30, 30]]
+        b = [[0, 0, 10, 10], [5, 0, 15, 10], [100, 100, 110, 110]]
+        iou = bbox_iou_matrix(np.array(a, dtype=np.float32), np.array(b, dtype=np.float32))
+        np.testing.assert_allclose(iou, [[1.0, 50 / 150, 0.0], [0.0, 0.0, 0.0]], atol=1e-6)
+
+    def test_one_to_one_assignment(self):
+        tracks = [[0, 0, 10, 20], [12, 0, 22, 20], [40, 0, 50, 20]]
+        # Detections shuffled and slightly shifted
+        dets = [[41, 1, 51, 21], [1, 0, 11, 20], [12, 1, 22, 21]]
+        self.assertEqual(match_boxes(tracks, dets).tolist(), [1, 2, 0])
+
+    def test_global_assignment_beats_greedy(self):
+        # Greedy on IoU gives track 0 detection 0 and leaves track 1 unmatched
+        tracks = [[0, 0, 10, 10], [6, 0, 16, 10]]
+        dets = [[3, 0, 13, 10], [-3, 0, 7, 10]]
+        self.assertEqual(match_boxes(tracks, dets, min_iou=0.3).tolist(), [1, 0])
+
+    def test_pairs_below_min_iou_are_never_matched(self):
+        tracks = [[0, 0, 10, 10], [50, 50, 60, 60]]
+        dets = [[8, 0, 18, 10]]  # IoU with track 0 is 20 / 180
+        self.assertEqual(match_boxes(tracks, dets, min_iou=0.3).tolist(), [-1, -1])
+        self.assertEqual(match_boxes(tracks, dets, min_iou=0.1).tolist(), [0, -1])
+
+    def test_iou_tie_broken_by_centre_distance(self):
+        # Both detections contain the track box with IoU 0.25; the centred one wins
+        tracks = [[10, 10, 20, 20]]
+        dets = [[10, 10, 30, 30], [5, 5, 25, 25]]
+        self.assertEqual(match_boxes(tracks, dets, min_iou=0.2).tolist(), [1])
+
+    def test_more_tracks_than_detections(self):
+        tracks = [[0, 0, 10, 10], [20, 0, 30, 10], [40, 0, 50, 10]]
+        dets = [[20, 0, 30, 10]]
+        self.assertEqual(match_boxes(tracks, dets).tolist(), [-1, 0, -1])
+
+    def test_empty_inputs(self):
+        self.assertEqual(match_boxes([], [[0, 0, 1, 1]]).tolist(), [])
+        self.assertEqual(match_boxes([[0, 0, 1, 1]], []).tolist(), [-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
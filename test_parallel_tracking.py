@@ -0,0 +1,99 @@
+
+import unittest
+import numpy as np
+
+from parallel_tracking import match_seam, plan_shards, stitch_shards
+
+TOTAL = 40
+SHARDS = plan_shards(TOTAL, 2, 5)  # [(0, 0, 20), (15, 20, 40)]
+
+
+def box(slot, frame_idx):
+    x = 100 * slot + frame_idx
+    return [x, 200, x + 40, 300]
+
+
+def prefer_class(existing, new):
+    return new if existing is None else existing
+
+
+def shard_result(people, frames, ball=None):
+    """people: {local_id: (slot, team_id, frames)}; ball: {frame_idx: assigned local id}"""
+    players = {f: {} for f in frames}
+    for local_id, (slot, team_id, seen) in people.items():
+        for f in seen:
+            players[f][local_id] = {"bbox": box(slot, f), "team_id": team_id}
+    return {
+        "tracks": {
+            "players": players,
+            "ball": {f: {"ball": {"bbox": [0, 0, 8, 8], "assigned_track_id": tid, "assigned_group": "players",
+                                  "assigned_distance": 5.0}}
+                     for f, tid in (ball or {}).items()},
+        },
+        "stable_class_map": {local_id: 2 for local_id in people},
+        "track_class_map": {local_id + 100: 2 for local_id in people},
+        "camera_movement": [[float(f), 0.0] for f in range(TOTAL)],
+        "id_appearance": {local_id: np.full(4, slot, dtype=np.float32) for local_id, (slot, _, _) in people.items()},
+    }
+
+
+class TestStitchShards(unittest.TestCase):
+    def setUp(self):
+        first = range(0, 20)
+        second = range(15, 40)
+        # Shard 1 clustered the teams the other way round
+        self.results = [
+            shard_result({1: (1, 0, first), 2: (2, 1, first), 3: (3, 0, first)}, first, ball={5: 1}),
+            shard_result({
+                7: (1, 1, second),       # continues 1
+                8: (2, 0, second),       # continues 2
+                9: (5, 0, range(15, 20)),  # only seen in the warm-up window
+                10: (6, 1, range(20, 40)),  # new in the core range
+            }, second, ball={20: 9, 25: 7, 30: 10}),
+        ]
+
+    def test_plan_shards(self):
+        self.assertEqual(SHARDS, [(0, 0, 20), (15, 20, 40)])
+        self.assertEqual(plan_shards(10, 20, 3), [(max(0, k - 3) if k else 0, k, k + 1) for k in range(10)])
+
+    def test_match_seam(self):
+        id_map, team_map = match_seam(self.results[0]["tracks"], self.results[1]["tracks"], (15, 20))
+        self.assertEqual(id_map, {7: 1, 8: 2})
+        self.assertEqual(team_map, {0: 1, 1: 0})
+
+    def test_stitch(self):
+        tracks, track_class_map, stable_class_map, camera_movement, id_appearance = stitch_shards(
+            self.results, SHARDS, prefer_class)
+
+        # Seam matches keep the global ID, new players get the next one
+        self.assertEqual(sorted(tracks["players"][10]), [1, 2, 3])
+        self.assertEqual(sorted(tracks["players"][30]), [1, 2, 4])
+        self.assertEqual(tracks["players"][30][1]["bbox"], box(1, 30))
+        self.assertEqual(tracks["players"][30][4]["bbox"], box(6, 30))
+        # Warm-up frames come from the previous shard only
+        self.assertEqual(sorted(tracks["players"][17]), [1, 2, 3])
+        self.assertEqual(sorted(f for f in tracks["players"]), list(range(TOTAL)))
+
+        # Team labels follow the first shard's permutation
+        self.assertEqual(tracks["players"][10][1]["team_id"], 0)
+        self.assertEqual(tracks["players"][30][1]["team_id"], 0)
+        self.assertEqual(tracks["players"][30][2]["team_id"], 1)
+        self.assertEqual(tracks["players"][30][4]["team_id"], 0)
+
+        # Possession points at global IDs; a warm-up-only player has none and is dropped
+        self.assertEqual(tracks["ball"][5]["ball"]["assigned_track_id"], 1)
+        self.assertEqual(tracks["ball"][25]["ball"]["assigned_track_id"], 1)
+        self.assertEqual(tracks["ball"][30]["ball"]["assigned_track_id"], 4)
+        self.assertNotIn("assigned_track_id", tracks["ball"][20]["ball"])
+        self.assertNotIn("assigned_group", tracks["ball"][20]["ball"])
+        self.assertEqual(tracks["ball"][20]["ball"]["bbox"], [0, 0, 8, 8])
+
+        self.assertEqual(stable_class_map, {1: 2, 2: 2, 3: 2, 4: 2})
+        self.assertEqual(sorted(id_appearance), [1, 2, 3, 4])
+        np.testing.assert_array_equal(id_appearance[1], np.full(4, 2.0))
+        self.assertEqual(sorted(track_class_map), ["0_101", "0_102", "0_103", "1_107", "1_108", "1_109", "1_110"])
+        self.assertEqual([m[0] for m in camera_movement], [float(f) for f in range(TOTAL)])
+
+
+if __name__ == '__main__':
+    unittest.main()
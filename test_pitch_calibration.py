@@ -0,0 +1,112 @@
+
+import unittest
+import cv2
+import numpy as np
+
+from pitch_calibration import PitchCalibrator
+from speed_and_distance_estimator import CENTER_CIRCLE_RADIUS
+
+
+def pitch_camera(pan=0.0, zoom=1.0, size=(1280, 720)):
+    """Known metre -> pixel homography of a broadcast-like view of the centre of the pitch"""
+    w, h = size
+    world = np.float32([[-30, 34], [30, 34], [30, -34], [-30, -34]])
+    image = np.float32([[250, 110], [1030, 110], [1430, 700], [-150, 700]])
+    centre = np.float32([w / 2, h / 2])
+    image = (image - centre) * zoom + centre + np.float32([pan * 1000, 0])
+    return cv2.getPerspectiveTransform(world, image)
+
+
+def render_pitch(G, size=(1280, 720), touchlines=True, seed=0):
+    """Grass, stands, centre circle, halfway line, touchlines and a few players"""
+    w, h = size
+    frame = np.zeros((h, w, 3), np.uint8)
+    frame[:] = (40, 140, 40)
+    frame[:80] = (90, 90, 90)
+
+    def draw(points):
+        pixels = cv2.perspectiveTransform(np.float32(points)[None], G)[0]
+        cv2.polylines(frame, [np.int32(np.round(pixels))], False, (235, 235, 235), 3, cv2.LINE_AA)
+
+    phi = np.linspace(0, 2 * np.pi, 400)
+    draw(np.stack([CENTER_CIRCLE_RADIUS * np.cos(phi), CENTER_CIRCLE_RADIUS * np.sin(phi)], axis=1))
+    draw([[0, -34], [0, 34]])
+    if touchlines:
+        draw([[-52.5, -34], [52.5, -34]])
+        draw([[-52.5, 34], [52.5, 34]])
+    rng = np.random.default_rng(seed)
+    for _ in range(12):
+        x, y = rng.integers(100, w - 100), rng.integers(150, h - 60)
+        cv2.rectangle(frame, (int(x), int(y)), (int(x) + 25, int(y) + 60), (30, 30, 200), -1)
+    return frame
+
+
+WORLD_CHECK = np.float32([[x, y] for x in (-20, 0, 20) for y in (-20, 0, 20)])
+
+
+def world_error(H, G):
+    """Largest metre error of H on pitch points imaged through the true camera G"""
+    pixels = cv2.perspectiveTransform(WORLD_CHECK[None], G)[0]
+    return float(np.abs(cv2.perspectiveTransform(pixels[None], H)[0] - WORLD_CHECK).max())
+
+
+class TestPitchCalibration(unittest.TestCase):
+    def setUp(self):
+        self.calibrator = PitchCalibrator()
+
+    def test_recovers_known_homography(self):
+        for pan, zoom in ((0.0, 1.0), (0.08, 1.0), (0.15, 0.9), (-0.25, 0.8)):
+            with self.subTest(pan=pan, zoom=zoom):
+                G = pitch_camera(pan, zoom)
+                result = self.calibrator.calibrate_frame(render_pitch(G), frame_idx=7)
+                self.assertIsNotNone(result)
+                self.assertEqual(result.frame_idx, 7)
+                self.assertTrue(result.exact)
+                self.assertTrue(result.confident)
+                self.assertLess(result.reprojection_error, 1.0)
+                self.assertGreater(result.support, 0.9)
+                self.assertLess(world_error(result.homography, G), 0.15)
+
+    def test_landmarks_lie_on_the_circle(self):
+        G = pitch_camera(0.08)
+        result = self.calibrator.calibrate_frame(render_pitch(G))
+        # left, right, bottom, top of the circle, then the two touchline crossings
+        expected = np.float32([[-CENTER_CIRCLE_RADIUS, 0], [CENTER_CIRCLE_RADIUS, 0],
+                               [0, -CENTER_CIRCLE_RADIUS], [0, CENTER_CIRCLE_RADIUS], [0, 34], [0, -34]])
+        truth = cv2.perspectiveTransform(expected[None], G)[0]
+        self.assertEqual(len(result.image_points), 6)
+        np.testing.assert_allclose(result.image_points, truth, atol=2.0)
+
+    def test_without_touchlines_the_fit_is_not_confident(self):
+        # Circle and halfway line alone leave one projective degree of freedom
+        G = pitch_camera()
+        result = self.calibrator.calibrate_frame(render_pitch(G, touchlines=False))
+        self.assertIsNotNone(result)
+        self.assertFalse(result.exact)
+        self.assertFalse(result.confident)
+
+    def test_reprojection_error(self):
+        G = pitch_camera()
+        lines = PitchCalibrator.line_mask(render_pitch(G))
+        distance = cv2.distanceTransform(255 - lines, cv2.DIST_L2, 3)
+        H = np.linalg.inv(G)
+        self.assertLess(self.calibrator.reprojection_error(H, distance), 1.0)
+        shifted = np.array([[1.0, 0.0, 2.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]) @ H
+        self.assertGreater(self.calibrator.reprojection_error(shifted, distance), 3.0)
+        # A circle projected out of view cannot be scored
+        away = np.array([[1.0, 0.0, 200.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]) @ H
+        self.assertEqual(self.calibrator.reprojection_error(away, distance), float("inf"))
+
+    def test_no_circle(self):
+        frame = np.zeros((720, 1280, 3), np.uint8)
+        frame[:] = (40, 140, 40)
+        self.assertIsNone(self.calibrator.calibrate_frame(frame))
+
+    def test_candidate_frames_skip_ranges(self):
+        calibrator = PitchCalibrator(num_candidates=4)
+        self.assertEqual(calibrator.candidate_frames(100), [19, 39, 59, 79])
+        self.assertEqual(calibrator.candidate_frames(100, skip_ranges=[[30, 60]]), [19, 79])
+
+
+if __name__ == '__main__':
+    unittest.main()
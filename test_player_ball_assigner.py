@@ -0,0 +1,39 @@
+
+import unittest
+
+from player_ball_assigner import assign_ball_to_players
+
+
+def make_tracks(predicted=False):
+    ball = {"bbox": [498, 290, 506, 298], "position": (502, 298)}
+    if predicted:
+        ball["predicted"] = True
+    return {
+        "players": {10: {3: {"position": (500, 300)}, 4: {"position": (800, 300)}}},
+        "goalkeepers": {10: {}},
+        "ball": {10: {"ball": ball}},
+    }
+
+
+class TestPlayerBallAssigner(unittest.TestCase):
+    def test_measured_ball_is_assigned_to_nearest_player(self):
+        tracks = make_tracks()
+        self.assertEqual(assign_ball_to_players(tracks, 10, max_distance_pixels=70.0), 3)
+        self.assertTrue(tracks["players"][10][3]["has_ball"])
+        self.assertNotIn("has_ball", tracks["players"][10][4])
+        self.assertEqual(tracks["ball"][10]["ball"]["assigned_track_id"], 3)
+
+    def test_predicted_ball_assigns_no_possession(self):
+        tracks = make_tracks(predicted=True)
+        self.assertIsNone(assign_ball_to_players(tracks, 10, max_distance_pixels=70.0))
+        self.assertFalse(any("has_ball" in info for info in tracks["players"][10].values()))
+        self.assertNotIn("assigned_track_id", tracks["ball"][10]["ball"])
+
+    def test_ball_out_of_reach(self):
+        tracks = make_tracks()
+        tracks["ball"][10]["ball"]["position"] = (650, 450)
+        self.assertIsNone(assign_ball_to_players(tracks, 10, max_distance_pixels=70.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+
+import unittest
+import numpy as np
+from deep_sort_realtime.deepsort_tracker import DeepSort
+
+from Tracking import predict_tracks
+from byte_tracker import ByteTracker
+
+EMBED = np.ones(8) / np.sqrt(8)
+
+
+class PredictTracksMixin:
+    max_age = 3
+
+    def update(self, left):
+        raise NotImplementedError
+
+    def walk(self, frames, step=5):
+        tracks = None
+        for k in range(frames):
+            tracks = self.update(100 + step * k)
+        return [t for t in tracks if t.is_confirmed()]
+
+    def test_tracks_move_with_their_velocity(self):
+        track = self.walk(6)[0]
+        left = track.to_ltrb()[0]
+        tracks = predict_tracks(self.tracker)
+        self.assertEqual(tracks[0].track_id, track.track_id)
+        # Roughly one step of the 5 px/frame walk per predicted frame
+        self.assertAlmostEqual(tracks[0].to_ltrb()[0] - left, 5.0, delta=1.0)
+
+    def test_predicted_frames_are_not_misses(self):
+        track = self.walk(6)[0]
+        for _ in range(self.max_age * 3):
+            tracks = predict_tracks(self.tracker)
+        self.assertEqual([t.track_id for t in tracks], [track.track_id])
+        self.assertEqual(tracks[0].time_since_update, 0)
+        self.assertTrue(tracks[0].is_confirmed())
+
+    def test_detections_after_prediction_match_the_same_track(self):
+        track = self.walk(6)[0]
+        for _ in range(4):
+            predict_tracks(self.tracker)
+        # The player kept walking while no detections were produced
+        tracks = [t for t in self.update(100 + 5 * 10) if t.is_confirmed()]
+        self.assertEqual([t.track_id for t in tracks], [track.track_id])
+
+
+class TestPredictTracksByteTrack(PredictTracksMixin, unittest.TestCase):
+    def setUp(self):
+        self.tracker = ByteTracker(max_age=self.max_age, n_init=2)
+
+    def update(self, left):
+        return self.tracker.update_tracks([[[left, 200, 20, 40], 0.9, 2]])
+
+
+class TestPredictTracksDeepSort(PredictTracksMixin, unittest.TestCase):
+    def setUp(self):
+        self.tracker = DeepSort(max_age=self.max_age, n_init=2, embedder=None)
+
+    def update(self, left):
+        return self.tracker.update_tracks([[[left, 200, 20, 40], 0.9, 2]], embeds=[EMBED])
+
+
+if __name__ == '__main__':
+    unittest.main()
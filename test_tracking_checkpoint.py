@@ -0,0 +1,148 @@
+
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from tracking_checkpoint import TrackingCheckpointer, _PROCESSOR_FIELDS, _RESULT_SETTINGS
+
+
+class FakeTeamClassifier:
+    def __init__(self):
+        self.model = "heavy model"
+        self.features = []
+        self.track_ids = []
+        self.team_colors = None
+
+    def cluster_ready(self):
+        return self.team_colors is not None
+
+
+def make_processor(video_path="match.mp4", model_path=__file__, **settings):
+    processor = SimpleNamespace(
+        video_path=video_path,
+        model_path=model_path,
+        tracks={"players": {}, "ball": {}},
+        camera_movement_per_frame=[],
+        camera_matrices_per_frame=[],
+        tracker=SimpleNamespace(tracks=[]),
+        id_manager={},
+        team_classifier=FakeTeamClassifier(),
+    )
+    for name in _PROCESSOR_FIELDS:
+        setattr(processor, name, None)
+    for name in _RESULT_SETTINGS:
+        setattr(processor, name, settings.get(name, 1))
+    return processor
+
+
+def run_frames(processor, start, end):
+    # Deterministic stand-in for the tracking loop
+    for f in range(start, end):
+        processor.tracks["players"][f] = {1: {"bbox": [f, 0, f + 10, 20]}, 2: {"bbox": [2 * f, 5, 2 * f + 10, 25]}}
+        processor.tracks["ball"][f] = {"ball": {"bbox": [f, f, f + 4, f + 4], "assigned_track_id": 1}}
+        processor.camera_movement_per_frame.append((0.5 * f, 0.0))
+        processor.camera_matrices_per_frame.append(f)
+        processor.tracker.tracks.append(f)
+        processor.id_manager[f] = f % 3
+        processor.track_class_map = {1: 2, 2: 2}
+        processor.stream_decisions = {f: ("detect", True)}
+
+
+class TestTrackingCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp.name, "ck")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_nothing_to_resume(self):
+        self.assertIsNone(TrackingCheckpointer(self.dir).restore(make_processor()))
+
+    def test_resume_matches_uninterrupted_run(self):
+        reference = make_processor()
+        run_frames(reference, 0, 30)
+
+        processor = make_processor()
+        processor.team_classifier.features = ["warm-up"]
+        processor.team_classifier.team_colors = {1: (255, 0, 0), 2: (0, 0, 255)}
+        checkpointer = TrackingCheckpointer(self.dir, interval_frames=10)
+        for f in range(30):
+            run_frames(processor, f, f + 1)
+            if checkpointer.should_checkpoint(f) and f < 20:
+                checkpointer.save(processor, f)
+        self.assertEqual(checkpointer.logged_until, 20)
+
+        # Crash: a fresh processor resumes from the last checkpoint and redoes the rest
+        resumed = make_processor()
+        next_frame = TrackingCheckpointer(self.dir, interval_frames=10).restore(resumed)
+        self.assertEqual(next_frame, 20)
+        self.assertEqual(sorted(resumed.tracks["players"]), list(range(20)))
+        run_frames(resumed, next_frame, 30)
+
+        self.assertEqual(resumed.tracks, reference.tracks)
+        self.assertEqual(resumed.camera_movement_per_frame, reference.camera_movement_per_frame)
+        self.assertEqual(resumed.camera_matrices_per_frame, reference.camera_matrices_per_frame)
+        self.assertEqual(resumed.tracker.tracks, reference.tracker.tracks)
+        self.assertEqual(resumed.id_manager, reference.id_manager)
+        # Fitted team colours come back; the model and warm-up samples do not
+        self.assertEqual(resumed.team_classifier.team_colors, {1: (255, 0, 0), 2: (0, 0, 255)})
+        self.assertEqual(resumed.team_classifier.features, [])
+        self.assertEqual(resumed.team_classifier.model, "heavy model")
+
+    def test_partial_log_record_is_dropped(self):
+        processor = make_processor()
+        checkpointer = TrackingCheckpointer(self.dir, interval_frames=10)
+        run_frames(processor, 0, 10)
+        checkpointer.save(processor, 9)
+        size = os.path.getsize(checkpointer.log_path)
+        # A crash while appending the next record leaves a torn tail behind
+        with open(checkpointer.log_path, "ab") as f:
+            f.write(b"\x80\x05torn")
+
+        resumed = make_processor()
+        self.assertEqual(TrackingCheckpointer(self.dir).restore(resumed), 10)
+        self.assertEqual(os.path.getsize(checkpointer.log_path), size)
+        self.assertEqual(sorted(resumed.tracks["ball"]), list(range(10)))
+
+    def test_checkpoint_of_another_video_is_refused(self):
+        processor = make_processor()
+        run_frames(processor, 0, 5)
+        TrackingCheckpointer(self.dir).save(processor, 4)
+        with self.assertRaises(RuntimeError):
+            TrackingCheckpointer(self.dir).restore(make_processor("other.mp4"))
+
+    def test_checkpoint_with_other_model_or_settings_is_refused(self):
+        processor = make_processor(detection_input_size=(640, 360))
+        run_frames(processor, 0, 5)
+        TrackingCheckpointer(self.dir).save(processor, 4)
+        other_weights = os.path.join(self.tmp.name, "other.pt")
+        with open(other_weights, "wb") as f:
+            f.write(b"other weights")
+        changes = {
+            "model": dict(model_path=other_weights),
+            "tracker_backend": dict(tracker_backend="bytetrack"),
+            "detection_conf": dict(detection_conf=0.1),
+            "detection_interval": dict(detection_interval=3),
+        }
+        for name, overrides in changes.items():
+            with self.subTest(setting=name):
+                settings = dict(detection_input_size=(640, 360), **overrides)
+                with self.assertRaisesRegex(RuntimeError, name):
+                    TrackingCheckpointer(self.dir).restore(make_processor(**settings))
+        # A list and a tuple of the same size are the same setting
+        self.assertEqual(TrackingCheckpointer(self.dir).restore(make_processor(detection_input_size=[640, 360])), 5)
+
+    def test_clear(self):
+        processor = make_processor()
+        run_frames(processor, 0, 5)
+        checkpointer = TrackingCheckpointer(self.dir)
+        checkpointer.save(processor, 4)
+        checkpointer.clear()
+        self.assertIsNone(checkpointer.restore(make_processor()))
+        self.assertEqual(checkpointer.logged_until, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
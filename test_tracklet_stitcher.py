@@ -0,0 +1,86 @@
+
+import unittest
+import numpy as np
+
+from tracklet_stitcher import TrackletStitcher
+
+
+def add_run(tracks, group, sid, frames, start, velocity, team=1):
+    # Straight-line run of one stable ID
+    for k, f in enumerate(frames):
+        pos = (start[0] + velocity[0] * k, start[1] + velocity[1] * k)
+        tracks.setdefault(group, {}).setdefault(f, {})[sid] = {"position": pos, "team_id": team}
+
+
+class TestTrackletStitcher(unittest.TestCase):
+    def setUp(self):
+        self.stitcher = TrackletStitcher(fps=25)
+        self.tracks = {"players": {}, "goalkeepers": {}, "referees": {}, "ball": {}}
+
+    def test_fragment_after_short_gap_is_merged(self):
+        # ID 1 walks right for 40 frames, vanishes for 10 and reappears as ID 7 on the same line
+        add_run(self.tracks, "players", 1, range(0, 40), (100, 300), (3, 0))
+        add_run(self.tracks, "players", 7, range(50, 90), (100 + 3 * 50, 300), (3, 0))
+        stable_class_map = {1: 2, 7: 2}
+        remap, stats = self.stitcher.stitch(self.tracks, stable_class_map)
+        self.assertEqual(remap, {7: 1})
+        self.assertEqual(stable_class_map, {1: 2})
+        self.assertIn(1, self.tracks["players"][60])
+        self.assertNotIn(7, self.tracks["players"][60])
+        self.assertEqual((stats["ids_before"], stats["ids_after"]), (2, 1))
+
+    def test_gates(self):
+        add_run(self.tracks, "players", 1, range(0, 40), (100, 300), (3, 0))
+        # Too far from the extrapolated end
+        add_run(self.tracks, "players", 2, range(45, 80), (900, 600), (3, 0))
+        # Other team
+        add_run(self.tracks, "players", 3, range(45, 80), (235, 300), (3, 0), team=2)
+        # Referee, never linked to a player
+        add_run(self.tracks, "referees", 4, range(45, 80), (235, 300), (3, 0), team=None)
+        # Starts beyond max_gap_seconds
+        add_run(self.tracks, "players", 5, range(300, 340), (100 + 3 * 300, 300), (3, 0))
+        # Overlaps in time, so cannot be the same person
+        add_run(self.tracks, "players", 6, range(30, 70), (190, 300), (3, 0))
+        remap, stats = self.stitcher.stitch(self.tracks, {})
+        self.assertEqual(remap, {})
+        self.assertEqual(stats["ids_after"], 6)
+
+    def test_appearance_gate(self):
+        add_run(self.tracks, "players", 1, range(0, 40), (100, 300), (3, 0))
+        add_run(self.tracks, "players", 2, range(50, 90), (250, 300), (3, 0))
+        appearance = {1: np.array([1.0, 0.0]), 2: np.array([0.0, 1.0])}
+        remap, _ = self.stitcher.stitch(self.tracks, {}, appearance=appearance)
+        self.assertEqual(remap, {})
+        appearance[2] = np.array([0.9, 0.1])
+        remap, _ = self.stitcher.stitch(self.tracks, {}, appearance=appearance)
+        self.assertEqual(remap, {2: 1})
+
+    def test_each_end_links_to_one_start(self):
+        # Two candidates for the same end: the kinematically consistent one wins,
+        # the other stays a separate ID
+        add_run(self.tracks, "players", 1, range(0, 40), (100, 300), (3, 0))
+        add_run(self.tracks, "players", 2, range(45, 80), (235, 300), (3, 0))
+        add_run(self.tracks, "players", 3, range(45, 80), (235, 350), (3, 0))
+        remap, _ = self.stitcher.stitch(self.tracks, {})
+        self.assertEqual(remap, {2: 1})
+
+    def test_chain_of_fragments(self):
+        add_run(self.tracks, "players", 1, range(0, 30), (100, 300), (3, 0))
+        add_run(self.tracks, "players", 2, range(35, 65), (205, 300), (3, 0))
+        add_run(self.tracks, "players", 3, range(70, 100), (310, 300), (3, 0))
+        remap, stats = self.stitcher.stitch(self.tracks, {})
+        self.assertEqual(remap, {2: 1, 3: 1})
+        self.assertEqual(stats["ids_after"], 1)
+
+    def test_ball_possession_is_remapped(self):
+        add_run(self.tracks, "players", 1, range(0, 40), (100, 300), (3, 0))
+        add_run(self.tracks, "players", 7, range(50, 90), (250, 300), (3, 0))
+        self.tracks["ball"][60] = {"ball": {"position": (280, 310), "assigned_track_id": 7}}
+        self.tracks["ball"][10] = {"ball": {"position": (130, 310), "assigned_track_id": 1}}
+        self.stitcher.stitch(self.tracks, {})
+        self.assertEqual(self.tracks["ball"][60]["ball"]["assigned_track_id"], 1)
+        self.assertEqual(self.tracks["ball"][10]["ball"]["assigned_track_id"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+"""
+Tracking checkpoints
+Periodically persists the state of a long OptimizedTrackingProcessor run so it can
+resume after a crash instead of starting from frame 0.
+
+Layout of a checkpoint directory:
+- tracks.log: append-only log; each checkpoint appends one pickled record holding
+  the track entries, camera movements and motion matrices of the frames finished since the previous
+  checkpoint, so checkpoint cost is bounded by the interval, not the match length.
+- state.pkl: small snapshot of tracker / ID-manager / team-classifier / loop state
+  plus the byte offset of the log at that point. Written atomically (tmp + rename),
+  so a crash mid-checkpoint leaves the previous checkpoint intact.
+
+A checkpoint also records the model weights hash and the settings that shape the
+results; resuming with different ones is refused rather than mixing two runs.
+"""
+
+import os
+import pickle
+
+from detector_backends import file_hash
+
+
+# Heavy model objects are rebuilt by the processor's constructor, not checkpointed
+_TEAM_CLASSIFIER_SKIP = ("model", "processor")
+
+_PROCESSOR_FIELDS = (
+    "track_class_map",
+    "stable_class_map",
+    "last_detections",
+    "last_detection_data",
+    "last_ball_detections",
+    "classified_tracks",
+    "predict_only_frames",
+    "id_appearance",
+    "detection_scheduler",
+    "shot_classifier",
+    "pitch_masker",
+    "roi_stats",
+    "ball_tracker",
+    "ball_stats",
+    "stream_decisions",
+    "non_tactical_ranges",
+    "optical_flow_stale",
+    "motion_estimator",
+    "last_camera_movement",
+    "last_camera_matrix",
+    "camera_ahead",
+    "camera_submitted_until",
+    "timers",
+)
+
+# Processor settings that change detections or tracks; a resume must use the same ones
+_RESULT_SETTINGS = (
+    "detector_backend",
+    "tracker_backend",
+    "detection_interval",
+    "adaptive_detection",
+    "detection_min_interval",
+    "detection_max_interval",
+    "detection_input_size",
+    "detection_conf",
+    "detection_iou",
+    "skip_frame_mode",
+    "class_match_min_iou",
+    "team_classification_interval",
+    "camera_estimation_interval",
+    "skip_non_tactical",
+    "pitch_roi",
+    "pitch_mask_refresh_interval",
+    "ball_tracking",
+    "ball_crop_size",
+    "ball_max_lost",
+    "ball_crop_interval",
+)
+
+
+def run_settings(processor):
+    """Weights hash plus the result-shaping settings of `processor`."""
+    settings = {"model": file_hash(processor.model_path)}
+    for name in _RESULT_SETTINGS:
+        value = getattr(processor, name)
+        # Settings may arrive as lists (JSON) or tuples; compare them the same way
+        settings[name] = list(value) if isinstance(value, tuple) else value
+    return settings
+
+
+class TrackingCheckpointer:
+    def __init__(self, checkpoint_dir, interval_frames=1500):
+        self.checkpoint_dir = checkpoint_dir
+        self.interval_frames = max(1, int(interval_frames))
+        self.state_path = os.path.join(checkpoint_dir, "state.pkl")
+        self.log_path = os.path.join(checkpoint_dir, "tracks.log")
+        self.logged_until = 0  # First frame not yet written to the log
+        self.settings = None  # run_settings() of the processor, hashed once per run
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def should_checkpoint(self, frame_idx):
+        return frame_idx + 1 - self.logged_until >= self.interval_frames
+
+    @staticmethod
+    def _tracker_state(tracker):
+        # DeepSort keeps its state in .tracker; the appearance embedder is a model
+        return tracker.tracker if hasattr(tracker, "embedder") else tracker
+
+    def _run_settings(self, processor):
+        if self.settings is None:
+            self.settings = run_settings(processor)
+        return self.settings
+
+    def save(self, processor, frame_idx):
+        """Checkpoint after `frame_idx` has been fully processed."""
+        start = self.logged_until
+        end = frame_idx + 1
+        record = {
+            "frames": (start, end),
+            "tracks": {
+                group: {f: dict(frames[f]) for f in range(start, end) if f in frames}
+                for group, frames in processor.tracks.items()
+            },
+            "camera_movement": processor.camera_movement_per_frame[start:end],
+            "camera_matrices": processor.camera_matrices_per_frame[start:end],
+        }
+        with open(self.log_path, "ab") as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+            log_offset = f.tell()
+
+        team_state = {k: v for k, v in vars(processor.team_classifier).items()
+                      if k not in _TEAM_CLASSIFIER_SKIP}
+        if processor.team_classifier.cluster_ready():
+            # Warm-up samples are only needed until clustering is fitted
+            team_state["features"] = []
+            team_state["track_ids"] = []
+
+        state = {
+            "video_path": processor.video_path,
+            "settings": self._run_settings(processor),
+            "next_frame": end,
+            "log_offset": log_offset,
+            "tracker": self._tracker_state(processor.tracker),
+            "id_manager": processor.id_manager,
+            "team_classifier": team_state,
+            "processor": {name: getattr(processor, name) for name in _PROCESSOR_FIELDS},
+        }
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_path)
+        self.logged_until = end
+
+    def restore(self, processor):
+        """
+        Restore the last checkpoint into `processor`.
+        Returns the frame to resume from, or None when there is nothing to resume.
+        """
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path, "rb") as f:
+            state = pickle.load(f)
+        if state["video_path"] != processor.video_path:
+            raise RuntimeError(
+                f"Checkpoint in {self.checkpoint_dir} belongs to {state['video_path']}, "
+                f"not {processor.video_path}"
+            )
+        settings = self._run_settings(processor)
+        saved = state.get("settings", {})
+        changed = sorted(name for name in settings if saved.get(name) != settings[name])
+        if changed:
+            raise RuntimeError(
+                f"Checkpoint in {self.checkpoint_dir} was written with different "
+                f"{', '.join(changed)}; clear it or restore the original settings"
+            )
+
+        camera_movement = []
+        camera_matrices = []
+        with open(self.log_path, "rb") as f:
+            while f.tell() < state["log_offset"]:
+                record = pickle.load(f)
+                for group, frames in record["tracks"].items():
+                    for frame_idx, frame_data in frames.items():
+                        processor.tracks[group][frame_idx] = frame_data
+                camera_movement.extend(record["camera_movement"])
+                camera_matrices.extend(record["camera_matrices"])
+        # Drop anything appended after the last complete checkpoint
+        with open(self.log_path, "r+b") as f:
+            f.truncate(state["log_offset"])
+
+        if hasattr(processor.tracker, "embedder"):
+            processor.tracker.tracker = state["tracker"]
+        else:
+            processor.tracker = state["tracker"]
+        processor.id_manager = state["id_manager"]
+        vars(processor.team_classifier).update(state["team_classifier"])
+        for name, value in state["processor"].items():
+            setattr(processor, name, value)
+        processor.camera_movement_per_frame = camera_movement
+        processor.camera_matrices_per_frame = camera_matrices
+
+        self.logged_until = state["next_frame"]
+        return state["next_frame"]
+
+    def clear(self):
+        """Remove checkpoint files after a run completes."""
+        for path in (self.state_path, self.log_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.logged_until = 0
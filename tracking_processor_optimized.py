@@ -3,18 +3,30 @@ import torch
 import numpy as np
 import time
 from collections import defaultdict
-from Tracking import load_model, create_tracker, CLASS_COLORS
-from camera_movement_estimator import CameraMovementEstimator
+from Tracking import load_model, create_tracker, predict_tracks, match_boxes, CLASS_COLORS
+from camera_movement_estimator import CameraMovementEstimator, FrameMotionEstimator, UNKNOWN_MOTION
 from speed_and_distance_estimator import SpeedAndDistance_Estimator
 from player_ball_assigner import assign_ball_to_players
 from team_classifier import SiglipTeamClassifier
 from view_transformer import ViewTransformer
+from frame_prefetcher import FramePrefetcher
+from camera_motion_worker import CameraMotionWorker
+from detection_cache import DetectionCache
+from tracking_checkpoint import TrackingCheckpointer
+from crop_features import CropFeatureService, hsv_histogram
+from tracklet_stitcher import TrackletStitcher
+from detection_scheduler import DetectionScheduler
+from shot_classifier import ShotClassifier, add_frame_to_ranges
+from pitch_mask import PitchMasker, letterbox_crop
+from ball_tracker import BallTracker
 
 
 class StableIDManager:
     """
     Maintains stable person IDs across temporary exits by re-identifying
     with appearance (HSV histograms) + position gating.
+    The re-ID gallery is kept as fixed-capacity arrays (one slot per global ID),
+    so a new track is scored against every candidate in a single matrix product.
     """
 
     def __init__(
@@ -25,100 +37,104 @@ class StableIDManager:
         min_hist_score: float = 0.45,
         base_position_gate: float = 80.0,
         max_speed_px_per_frame: float = 18.0,
+        max_gallery_size: int = 256,
     ):
         self.max_inactive_frames = max(1, int(fps * max_inactive_seconds))
         self.hist_bins = hist_bins
         self.min_hist_score = min_hist_score
         self.base_position_gate = base_position_gate
         self.max_speed_px_per_frame = max_speed_px_per_frame
+        self.max_gallery_size = max_gallery_size
 
         self.next_global_id = 1
         self.active_track_to_global = {}
-        self.global_state = {}
 
-    @staticmethod
-    def _clamp_bbox(bbox, width, height):
-        x1, y1, x2, y2 = bbox
-        x1 = max(0, min(width - 1, x1))
-        x2 = max(0, min(width - 1, x2))
-        y1 = max(0, min(height - 1, y1))
-        y2 = max(0, min(height - 1, y2))
-        if x2 <= x1 or y2 <= y1:
-            return None
-        return [x1, y1, x2, y2]
+        # Gallery: slot i describes global ID gallery_gid[i] (-1 = free slot)
+        self.gallery_gid = np.full(max_gallery_size, -1, dtype=np.int64)
+        self.gallery_hist = np.zeros((max_gallery_size, hist_bins * hist_bins), dtype=np.float32)
+        self.gallery_hist_norm = np.zeros(max_gallery_size, dtype=np.float32)
+        self.gallery_has_hist = np.zeros(max_gallery_size, dtype=bool)
+        self.gallery_pos = np.zeros((max_gallery_size, 2), dtype=np.float32)
+        self.gallery_has_pos = np.zeros(max_gallery_size, dtype=bool)
+        self.gallery_last_seen = np.zeros(max_gallery_size, dtype=np.int64)
+        self.gid_to_slot = {}
+        self.evicted = 0
 
     def _compute_hist(self, frame, bbox):
-        h, w = frame.shape[:2]
-        bbox = self._clamp_bbox(bbox, w, h)
-        if bbox is None:
-            return None
-        x1, y1, x2, y2 = bbox
-        if (x2 - x1) < 8 or (y2 - y1) < 8:
-            return None
-        crop = frame[y1:y2, x1:x2]
-        hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
-        hist = cv2.calcHist([hsv], [0, 1], None, [self.hist_bins, self.hist_bins], [0, 180, 0, 256])
-        hist = cv2.normalize(hist, hist).flatten()
-        return hist
-
-    @staticmethod
-    def _cosine_sim(a, b):
-        if a is None or b is None:
-            return None
-        denom = (np.linalg.norm(a) * np.linalg.norm(b)) + 1e-8
-        return float(np.dot(a, b) / denom)
-
-    def _position_gate(self, last_pos, pos, dt):
-        if last_pos is None or pos is None:
-            return True, None
-        dist = float(np.hypot(pos[0] - last_pos[0], pos[1] - last_pos[1]))
-        allowed = self.base_position_gate + self.max_speed_px_per_frame * dt
-        return dist <= allowed, dist / max(allowed, 1e-6)
+        return hsv_histogram(frame, bbox, self.hist_bins)
 
     def _match_inactive(self, hist, pos, frame_idx):
-        best_gid = None
-        best_score = -1.0
-        for gid, state in self.global_state.items():
-            dt = frame_idx - state["last_seen"]
-            if dt <= 0 or dt > self.max_inactive_frames:
-                continue
-
-            ok, pos_ratio = self._position_gate(state.get("last_pos"), pos, dt)
-            if not ok:
-                continue
+        used = self.gallery_gid >= 0
+        dt = frame_idx - self.gallery_last_seen
+        candidates = used & (dt > 0) & (dt <= self.max_inactive_frames)
+        if not candidates.any():
+            return None
 
-            hist_score = self._cosine_sim(hist, state.get("hist"))
-            if hist_score is None:
-                # Fallback to position-only score
-                score = 1.0 - (pos_ratio or 1.0)
-            else:
-                # Slightly penalize larger position deltas
-                score = hist_score - 0.15 * (pos_ratio or 0.0)
+        # Position gate: allowed distance grows with the time since last seen
+        pos_ratio = np.zeros(len(dt), dtype=np.float64)
+        has_ratio = self.gallery_has_pos & (pos is not None)
+        if pos is not None:
+            dist = np.hypot(pos[0] - self.gallery_pos[:, 0], pos[1] - self.gallery_pos[:, 1])
+            allowed = self.base_position_gate + self.max_speed_px_per_frame * dt
+            candidates &= ~has_ratio | (dist <= allowed)
+            pos_ratio = np.where(has_ratio, dist / np.maximum(allowed, 1e-6), 0.0)
+        if not candidates.any():
+            return None
 
-            if score > best_score:
-                best_score = score
-                best_gid = gid
+        if hist is not None:
+            hist_scores = self.gallery_hist @ hist.astype(np.float32)
+            hist_scores /= self.gallery_hist_norm * np.sqrt(np.dot(hist, hist)) + 1e-8
+            # Slightly penalize larger position deltas
+            scores = np.where(self.gallery_has_hist, hist_scores - 0.15 * pos_ratio,
+                              1.0 - np.where(pos_ratio > 0, pos_ratio, 1.0))
+        else:
+            # Fallback to position-only score
+            scores = 1.0 - np.where(pos_ratio > 0, pos_ratio, 1.0)
 
-        if best_gid is not None and best_score >= self.min_hist_score:
-            return best_gid
+        scores = np.where(candidates, scores, -np.inf)
+        best = int(np.argmax(scores))
+        if scores[best] >= self.min_hist_score:
+            return int(self.gallery_gid[best])
         return None
 
-    def assign(self, track_id, frame, bbox, pos, frame_idx):
+    def _slot_for(self, gid):
+        slot = self.gid_to_slot.get(gid)
+        if slot is not None:
+            return slot
+        free = np.flatnonzero(self.gallery_gid < 0)
+        if len(free):
+            slot = int(free[0])
+        else:
+            # Gallery full: evict the least recently seen identity
+            slot = int(np.argmin(self.gallery_last_seen))
+            self.gid_to_slot.pop(int(self.gallery_gid[slot]), None)
+            self.evicted += 1
+        self.gallery_gid[slot] = gid
+        self.gid_to_slot[gid] = slot
+        return slot
+
+    def assign(self, track_id, frame, bbox, pos, frame_idx, hist=None):
+        # hist: precomputed HSV histogram of the crop (e.g. from CropFeatureService)
+        if hist is None:
+            hist = self._compute_hist(frame, bbox)
         if track_id in self.active_track_to_global:
             gid = self.active_track_to_global[track_id]
         else:
-            hist = self._compute_hist(frame, bbox)
             gid = self._match_inactive(hist, pos, frame_idx)
             if gid is None:
                 gid = self.next_global_id
                 self.next_global_id += 1
             self.active_track_to_global[track_id] = gid
 
-        hist = self._compute_hist(frame, bbox)
-        state = self.global_state.setdefault(gid, {})
-        state["hist"] = hist
-        state["last_pos"] = pos
-        state["last_seen"] = frame_idx
+        slot = self._slot_for(gid)
+        if hist is not None:
+            self.gallery_hist[slot] = hist
+            self.gallery_hist_norm[slot] = np.sqrt(np.dot(hist, hist))
+        self.gallery_has_hist[slot] = hist is not None
+        if pos is not None:
+            self.gallery_pos[slot] = pos
+        self.gallery_has_pos[slot] = pos is not None
+        self.gallery_last_seen[slot] = frame_idx
         return gid
 
     def cleanup(self, seen_track_ids, frame_idx):
@@ -127,33 +143,63 @@ class StableIDManager:
         for tid in missing:
             self.active_track_to_global.pop(tid, None)
 
-        # Prune very old inactive IDs
+        # Free gallery slots of very old inactive IDs
         prune_after = self.max_inactive_frames * 3
-        to_delete = [gid for gid, st in self.global_state.items()
-                     if frame_idx - st.get("last_seen", frame_idx) > prune_after]
-        for gid in to_delete:
-            self.global_state.pop(gid, None)
+        expired = np.flatnonzero((self.gallery_gid >= 0) & (frame_idx - self.gallery_last_seen > prune_after))
+        for slot in expired.tolist():
+            self.gid_to_slot.pop(int(self.gallery_gid[slot]), None)
+        self.gallery_gid[expired] = -1
 
 class OptimizedTrackingProcessor:
     """Optimized version with performance improvements"""
     
-    def __init__(self, video_path, model_path, pixels_per_meter=30):
+    def __init__(self, video_path, model_path, pixels_per_meter=30, detector_backend="torch",
+                 tracker_backend="deepsort"):
         self.video_path = video_path
         self.model_path = model_path
         self.pixels_per_meter = pixels_per_meter
+        self.detector_backend = detector_backend
         
         # OPTIMIZATION: Add performance flags
-        self.detection_interval = 2  # Run detection every N frames
+        self.detection_interval = 2  # Run detection every N frames (starting interval when adaptive)
+        self.adaptive_detection = True  # Let DetectionScheduler adapt the interval to scene difficulty
+        self.detection_min_interval = 1
+        self.detection_max_interval = 6
+        self.detection_trace_path = None  # CSV of scheduler interval decisions; None disables it
+        self.detection_batch_size = 4  # Detection frames per batched predict call
+        self.detection_input_size = (640, 360)  # Detector input (width, height)
+        self.detection_conf = 0.4
+        self.detection_iou = 0.5
+        self.detection_cache_dir = "stub/detections"  # Replay cache; None disables it
+        self.detection_cache_max_bytes = 2 * 1024 ** 3
+        self.detection_cache_writeback = True  # False leaves new entries to the caller (shard workers)
+        self.skip_frame_mode = "predict"  # Between detections: "predict" (Kalman only) or "reuse" stale boxes
+        self.class_match_min_iou = 0.3  # Track/detection IoU needed to copy a detection's class
         self.team_classification_interval = 30  # Classify teams every N frames
         self.camera_estimation_interval = 1  # Camera movement every N frames
+        self.camera_worker_depth = 32  # Decoded frames queued for the camera motion thread
         self.profile_performance = True  # Enable profiling
+        self.prefetch_depth = 8  # Frames decoded ahead on the prefetch thread
+        self.prefetch_policy = "block"  # Back-pressure: "block" or "drop_oldest"
+        self.checkpoint_dir = None  # Periodic resumable checkpoints; None disables them
+        self.checkpoint_interval = 1500  # Frames between checkpoints
+        self.stitch_tracklets = True  # Offline global merge of fragmented stable IDs in post_process
+        self.skip_non_tactical = True  # Skip replays / close-ups found by ShotClassifier
+        self.pitch_roi = True  # Detect on a pitch crop and drop off-pitch detections before tracking
+        self.pitch_mask_refresh_interval = 10  # Frames between full pitch re-segmentations
+        self.ball_tracking = True  # Per-frame ball from a motion model plus crop detection at its prediction
+        self.ball_crop_size = (640, 360)  # Native-resolution search window around the predicted ball
+        self.ball_max_lost = 10  # Missed frames before the ball is unlocked (full-frame re-acquisition)
+        self.ball_crop_interval = 3  # Frames without a ball measurement between crop searches; prediction fills the rest
         
         # Initialize models
-        self.model = load_model(model_path)
-        self.tracker = create_tracker()
+        # INT8 calibration (first run only) samples frames from the video being processed
+        self.model = load_model(model_path, backend=detector_backend, calibration_video=video_path)
+        self.tracker_backend = tracker_backend
+        self.tracker = create_tracker(backend=tracker_backend)
         
         # Device selection (CPU fallback)
-        if torch.cuda.is_available():
+        if torch.cuda.is_available() and detector_backend == "torch":
             self.device = "cuda"
             self.half = True
             print("🚀 Using CUDA for tracking")
@@ -189,25 +235,43 @@ class OptimizedTrackingProcessor:
             pca_components=64,
         )
         self.id_manager = StableIDManager(fps=self.fps)
+        self.crop_features = CropFeatureService(
+            reid_embedder=getattr(self.tracker, "embedder", None),
+            team_embed_fn=self.team_classifier.extract_embeddings,
+            hist_bins=self.id_manager.hist_bins,
+        )
         
         # Data storage
         self.tracks = defaultdict(lambda: defaultdict(dict))
         self.track_class_map = {}
         self.stable_class_map = {}
         self.camera_movement_per_frame = []
+        self.camera_matrices_per_frame = []  # 3x3 previous -> current frame motion; NaN across cuts
         
         self.last_detections = []
         self.last_detection_data = []
         self.last_ball_detections = []
         self.classified_tracks = set()
+        self.predict_only_frames = 0
+        self.id_appearance = {}  # stable_id -> summed HSV histogram, used by the tracklet stitcher
+        self.tracklet_id_map = {}
+        self.non_tactical_ranges = []  # [start, end) frame ranges of replays / close-ups
+        self.optical_flow_stale = False
+        self.last_camera_movement = [0, 0]
+        self.last_camera_matrix = UNKNOWN_MOTION
+        self.camera_ahead = {}  # frame_idx -> movement computed ahead of the main loop
+        self.camera_submitted_until = -1  # Last frame handed to the camera worker
         
         # Performance tracking
         self.timers = {
             'detection': 0,
             'tracking': 0,
+            'tracking_predict': 0,
             'team_class': 0,
             'camera': 0,
             'data_prep': 0,
+            'decode_stall': 0,
+            'ball': 0,
             'total': 0
         }
         
@@ -217,32 +281,27 @@ class OptimizedTrackingProcessor:
         print(f"✅ Optimized Tracking Processor Initialized")
         print(f"📊 Video: {self.fps} FPS, {self.width}x{self.height}, {self.total_frames} frames")
         print(f"⚡ Performance Optimizations:")
-        print(f"   - Detection interval: {self.detection_interval} frames")
+        print(f"   - Detector backend: {self.detector_backend}")
+        print(f"   - Tracker backend: {self.tracker_backend}")
+        print(f"   - Detection interval: {self.detection_interval} frames"
+              f" (adaptive {self.detection_min_interval}-{self.detection_max_interval}: {self.adaptive_detection})")
+        print(f"   - Detection batch size: {self.detection_batch_size} frames")
         print(f"   - Team classification interval: {self.team_classification_interval} frames")
         print(f"   - Camera estimation interval: {self.camera_estimation_interval} frames")
+        print(f"   - Frame prefetch: depth {self.prefetch_depth}, policy '{self.prefetch_policy}'")
     
     def _init_optical_flow(self, first_frame):
         """Initialize optical flow parameters"""
-        self.old_gray = cv2.cvtColor(first_frame, cv2.COLOR_BGR2GRAY)
-        mask_features = np.zeros_like(self.old_gray)
-        mask_features[:, 0:20] = 1
-        mask_features[:, -20:] = 1
-        
-        self.old_features = cv2.goodFeaturesToTrack(
-            self.old_gray,
-            maxCorners=100,
-            qualityLevel=0.3,
-            minDistance=3,
-            blockSize=7,
-            mask=mask_features
-        )
+        self.motion_estimator = FrameMotionEstimator(first_frame.shape)
+        self._reset_optical_flow(first_frame)
         self.camera_movement_per_frame.append([0, 0])
-        
-        self.lk_params = dict(
-            winSize=(15, 15),
-            maxLevel=2,
-            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
-        )
+        self.camera_matrices_per_frame.append(UNKNOWN_MOTION)
+        self.last_camera_movement = [0, 0]
+        self.last_camera_matrix = UNKNOWN_MOTION
+    
+    def _reset_optical_flow(self, frame):
+        """Restart feature tracking from this frame (new shot or new shard)"""
+        self.motion_estimator.reset(frame)
     
     @staticmethod
     def get_foot_position(bbox):
@@ -275,148 +334,497 @@ class OptimizedTrackingProcessor:
     
     def estimate_camera_movement(self, frame):
         """Estimate camera movement for current frame"""
-        frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        if self.old_features is not None and len(self.old_features) > 0:
-            new_features, status, _ = cv2.calcOpticalFlowPyrLK(
-                self.old_gray, frame_gray, self.old_features, None, **self.lk_params
-            )
-            
-            if new_features is not None:
-                max_distance = 0
-                camera_dx, camera_dy = 0, 0
-                
-                for new, old in zip(new_features, self.old_features):
-                    new_pt = new.ravel()
-                    old_pt = old.ravel()
-                    distance = np.sqrt((new_pt[0] - old_pt[0])**2 + (new_pt[1] - old_pt[1])**2)
-                    
-                    if distance > max_distance:
-                        max_distance = distance
-                        camera_dx = old_pt[0] - new_pt[0]
-                        camera_dy = old_pt[1] - new_pt[1]
-                
-                if max_distance > 5:
-                    mask = np.zeros_like(frame_gray)
-                    mask[:, 0:20] = 1
-                    mask[:, -20:] = 1
-                    self.old_features = cv2.goodFeaturesToTrack(
-                        frame_gray, maxCorners=100, qualityLevel=0.3,
-                        minDistance=3, blockSize=7, mask=mask
-                    )
-                
-                self.old_gray = frame_gray
-                return (camera_dx, camera_dy)
-        
-        self.old_gray = frame_gray
-        return (0, 0)
+        # OPTIMIZATION: One vectorized RANSAC fit over all tracked features on a pyrDown level
+        motion = self.motion_estimator.update(frame)
+        return (motion.dx, motion.dy), motion.matrix.astype(np.float32)
+    
+    def _camera_step(self, frame_idx, frame, tactical, start_frame):
+        """
+        (movement, motion matrix) for one frame, run on the camera worker thread in stream order.
+        Returns None for frames that get no entry from it (replays, the start frame).
+        """
+        if not tactical:
+            self.optical_flow_stale = True
+            return None
+        if frame_idx <= start_frame:
+            return None
+        if self.optical_flow_stale:
+            # First frame after a replay/close-up: no meaningful motion across the cut
+            self._reset_optical_flow(frame)
+            self.optical_flow_stale = False
+            movement, matrix = [0, 0], UNKNOWN_MOTION
+        elif frame_idx % self.camera_estimation_interval == 0:
+            movement, matrix = self.estimate_camera_movement(frame)
+            movement = list(movement)
+        else:
+            # Reuse last camera movement
+            movement, matrix = self.last_camera_movement, self.last_camera_matrix
+        self.last_camera_movement = movement
+        self.last_camera_matrix = matrix
+        return movement, matrix
     
-    def process_video(self, frames_limit=None):
-        """Main tracking loop with optimizations"""
+    def _result_to_arrays(self, result, frame_shape, transform=None):
+        """
+        Convert one detector result into full-resolution (xyxy, cls, conf) arrays.
+        Box tensors are copied to NumPy once and rescaled in one step.
+        transform=(scale, offset_x, offset_y) maps a letterboxed pitch crop back to the frame.
+        """
+        boxes = getattr(result, "boxes", None)
+        if boxes is None or len(boxes) == 0:
+            return np.zeros((0, 4), np.int32), np.zeros(0, np.int32), np.zeros(0, np.float32)
+
+        in_w, in_h = self.detection_input_size
+        if transform is None:
+            scale = np.array([frame_shape[1] / in_w, frame_shape[0] / in_h] * 2)
+            xyxy = (boxes.xyxy.cpu().numpy().astype(np.int32) * scale).astype(np.int32)
+        else:
+            s, off_x, off_y = transform
+            xyxy = (boxes.xyxy.cpu().numpy() * s + np.array([off_x, off_y] * 2)).astype(np.int32)
+        cls = boxes.cls.cpu().numpy().astype(np.int32)
+        conf = boxes.conf.cpu().numpy().astype(np.float32)
+        return xyxy, cls, conf
+
+    @staticmethod
+    def _split_detections(xyxy, cls, conf, ball_conf=0.0):
+        """Split full-resolution box arrays into tracker inputs and ball detections"""
+        detections = []
+        detection_data = []
+        ball_detections = []
+        for (x1, y1, x2, y2), c, score in zip(xyxy.tolist(), cls.tolist(), conf.tolist()):
+            if c == 0:
+                if score >= ball_conf:
+                    ball_detections.append({'bbox': [x1, y1, x2, y2], 'cls': c, 'conf': score})
+            elif x2 > x1 and y2 > y1:
+                detections.append([[x1, y1, x2 - x1, y2 - y1], score, str(c)])
+                detection_data.append({'bbox': [x1, y1, x2, y2], 'cls': c, 'conf': score})
+        return detections, detection_data, ball_detections
+
+    def _frame_detections(self, arrays, pitch_mask):
+        """Tracker inputs and ball detections of one full-frame detector output"""
+        return self._split_detections(*self._drop_off_pitch(arrays, pitch_mask), ball_conf=self.detection_conf)
+
+    def _detector_conf(self):
+        """
+        Score threshold of full-frame detection. ByteTrack associates boxes down to its
+        low_thresh in its second stage, so the detector keeps those for it; ball
+        detections are still cut at detection_conf by _split_detections.
+        """
+        low_thresh = getattr(self.tracker, "low_thresh", None)
+        return self.detection_conf if low_thresh is None else min(self.detection_conf, low_thresh)
+
+    def _detect_batch(self, frames, rois=None):
+        """
+        Run a single predict call over several frames; outputs are in frame order.
+        A frame with a pitch ROI is detected on that crop instead of the whole frame.
+        """
+        frames_small = []
+        transforms = []
+        base_scale = min(self.detection_input_size[0] / self.width, self.detection_input_size[1] / self.height)
+        for frame, roi in zip(frames, rois or [None] * len(frames)):
+            if roi is None:
+                frames_small.append(cv2.resize(frame, self.detection_input_size))
+                transforms.append(None)
+            else:
+                image, transform = letterbox_crop(frame, roi, self.detection_input_size)
+                frames_small.append(image)
+                transforms.append(transform)
+                self.roi_stats['roi_frames'] += 1
+                self.roi_stats['resolution_gain'] += 1.0 / (transform[0] * base_scale)
+        with torch.no_grad():
+            results = self.model.predict(
+                frames_small, conf=self._detector_conf(), iou=self.detection_iou,
+                device=self.device, half=self.half, verbose=False
+            )
+        self.roi_stats['detector_frames'] += len(frames)
+        return [self._result_to_arrays(result, frame.shape, transform)
+                for result, frame, transform in zip(results, frames, transforms)]
+
+    def _drop_off_pitch(self, arrays, pitch_mask):
+        """Remove person boxes whose foot point is outside the pitch mask (the ball is kept)"""
+        xyxy, cls, conf = arrays
+        persons = cls != 0
+        self.roi_stats['person_detections'] += int(np.count_nonzero(persons))
+        if self.pitch_masker is None or pitch_mask is None:
+            return arrays
+        keep = ~persons | self.pitch_masker.on_pitch(pitch_mask, xyxy)
+        self.roi_stats['off_pitch'] += int(np.count_nonzero(~keep))
+        return xyxy[keep], cls[keep], conf[keep]
+
+    def _open_detection_cache(self):
+        """Load cached detections for this video/model/settings, if enabled"""
+        self.detection_cache = None
+        self.detection_cache_key = None
+        self.cached_detections = {}
+        self.new_detections = {}
+        self.cached_ball_crops = {}
+        self.new_ball_crops = {}
+        if not self.detection_cache_dir:
+            return
+        self.detection_cache = DetectionCache(self.detection_cache_dir, self.detection_cache_max_bytes)
+        self.detection_cache_key = DetectionCache.make_key(
+            self.video_path, self.model_path, self.detection_input_size,
+            self._detector_conf(), self.detection_iou, self.detector_backend, self.pitch_roi,
+            roi_settings=self.pitch_masker.settings if self.pitch_masker is not None else None,
+        )
+        self.cached_detections = self.detection_cache.load(self.detection_cache_key) or {}
+        if self.cached_detections:
+            print(f"🗃️ Detection cache hit: {len(self.cached_detections)} frames will be replayed")
+        if self.ball_tracking:
+            self.ball_crop_cache_key = DetectionCache.make_key(
+                self.video_path, self.model_path, self.detection_input_size,
+                self.detection_conf, self.detection_iou, self.detector_backend, ball_crop=True,
+            )
+            self.cached_ball_crops = self.detection_cache.load(self.ball_crop_cache_key, with_rois=True) or {}
+
+    def pending_cache_writes(self):
+        """[(key, detections, rois)] not yet written to the detection cache"""
+        writes = []
+        if self.detection_cache is None:
+            return writes
+        if self.new_detections:
+            writes.append((self.detection_cache_key, self.new_detections, None))
+        if self.new_ball_crops:
+            writes.append((
+                self.ball_crop_cache_key,
+                {f: arrays for f, (_, arrays) in self.new_ball_crops.items()},
+                {f: roi for f, (roi, _) in self.new_ball_crops.items()},
+            ))
+        return writes
+
+    def _save_detection_cache(self):
+        if not self.detection_cache_writeback:
+            return
+        for key, detections, rois in self.pending_cache_writes():
+            self.detection_cache.save(key, detections, rois=rois)
+            kind = "new frames" if rois is None else "ball crop searches"
+            print(f"🗃️ Detection cache updated with {len(detections)} {kind}")
+
+    def _detection_stream(self, prefetcher):
+        """
+        Yield (frame_idx, frame, detections, tactical) in frame order.
+        Every frame is first classified by the ShotClassifier; non-tactical frames
+        (replays, close-ups) are never scheduled for detection. Tactical frames get a
+        pitch mask, used to crop detection and filter off-pitch boxes. Detection-interval
+        frames are replayed from the detection cache when possible;
+        the rest are buffered until `detection_batch_size` of them are collected and
+        sent through the detector together. Frames in between are held back until the
+        batch resolves and carry detections=None. When the adaptive scheduler's interval
+        shrinks, the frames decided ahead of it are decided again before the next release.
+        """
+        pending = []
+        batch = []
+        redecided_until = -1
+        while True:
+            stall_before = prefetcher.stall_time
+            item = prefetcher.read()
+            self.timers['decode_stall'] += prefetcher.stall_time - stall_before
+
+            if item is not None:
+                frame_idx, frame = item
+                # Decisions run ahead of the main loop; they are checkpointed so a resume replays them
+                decision = self.stream_decisions.get(frame_idx)
+                if decision is None:
+                    tactical = self.shot_classifier.update(frame_idx, frame) if self.shot_classifier else True
+                    pitch_mask = self._update_pitch_mask(frame_idx, frame) if tactical else None
+                    detect = tactical and self.detection_scheduler.should_detect(frame_idx)
+                    decision = (tactical, detect, None, pitch_mask)
+                    self.stream_decisions[frame_idx] = decision
+                tactical, detect, arrays, pitch_mask = decision
+                if frame_idx > self.camera_submitted_until:
+                    # Camera motion starts on its own thread as soon as the frame is decoded
+                    self.camera_worker.submit(frame_idx, frame, tactical)
+                    self.camera_submitted_until = frame_idx
+                pending.append([frame_idx, frame, None, tactical, pitch_mask])
+                if detect and arrays is not None:
+                    # Its batch resolved before the checkpoint this run resumed from
+                    pending[-1][2] = self._frame_detections(arrays, pitch_mask)
+                elif detect:
+                    cached = self.cached_detections.get(frame_idx)
+                    if cached is not None:
+                        pending[-1][2] = self._frame_detections(cached, pitch_mask)
+                    # Cached frames still take their batch slot, so frames are released (and the
+                    # adaptive scheduler observes them) at the same points with a warm or cold cache
+                    batch.append(pending[-1])
+
+            # Frames decided again after a shrinking interval are released as soon as the last is read
+            if batch and (item is None or len(batch) >= self.detection_batch_size
+                          or (item is not None and item[0] == redecided_until)):
+                self._resolve_batch(batch)
+                batch = []
+
+            if not batch:
+                for i, entry in enumerate(pending):
+                    if self.detection_scheduler.urgent:
+                        redecided_until = max(redecided_until, self._redecide(pending[i:]))
+                    self.stream_decisions.pop(entry[0], None)
+                    yield tuple(entry[:4])
+                pending = []
+
+            if item is None:
+                return
+
+    def _resolve_batch(self, batch):
+        """Run the detector on the batch entries the cache could not answer"""
+        to_detect = [entry for entry in batch if entry[2] is None]
+        for entry in batch:
+            if entry[2] is not None:
+                self.stream_decisions[entry[0]] = (entry[3], True, self.cached_detections[entry[0]], entry[4])
+        if not to_detect:
+            return
+        t1 = time.time()
+        rois = [self.pitch_masker.roi(entry[4]) if self.pitch_masker else None for entry in to_detect]
+        outputs = self._detect_batch([entry[1] for entry in to_detect], rois)
+        for entry, arrays in zip(to_detect, outputs):
+            self.new_detections[entry[0]] = arrays
+            self.stream_decisions[entry[0]] = (entry[3], True, arrays, entry[4])
+            entry[2] = self._frame_detections(arrays, entry[4])
+        self.timers['detection'] += time.time() - t1
+
+    def _redecide(self, pending):
+        """
+        The scheduler's interval shrank while later frames were already decided under the
+        old one: decide every frame not processed yet again and detect the newly scheduled
+        pending frames right away. Frames decided but not decoded yet (after a resume) only
+        get their decision updated. Returns the last frame decided again.
+        """
+        scheduler = self.detection_scheduler
+        scheduler.urgent = False
+        entries = {entry[0]: entry for entry in pending}
+        to_resolve = []
+        last = -1
+        for frame_idx in sorted(f for f in self.stream_decisions if f >= pending[0][0]):
+            tactical, detect, arrays, pitch_mask = self.stream_decisions[frame_idx]
+            last = frame_idx
+            if not tactical or not scheduler.redecide(frame_idx, detect) or detect:
+                continue
+            self.stream_decisions[frame_idx] = (tactical, True, None, pitch_mask)
+            entry = entries.get(frame_idx)
+            if entry is not None:
+                cached = self.cached_detections.get(frame_idx)
+                if cached is not None:
+                    entry[2] = self._frame_detections(cached, pitch_mask)
+                to_resolve.append(entry)
+        if to_resolve:
+            self._resolve_batch(to_resolve)
+        return last
+
+    def _detect_ball_crop(self, frame_idx, frame, roi):
+        """Ball detections from one native-resolution crop, replayed from the cache for the same window"""
+        cached = self.cached_ball_crops.get(frame_idx)
+        if cached is not None and cached[0] == tuple(roi):
+            self.ball_stats['crop_cached'] += 1
+            return self._split_detections(*cached[1])[2]
+        image, transform = letterbox_crop(frame, roi, self.detection_input_size)
+        with torch.no_grad():
+            result = self.model.predict(
+                [image], conf=self.detection_conf, iou=self.detection_iou,
+                device=self.device, half=self.half, verbose=False
+            )[0]
+        self.ball_stats['crop_calls'] += 1
+        arrays = self._result_to_arrays(result, frame.shape, transform)
+        self.new_ball_crops[frame_idx] = (tuple(roi), arrays)
+        return self._split_detections(*arrays)[2]
+
+    def _track_ball(self, frame_idx, frame, full_balls, camera_movement):
+        """
+        Ball for this frame: a full-frame detection near the prediction if there is one.
+        Otherwise the prediction fills in, and a crop around it is searched only every
+        ball_crop_interval frames without a measurement.
+        Returns (balls, measured, crop_searched).
+        """
+        tracker = self.ball_tracker
+        self.ball_stats['frames'] += 1
+        predicted = tracker.predict(camera_movement)
+        ball = tracker.select(full_balls, predicted)
+        source = 'full'
+        searched = False
+        if ball is None and predicted is not None and tracker.should_search(self.ball_crop_interval):
+            roi = tracker.crop_roi(predicted, frame.shape)
+            ball = tracker.select(self._detect_ball_crop(frame_idx, frame, roi), predicted)
+            source = 'crop'
+            searched = True
+        if ball is not None:
+            tracker.update(ball)
+            self.ball_stats[source] += 1
+            return [ball], True, searched
+        tracker.miss()
+        if predicted is not None and tracker.locked:
+            self.ball_stats['predicted'] += 1
+            return [tracker.predicted_ball()], False, searched
+        return [], False, searched
+
+    def _update_pitch_mask(self, frame_idx, frame):
+        """Pitch mask for a tactical frame, reusing the shot classifier's downscaled copy"""
+        if self.pitch_masker is None:
+            return None
+        shots = self.shot_classifier
+        if shots is None or shots.size != self.pitch_masker.size:
+            return self.pitch_masker.update(frame_idx, frame)
+        # A new shot invalidates the mask carried over from the previous one
+        return self.pitch_masker.update(frame_idx, frame, small=shots.small,
+                                        force_refresh=shots.shot_start == frame_idx)
+
+    def process_video(self, frames_limit=None, start_frame=0, resume=False):
+        """
+        Main tracking loop with optimizations.
+        frames_limit is an absolute (exclusive) end frame; start_frame lets a
+        time shard begin mid-video while keeping global frame indices.
+        resume=True continues from the last checkpoint in checkpoint_dir, if any.
+        """
         print(f"\n🎬 Starting optimized video processing... (Limit: {frames_limit if frames_limit else 'None'})")
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-        frame_idx = 0
+        if start_frame > 0:
+            # Restart optical flow at the shard's first frame
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            ret, first_frame = self.cap.read()
+            if not ret:
+                raise RuntimeError(f"Could not read start frame {start_frame}")
+            self.camera_movement_per_frame = [[0, 0]] * start_frame
+            self.camera_matrices_per_frame = [UNKNOWN_MOTION] * start_frame
+            self._init_optical_flow(first_frame)
+        # OPTIMIZATION: Detection interval adapts to camera motion, track uncertainty and ball loss
+        self.detection_scheduler = DetectionScheduler(
+            base_interval=self.detection_interval,
+            min_interval=self.detection_min_interval,
+            max_interval=self.detection_max_interval,
+            adaptive=self.adaptive_detection,
+        )
+        # OPTIMIZATION: Cheap shot-cut / wide-view test so replays and close-ups skip the heavy stages
+        self.shot_classifier = ShotClassifier() if self.skip_non_tactical else None
+        # OPTIMIZATION: Pitch mask crops detector input and filters stand / ad-board boxes
+        self.pitch_masker = PitchMasker(
+            (self.height, self.width), refresh_interval=self.pitch_mask_refresh_interval
+        ) if self.pitch_roi else None
+        self.roi_stats = {'detector_frames': 0, 'roi_frames': 0, 'resolution_gain': 0.0,
+                          'person_detections': 0, 'off_pitch': 0}
+        # frame_idx -> (tactical, detect, detections, pitch_mask) decided but not yet processed
+        self.stream_decisions = {}
+        # OPTIMIZATION: Ball follows a motion model; the detector only sees a crop around its prediction
+        self.ball_tracker = BallTracker(
+            crop_size=self.ball_crop_size, max_lost=self.ball_max_lost
+        ) if self.ball_tracking else None
+        self.ball_stats = {'frames': 0, 'full': 0, 'crop': 0, 'predicted': 0, 'crop_calls': 0, 'crop_cached': 0}
+        checkpointer = None
+        first_frame_idx = start_frame
+        if self.checkpoint_dir:
+            checkpointer = TrackingCheckpointer(self.checkpoint_dir, self.checkpoint_interval)
+            resume_frame = checkpointer.restore(self) if resume else None
+            if resume_frame is not None:
+                first_frame_idx = resume_frame
+                print(f"♻️ Resuming from checkpoint at frame {resume_frame}")
+            else:
+                checkpointer.clear()
+        # OPTIMIZATION: Replay detections from previous runs when available
+        self._open_detection_cache()
+        # OPTIMIZATION: Decode on a background thread so it overlaps with inference
+        prefetcher = FramePrefetcher(
+            self.cap,
+            depth=self.prefetch_depth,
+            policy=self.prefetch_policy,
+            start_frame=first_frame_idx,
+            frames_limit=frames_limit,
+        ).start()
+        # OPTIMIZATION: Camera motion runs on a worker thread, concurrently with detection
+        self.camera_worker = CameraMotionWorker(
+            lambda idx, frame, tactical: self._camera_step(idx, frame, tactical, start_frame),
+            depth=self.camera_worker_depth,
+            results=self.camera_ahead,
+        ).start()
+        # OPTIMIZATION: Detection runs batched inside the frame stream
+        stream = self._detection_stream(prefetcher)
+        frame_idx = first_frame_idx
         
         while True:
-            if frames_limit and frame_idx >= frames_limit:
-                break
             frame_start = time.time()
             
-            ret, frame = self.cap.read()
-            if not ret:
+            item = next(stream, None)
+            if item is None:
                 break
+            frame_idx, frame, fresh_detections, tactical = item
             
-            # OPTIMIZATION: Camera movement - run less frequently or skip for static camera
-            t1 = time.time()
-            if frame_idx > 0 and frame_idx % self.camera_estimation_interval == 0:
-                camera_movement = self.estimate_camera_movement(frame)
-                self.camera_movement_per_frame.append(list(camera_movement))
-            elif frame_idx > 0:
-                # Reuse last camera movement
+            # Frames dropped by the prefetcher still get a camera movement entry
+            while frame_idx > start_frame and len(self.camera_movement_per_frame) < frame_idx:
                 self.camera_movement_per_frame.append(self.camera_movement_per_frame[-1])
-            self.timers['camera'] += time.time() - t1
+                # The next estimated frame carries the whole motion across the gap
+                self.camera_matrices_per_frame.append(np.eye(3, dtype=np.float32))
             
-            camera_dx, camera_dy = self.camera_movement_per_frame[frame_idx]
+            if not tactical:
+                self._process_non_tactical_frame(frame_idx, frame, start_frame)
+                if checkpointer is not None and checkpointer.should_checkpoint(frame_idx):
+                    self.camera_worker.wait_idle()
+                    checkpointer.save(self, frame_idx)
+                frame_idx += 1
+                continue
             
-            # OPTIMIZATION: Run detection every N frames
-            t1 = time.time()
-            if frame_idx % self.detection_interval == 0:
-                frame_small = cv2.resize(frame, (640, 360))
-                
-                with torch.no_grad():
-                    results = self.model.predict(
-                        frame_small, conf=0.4, iou=0.5,
-                        device=self.device, half=self.half, verbose=False
-                    )[0]
-                
-                detections = []
-                detection_data = []
-                ball_detections = []
-                
-                for box in getattr(results, "boxes", []):
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    x1 = int(x1 * frame.shape[1] / 640)
-                    x2 = int(x2 * frame.shape[1] / 640)
-                    y1 = int(y1 * frame.shape[0] / 360)
-                    y2 = int(y2 * frame.shape[0] / 360)
-                    
-                    cls = int(box.cls[0])
-                    conf = float(box.conf[0])
-                    
-                    if cls == 0:
-                        ball_detections.append({'bbox': [x1, y1, x2, y2], 'cls': cls, 'conf': conf})
-                    else:
-                        detections.append([[x1, y1, x2-x1, y2-y1], conf, str(cls)])
-                        detection_data.append({'bbox': [x1, y1, x2, y2], 'cls': cls, 'conf': conf})
+            # OPTIMIZATION: Detection every N frames (computed in the batched stream)
+            if fresh_detections is not None:
+                detections, detection_data, ball_detections = fresh_detections
                 
                 # Cache detections
                 self.last_detections = detections
                 self.last_detection_data = detection_data
                 self.last_ball_detections = ball_detections
+            elif self.skip_frame_mode == "predict":
+                # OPTIMIZATION: No fresh boxes - advance tracks by Kalman prediction only
+                detections = None
+                detection_data = []
+                ball_detections = self.last_ball_detections
             else:
                 # Reuse cached detections
                 detections = self.last_detections
                 detection_data = self.last_detection_data
                 ball_detections = self.last_ball_detections
             
-            self.timers['detection'] += time.time() - t1
-            
             # Tracking (always run - tracker handles missing detections)
+            self.crop_features.begin_frame(frame)
             t1 = time.time()
-            tracked_objects = self.tracker.update_tracks(detections, frame=frame)
+            if detections is None:
+                tracked_objects = predict_tracks(self.tracker)
+                self.timers['tracking_predict'] += time.time() - t1
+                self.predict_only_frames += 1
+            else:
+                # OPTIMIZATION: Re-ID embeddings come from the shared crop feature service;
+                # the detection index rides along so tracks can reuse that detection's features
+                embeds = self.crop_features.reid_embeddings(detections)
+                tracked_objects = self.tracker.update_tracks(
+                    detections, embeds=embeds, frame=frame, others=list(range(len(detections)))
+                )
             self.timers['tracking'] += time.time() - t1
             
+            # Camera movement is first needed for position_adjusted; only the wait is timed
+            if frame_idx > start_frame:
+                t1 = time.time()
+                movement, matrix = self.camera_worker.get(frame_idx)
+                self.camera_movement_per_frame.append(movement)
+                self.camera_matrices_per_frame.append(matrix)
+                self.timers['camera'] += time.time() - t1
+            camera_dx, camera_dy = self.camera_movement_per_frame[frame_idx]
+            
             # Data preparation and storage
             t1 = time.time()
             seen_track_ids = set()
-            for track in tracked_objects:
-                if not track.is_confirmed():
-                    continue
+            team_requests = []
+            confirmed_tracks = [track for track in tracked_objects if track.is_confirmed()]
+            
+            # OPTIMIZATION: Vectorized gated IoU assignment of detections (and their class) to tracks
+            track_boxes = np.array([track.to_ltrb() for track in confirmed_tracks]).reshape(-1, 4)
+            det_boxes = np.array([det['bbox'] for det in detection_data]).reshape(-1, 4)
+            det_matches = match_boxes(track_boxes, det_boxes, self.class_match_min_iou)
+            
+            for track, det_match in zip(confirmed_tracks, det_matches.tolist()):
                 seen_track_ids.add(track.track_id)
                 
-                # Match track to detection
-                track_bbox = track.to_ltrb()
-                track_center_x = (track_bbox[0] + track_bbox[2]) / 2
-                track_center_y = (track_bbox[1] + track_bbox[3]) / 2
-                
-                min_dist = float('inf')
-                best_cls = self.track_class_map.get(track.track_id, 2)
-                
-                for det in detection_data:
-                    det_bbox = det['bbox']
-                    det_center_x = (det_bbox[0] + det_bbox[2]) / 2
-                    det_center_y = (det_bbox[1] + det_bbox[3]) / 2
-                    dist = ((track_center_x - det_center_x)**2 + (track_center_y - det_center_y)**2)**0.5
-                    
-                    if dist < min_dist:
-                        min_dist = dist
-                        best_cls = det['cls']
-                
-                self.track_class_map[track.track_id] = best_cls
+                # Unmatched tracks keep their previous class
+                if det_match >= 0:
+                    self.track_class_map[track.track_id] = detection_data[det_match]['cls']
+                else:
+                    self.track_class_map.setdefault(track.track_id, 2)
                 
                 # Store track info
                 x1, y1, x2, y2 = map(int, track.to_ltrb())
                 bbox = [x1, y1, x2, y2]
+                # Features of a matched track come from its detection crop, shared with DeepSort
+                det_idx = track.get_det_supplementary()
+                feature_bbox = detection_data[det_idx]['bbox'] if det_idx is not None else bbox
                 foot_x, foot_y = self.get_foot_position(bbox)
                 
                 foot_x_adjusted = foot_x - camera_dx
@@ -435,13 +843,20 @@ class OptimizedTrackingProcessor:
                 else:
                     object_name = "players"
 
+                hist = self.crop_features.hist(feature_bbox)
                 stable_id = self.id_manager.assign(
                     track.track_id,
                     frame=frame,
                     bbox=bbox,
                     pos=(foot_x, foot_y),
                     frame_idx=frame_idx,
+                    hist=hist,
                 )
+                if hist is not None:
+                    if stable_id in self.id_appearance:
+                        self.id_appearance[stable_id] += hist
+                    else:
+                        self.id_appearance[stable_id] = hist.astype(np.float32)
 
                 existing_cls = self.stable_class_map.get(stable_id)
                 self.stable_class_map[stable_id] = self._prefer_class(existing_cls, cls)
@@ -460,24 +875,40 @@ class OptimizedTrackingProcessor:
                         track.track_id not in self.classified_tracks or 
                         frame_idx % self.team_classification_interval == 0
                     )
-                    
-                    t_team = time.time()
-                    if should_classify:
-                        self.team_classifier.add_sample(frame, bbox, stable_id)
-                        team_id = self.team_classifier.predict(frame, bbox, stable_id)
-                        self.classified_tracks.add(stable_id)
-                    else:
-                        # Reuse existing classification
-                        team_id = self.team_classifier.track_team.get(stable_id)
-                    
-                    if team_id is not None:
-                        self.tracks[object_name][frame_idx][stable_id]['team_id'] = team_id
-                    self.timers['team_class'] += time.time() - t_team
+                    team_requests.append((object_name, stable_id, feature_bbox, should_classify))
+            
+            # OPTIMIZATION: One batched embedding pass for every track classified this frame
+            t_team = time.time()
+            embeddings = iter(self.crop_features.team_embeddings(
+                [req[2] for req in team_requests if req[3]]
+            ))
+            for object_name, stable_id, feature_bbox, should_classify in team_requests:
+                if should_classify:
+                    embedding = next(embeddings)
+                    self.team_classifier.add_sample(frame, feature_bbox, stable_id, embedding=embedding)
+                    team_id = self.team_classifier.predict(frame, feature_bbox, stable_id, embedding=embedding)
+                    self.classified_tracks.add(stable_id)
+                else:
+                    # Reuse existing classification
+                    team_id = self.team_classifier.track_team.get(stable_id)
+                
+                if team_id is not None:
+                    self.tracks[object_name][frame_idx][stable_id]['team_id'] = team_id
+            self.timers['team_class'] += time.time() - t_team
             
             self.timers['data_prep'] += time.time() - t1
             self.id_manager.cleanup(seen_track_ids, frame_idx)
             
-            # Ball tracking (no optimization needed - minimal cost)
+            ball_measured = len(ball_detections) > 0
+            crop_searched = False
+            if self.ball_tracker is not None:
+                t_ball = time.time()
+                full_balls = fresh_detections[2] if fresh_detections is not None else []
+                ball_detections, ball_measured, crop_searched = self._track_ball(
+                    frame_idx, frame, full_balls, (camera_dx, camera_dy)
+                )
+                self.timers['ball'] += time.time() - t_ball
+            
             for ball in ball_detections:
                 self.tracks["ball"][frame_idx]["ball"] = {
                     'bbox': ball['bbox'],
@@ -485,9 +916,17 @@ class OptimizedTrackingProcessor:
                     'position_adjusted': self.get_foot_position(ball['bbox']),
                     'position_transformed': None
                 }
+                if ball.get('predicted'):
+                    self.tracks["ball"][frame_idx]["ball"]['predicted'] = True
             
             assign_ball_to_players(self.tracks, frame_idx, max_distance_pixels=70.0)
             
+            self.detection_scheduler.observe(
+                frame_idx, self.camera_movement_per_frame[frame_idx], tracked_objects,
+                detected=fresh_detections is not None, ball_detected=ball_measured,
+                crop_searched=crop_searched,
+            )
+            
             self.timers['total'] += time.time() - frame_start
             
             # Progress reporting with performance stats
@@ -497,19 +936,124 @@ class OptimizedTrackingProcessor:
                 
                 if self.profile_performance and self.timers['total'] > 0:
                     print("  Time breakdown:")
-                    for key in ['detection', 'tracking', 'team_class', 'camera', 'data_prep']:
+                    for key in ['detection', 'tracking', 'tracking_predict', 'team_class', 'camera', 'data_prep',
+                                'decode_stall', 'ball']:
                         val = self.timers[key]
                         pct = (val / self.timers['total'] * 100)
                         print(f"    {key}: {val:.2f}s ({pct:.1f}%)")
             
+            if checkpointer is not None and checkpointer.should_checkpoint(frame_idx):
+                self.camera_worker.wait_idle()
+                checkpointer.save(self, frame_idx)
+            
             frame_idx += 1
         
-        print(f"\n✅ Tracking complete for {frame_idx} frames")
-        print(f"⚡ Average processing speed: {frame_idx / self.timers['total']:.1f} FPS")
+        prefetcher.stop()
+        self.camera_worker.stop()
+        self._save_detection_cache()
+        if checkpointer is not None and frame_idx > checkpointer.logged_until:
+            # Final checkpoint: resuming a finished run returns immediately
+            checkpointer.save(self, frame_idx - 1)
+        frames_done = frame_idx - start_frame
+        print(f"\n✅ Tracking complete for {frames_done} frames")
+        print(f"⚡ Average processing speed: {frames_done / max(self.timers['total'], 1e-6):.1f} FPS")
+        print(f"⏳ Decode stall: {self.timers['decode_stall']:.2f}s"
+              f" ({prefetcher.dropped_frames} frames dropped by prefetcher)")
+        self._report_predict_only(frames_done)
+        scheduler = self.detection_scheduler
+        detector_calls = scheduler.detection_frames + scheduler.crop_frames
+        print(f"🎯 Detection scheduled on {scheduler.detection_frames} frames"
+              f" + {scheduler.crop_frames} ball crop searches = {detector_calls} detector calls"
+              f" ({detector_calls / max(frames_done, 1) * 100:.1f}% of frames, cached ones included),"
+              f" {len(scheduler.trace)} interval changes")
+        if self.detection_trace_path:
+            scheduler.save_trace(self.detection_trace_path)
+            print(f"📝 Detection schedule trace saved to {self.detection_trace_path}")
+        if self.non_tactical_ranges:
+            skipped = sum(end - start for start, end in self.non_tactical_ranges)
+            print(f"🎞️ Non-tactical footage skipped: {skipped} frames in {len(self.non_tactical_ranges)} ranges"
+                  f" ({skipped / max(frames_done, 1) * 100:.1f}%)")
+        self._report_detector()
+        self._report_ball()
+        stats = self.crop_features.stats
+        print(f"🧩 Crop features computed: {stats['reid']} re-ID, {stats['hist']} histograms,"
+              f" {stats['team']} team embeddings ({stats['reused']} reused)")
         self.cap.release()
     
+    def _process_non_tactical_frame(self, frame_idx, frame, start_frame):
+        """Replay / close-up frame: no detection, camera, team or ball work is done"""
+        frame_start = time.time()
+        add_frame_to_ranges(self.non_tactical_ranges, frame_idx)
+        if frame_idx > start_frame:
+            self.camera_movement_per_frame.append([0, 0])
+            self.camera_matrices_per_frame.append(UNKNOWN_MOTION)
+        
+        # Empty update so tracks age out across long replays instead of freezing
+        t1 = time.time()
+        self.tracker.update_tracks([], frame=frame)
+        self.timers['tracking'] += time.time() - t1
+        self.id_manager.cleanup(set(), frame_idx)
+        if self.ball_tracker is not None:
+            self.ball_tracker.reset()
+        self.timers['total'] += time.time() - frame_start
+    
+    def _report_detector(self):
+        """Detector throughput and how much the pitch mask took off the tracker"""
+        stats = self.roi_stats
+        if stats['detector_frames']:
+            print(f"🔍 Detector: {stats['detector_frames']} frames in {self.timers['detection']:.2f}s"
+                  f" ({stats['detector_frames'] / max(self.timers['detection'], 1e-6):.1f} FPS)")
+        if self.pitch_masker is None:
+            return
+        if stats['roi_frames']:
+            print(f"🟩 Pitch ROI crop on {stats['roi_frames']}/{stats['detector_frames']} detector frames"
+                  f" (x{stats['resolution_gain'] / stats['roi_frames']:.2f} effective resolution)")
+        print(f"🟩 Off-pitch filter: {stats['off_pitch']}/{stats['person_detections']} person detections"
+              f" dropped ({stats['off_pitch'] / max(stats['person_detections'], 1) * 100:.1f}% less tracker input,"
+              f" {self.pitch_masker.refreshes} mask refreshes)")
+
+    def _report_ball(self):
+        """Ball coverage and what the crop search cost"""
+        stats = self.ball_stats
+        if self.ball_tracker is None or stats['frames'] == 0:
+            return
+        found = stats['full'] + stats['crop']
+        crop_pixels = min(self.ball_crop_size[0], self.width) * min(self.ball_crop_size[1], self.height)
+        print(f"⚽ Ball found on {found}/{stats['frames']} frames ({found / stats['frames'] * 100:.1f}%):"
+              f" {stats['full']} full-frame, {stats['crop']} from {stats['crop_calls']} crop searches"
+              f" ({stats['crop_cached']} more replayed from cache), {stats['predicted']} predicted"
+              f" in {self.timers['ball']:.2f}s"
+              f" (crop is 1/{self.width * self.height / crop_pixels:.1f} of a full-resolution frame)")
+
+    def _report_predict_only(self, frames_done):
+        """Estimate the tracking time saved by predict-only skip frames"""
+        skipped = self.predict_only_frames
+        update_frames = frames_done - skipped
+        if skipped == 0 or update_frames <= 0:
+            return
+        predict_time = self.timers['tracking_predict']
+        update_time = self.timers['tracking'] - predict_time
+        # Re-running update_tracks on stale boxes costs about as much as a detection frame
+        saved = max(0.0, skipped * update_time / update_frames - predict_time)
+        legacy_time = self.timers['tracking'] + saved
+        print(f"🔮 Predict-only tracking on {skipped} skip frames: {predict_time:.2f}s"
+              f" (~{saved:.2f}s, {saved / max(legacy_time, 1e-6) * 100:.0f}% of the tracking timer saved)")
+
+    def stitch_fragmented_ids(self):
+        """Merge stable IDs that the online tracker split, using the offline tracklet stitcher"""
+        stitcher = TrackletStitcher(fps=self.fps)
+        self.tracklet_id_map, stats = stitcher.stitch(
+            self.tracks, self.stable_class_map, self.id_appearance, self._prefer_class
+        )
+        print(f"🧵 Tracklet stitching: {stats['ids_before']} -> {stats['ids_after']} IDs"
+              f" (fragment reduction {stats['fragment_reduction'] * 100:.1f}%)")
+
     def post_process(self):
         """Apply transformations and calculate physics"""
+        if self.stitch_tracklets:
+            print("\n🧵 Stitching fragmented tracklets...")
+            self.stitch_fragmented_ids()
+
         print("\n📐 Applying Perspective Transform...")
         self.view_transformer.add_transformed_position_to_tracks(self.tracks)
         
@@ -527,9 +1071,11 @@ class OptimizedTrackingProcessor:
             'track_class_map': self.track_class_map,
             'stable_class_map': self.stable_class_map,
             'camera_movement': self.camera_movement_per_frame,
+            'camera_matrices': np.array(self.camera_matrices_per_frame, dtype=np.float32).reshape(-1, 3, 3),
             'fps': self.fps,
             'width': self.width,
             'height': self.height,
             'total_frames': self.total_frames,
+            'non_tactical_ranges': self.non_tactical_ranges,
             'performance': self.timers
         }
@@ -0,0 +1,226 @@
+"""
+Offline tracklet stitching
+Merges stable IDs that belong to the same person after tracking has finished.
+Every stable ID is treated as a tracklet; tracklet ends are linked to later
+tracklet starts by solving one global min-cost assignment (the bipartite form of
+min-cost flow over tracklets, where each tracklet has at most one predecessor and
+one successor). Candidate links are gated by time gap, motion, team and class,
+and scored by appearance and kinematic agreement.
+"""
+
+import bisect
+from collections import Counter
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+
+PERSON_GROUPS = ("players", "goalkeepers", "referees")
+
+
+class TrackletStitcher:
+    def __init__(
+        self,
+        fps: int,
+        max_gap_seconds: float = 8.0,
+        base_gate_px: float = 60.0,
+        max_speed_px_per_frame: float = 12.0,
+        min_appearance_sim: float = 0.5,
+        no_link_cost: float = 0.5,
+        appearance_weight: float = 1.0,
+        motion_weight: float = 0.5,
+        gap_weight: float = 0.2,
+        velocity_window: int = 5,
+    ):
+        self.fps = max(1, int(fps))
+        self.max_gap_frames = max(1, int(max_gap_seconds * self.fps))
+        self.base_gate_px = base_gate_px
+        self.max_speed_px_per_frame = max_speed_px_per_frame
+        self.min_appearance_sim = min_appearance_sim
+        # A link i->j is taken only if its cost is below 2 * no_link_cost
+        self.no_link_cost = no_link_cost
+        self.appearance_weight = appearance_weight
+        self.motion_weight = motion_weight
+        self.gap_weight = gap_weight
+        self.velocity_window = velocity_window
+
+    @staticmethod
+    def _position(info):
+        pos = info.get("position_adjusted") or info.get("position")
+        return None if pos is None else (float(pos[0]), float(pos[1]))
+
+    def build_tracklets(self, tracks):
+        """Summaries per stable ID: frame span, boundary positions/velocities, team, class group."""
+        samples = {}
+        for group in PERSON_GROUPS:
+            for frame_idx, frame_data in tracks.get(group, {}).items():
+                for sid, info in frame_data.items():
+                    pos = self._position(info)
+                    if pos is not None:
+                        samples.setdefault(sid, []).append((frame_idx, pos, info.get("team_id"), group))
+
+        tracklets = {}
+        k = self.velocity_window
+        for sid, rows in samples.items():
+            rows.sort(key=lambda r: r[0])
+            frames = np.array([r[0] for r in rows], dtype=np.int64)
+            pos = np.array([r[1] for r in rows], dtype=np.float64)
+            head, tail = slice(0, min(k, len(rows))), slice(max(0, len(rows) - k), len(rows))
+            teams = Counter(r[2] for r in rows if r[2] is not None)
+            tracklets[sid] = {
+                "start": int(frames[0]),
+                "end": int(frames[-1]),
+                "start_pos": pos[0],
+                "end_pos": pos[-1],
+                "start_vel": self._velocity(frames[head], pos[head]),
+                "end_vel": self._velocity(frames[tail], pos[tail]),
+                "team": teams.most_common(1)[0][0] if teams else None,
+                "referee": Counter(r[3] for r in rows).most_common(1)[0][0] == "referees",
+                "frames": len(rows),
+            }
+        return tracklets
+
+    @staticmethod
+    def _velocity(frames, pos):
+        if len(frames) < 2 or frames[-1] == frames[0]:
+            return np.zeros(2)
+        return (pos[-1] - pos[0]) / float(frames[-1] - frames[0])
+
+    def _candidate_links(self, ids, tracklets, appearance):
+        """Yield (i, j, cost) for every gated link end_i -> start_j."""
+        order = sorted(range(len(ids)), key=lambda n: tracklets[ids[n]]["start"])
+        starts = [tracklets[ids[n]]["start"] for n in order]
+        start_pos = np.array([tracklets[ids[n]]["start_pos"] for n in order]).reshape(-1, 2)
+        start_vel = np.array([tracklets[ids[n]]["start_vel"] for n in order]).reshape(-1, 2)
+        teams = [tracklets[ids[n]]["team"] for n in order]
+        referee = np.array([tracklets[ids[n]]["referee"] for n in order], dtype=bool)
+
+        feats = None
+        if appearance:
+            dim = len(next(iter(appearance.values())))
+            feats = np.zeros((len(order), dim), dtype=np.float32)
+            has_feat = np.zeros(len(order), dtype=bool)
+            for row, n in enumerate(order):
+                vec = appearance.get(ids[n])
+                if vec is not None:
+                    norm = np.linalg.norm(vec)
+                    if norm > 0:
+                        feats[row] = vec / norm
+                        has_feat[row] = True
+
+        for i, sid in enumerate(ids):
+            t = tracklets[sid]
+            lo = bisect.bisect_right(starts, t["end"])
+            hi = bisect.bisect_right(starts, t["end"] + self.max_gap_frames)
+            if lo >= hi:
+                continue
+            cand = np.arange(lo, hi)
+            gap = np.array(starts[lo:hi], dtype=np.float64) - t["end"]
+
+            # Kinematic gate: extrapolate the end (up to one second) and the start backwards
+            horizon = np.minimum(gap, self.fps)[:, None]
+            predicted = t["end_pos"] + t["end_vel"] * horizon
+            back = start_pos[cand] - start_vel[cand] * horizon
+            dist = np.minimum(np.linalg.norm(start_pos[cand] - predicted, axis=1),
+                              np.linalg.norm(back - t["end_pos"], axis=1))
+            allowed = self.base_gate_px + self.max_speed_px_per_frame * gap
+            motion = dist / allowed
+            ok = motion <= 1.0
+
+            # Team and class compatibility
+            ok &= referee[cand] == t["referee"]
+            if t["team"] is not None:
+                ok &= np.array([teams[c] is None or teams[c] == t["team"] for c in cand.tolist()], dtype=bool)
+
+            app_cost = np.full(len(cand), 0.5)
+            own = appearance.get(sid) if appearance else None
+            if feats is not None and own is not None and np.linalg.norm(own) > 0:
+                sim = feats[cand] @ (own / np.linalg.norm(own))
+                known = has_feat[cand]
+                ok &= ~known | (sim >= self.min_appearance_sim)
+                app_cost = np.where(known, 1.0 - sim, app_cost)
+
+            cost = (self.appearance_weight * app_cost + self.motion_weight * motion
+                    + self.gap_weight * gap / self.max_gap_frames)
+            ok &= cost < 2 * self.no_link_cost
+            for c, link_cost in zip(cand[ok].tolist(), cost[ok].tolist()):
+                yield i, order[c], link_cost
+
+    def solve(self, tracklets, appearance=None):
+        """Return {stable_id: merged_id} for every tracklet."""
+        ids = sorted(tracklets)
+        n = len(ids)
+        if n == 0:
+            return {}
+        links = list(self._candidate_links(ids, tracklets, appearance))
+
+        # Rows: tracklet ends (0..n-1) and start dummies x_j (n..2n-1).
+        # Cols: tracklet starts (0..n-1) and end dummies y_i (n..2n-1).
+        # end_i->start_j links; end_i->y_i / x_j->start_j are the "no link" options;
+        # x_j->y_i closes a chosen link so the matching stays perfect.
+        # All weights are offset by +1 (same total shift for every perfect matching)
+        # because zero-weight entries would be dropped from the sparse graph.
+        rows, cols, weights = [], [], []
+        for i, j, cost in links:
+            rows += [i, n + j]
+            cols += [j, n + i]
+            weights += [1.0 + cost, 1.0]
+        arange = list(range(n))
+        rows += arange + [n + j for j in arange]
+        cols += [n + i for i in arange] + arange
+        weights += [1.0 + self.no_link_cost] * (2 * n)
+        graph = csr_matrix((weights, (rows, cols)), shape=(2 * n, 2 * n))
+        row_ind, col_ind = min_weight_full_bipartite_matching(graph)
+
+        successor = {}
+        for r, c in zip(row_ind.tolist(), col_ind.tolist()):
+            if r < n and c < n:
+                successor[r] = c
+        has_pred = set(successor.values())
+
+        merged = {}
+        for head in range(n):
+            if head in has_pred:
+                continue
+            node = head
+            while node is not None:
+                merged[ids[node]] = ids[head]
+                node = successor.get(node)
+        return merged
+
+    def stitch(self, tracks, stable_class_map, appearance=None, prefer_class=None):
+        """
+        Merge fragmented stable IDs in place in `tracks` and `stable_class_map`.
+        Returns ({old_id: new_id}, stats).
+        """
+        tracklets = self.build_tracklets(tracks)
+        merged = self.solve(tracklets, appearance)
+        remap = {sid: new for sid, new in merged.items() if sid != new}
+
+        if remap:
+            for group in PERSON_GROUPS:
+                for frame_idx, frame_data in tracks.get(group, {}).items():
+                    if any(sid in remap for sid in frame_data):
+                        tracks[group][frame_idx] = {remap.get(sid, sid): info for sid, info in frame_data.items()}
+            # Ball possession refers to the same IDs
+            for frame_data in tracks.get("ball", {}).values():
+                for ball_info in frame_data.values():
+                    if ball_info.get("assigned_track_id") in remap:
+                        ball_info["assigned_track_id"] = remap[ball_info["assigned_track_id"]]
+            for sid, new in remap.items():
+                if sid not in stable_class_map:
+                    continue
+                cls = stable_class_map.pop(sid)
+                existing = stable_class_map.get(new)
+                stable_class_map[new] = prefer_class(existing, cls) if prefer_class else (
+                    existing if existing is not None else cls)
+
+        before = len(tracklets)
+        after = len(set(merged.values()))
+        stats = {
+            "ids_before": before,
+            "ids_after": after,
+            "fragment_reduction": 1.0 - after / before if before else 0.0,
+        }
+        return remap, stats
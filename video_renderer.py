@@ -3,6 +3,7 @@ import numpy as np
 import os
 import subprocess
 from Tracking import draw_ellipse, CLASS_COLORS
+from shot_classifier import in_ranges
 
 class VideoRenderer:
     """Handles video rendering with overlays and annotations"""
@@ -77,8 +78,8 @@ class VideoRenderer:
     
     def render_video(self, tracks, track_class_map, camera_movement_per_frame, 
                      fps, width, height, total_frames, 
-                     cohesion_analyzer=None, cohesion_timeline=None):
-        """Render video with all overlays"""
+                     cohesion_analyzer=None, cohesion_timeline=None, non_tactical_ranges=None):
+        """Render video with all overlays; non_tactical_ranges frames are written without them"""
         print("\n🎨 Rendering video with overlays...")
         
         self.fps = fps
@@ -119,6 +120,12 @@ class VideoRenderer:
             
             frame = frame.copy()
             
+            # Replays / close-ups carry no tracking data: pass the frame through
+            if non_tactical_ranges and in_ranges(frame_idx, non_tactical_ranges):
+                self.out.write(frame)
+                frame_idx += 1
+                continue
+            
             # Draw tracked players
             for object_name in ["goalkeepers", "players", "referees"]:
                 if object_name in tracks and frame_idx in tracks[object_name]:
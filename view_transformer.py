@@ -1,21 +1,45 @@
 import cv2
 import numpy as np
 
+
+def points_in_polygon(points, polygon):
+    """
+    Vectorized cv2.pointPolygonTest(polygon, point, False) >= 0 for (N, 2) points:
+    even-odd ray casting, with points on an edge counted as inside
+    """
+    px, py = points[:, 0], points[:, 1]
+    inside = np.zeros(len(points), dtype=bool)
+    on_edge = np.zeros(len(points), dtype=bool)
+    polygon = np.asarray(polygon, dtype=np.float64)
+    for (ax, ay), (bx, by) in zip(polygon, np.roll(polygon, -1, axis=0)):
+        crosses = (ay > py) != (by > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = ax + (py - ay) * (bx - ax) / (by - ay)
+        inside ^= crosses & (px < x_cross)
+        cross = (bx - ax) * (py - ay) - (by - ay) * (px - ax)
+        on_edge |= (cross == 0) & (px >= min(ax, bx)) & (px <= max(ax, bx)) & \
+                   (py >= min(ay, by)) & (py <= max(ay, by))
+    return inside | on_edge
+
+
 class ViewTransformer:
-    def __init__(self, target_width=105, target_height=68):
+    def __init__(self, target_width=105, target_height=68, pixel_vertices=None):
         # 1. Target World Dimensions (Meters)
         self.target_width = target_width
         self.target_height = target_height
         
-        # 2. Source Points from Video (YOU MUST CHANGE THESE TO MATCH YOUR VIDEO)
+        # 2. Source Points from Video (pass pixel_vertices, e.g. from the calibration store,
+        # or CHANGE THESE DEFAULTS TO MATCH YOUR VIDEO)
         # Order: Bottom-Left, Bottom-Right, Top-Right, Top-Left
         # Use a tool like https://www.image-map.net/ to find these pixel x,y values on a screenshot
-        self.pixel_vertices = np.array([
-            [120, 950],   # Bottom-Left
-            [1800, 950],  # Bottom-Right
-            [1400, 150],  # Top-Right
-            [520, 150]    # Top-Left
-        ], dtype=np.float32)
+        if pixel_vertices is None:
+            pixel_vertices = [
+                [120, 950],   # Bottom-Left
+                [1800, 950],  # Bottom-Right
+                [1400, 150],  # Top-Right
+                [520, 150]    # Top-Left
+            ]
+        self.pixel_vertices = np.array(pixel_vertices, dtype=np.float32).reshape(4, 2)
         # 3. Target Points (Top-Down Map in Meters)
         self.target_vertices = np.array([
             [0, target_height],           # Bottom-Left (0, 68)
@@ -41,8 +65,24 @@ class ViewTransformer:
         transformed_point = cv2.perspectiveTransform(reshaped_point, self.perspective_transformer)
         return transformed_point[0][0]
 
+    def transform_points(self, points):
+        """
+        Convert (N, 2) pixel points to meters in one batch.
+        Returns (meters (N, 2) float32, inside (N,) bool); rows outside the pitch are NaN.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        # Same integer pixel as the single-point polygon test
+        inside = points_in_polygon(np.trunc(points), self.pixel_vertices)
+        meters = np.full(points.shape, np.nan, dtype=np.float32)
+        if inside.any():
+            meters[inside] = cv2.perspectiveTransform(
+                points[inside].astype(np.float32)[None], self.perspective_transformer
+            )[0]
+        return meters, inside
+
     def add_transformed_position_to_tracks(self, tracks):
-        """Iterate over all tracks and add 'position_transformed' (Meters)"""
+        """Add 'position_transformed' (Meters) to all tracks, transforming every foot point of the match at once"""
+        track_infos, foot_positions = [], []
         for object_name, object_tracks in tracks.items():
             # ERROR WAS HERE: Changed 'enumerate(object_tracks)' to 'object_tracks.items()'
             for frame_num, frame_tracks in object_tracks.items():
@@ -54,10 +94,13 @@ class ViewTransformer:
 
                     bbox = track_info['bbox']
                     # Use the bottom center of the bbox (the feet)
-                    foot_position = (bbox[0] + bbox[2]) / 2, bbox[3]
-                    
-                    # Transform
-                    position_meters = self.transform_point(foot_position)
-                    
-                    if position_meters is not None:
-                        tracks[object_name][frame_num][track_id]['position_transformed'] = position_meters.tolist()
\ No newline at end of file
+                    track_infos.append(track_info)
+                    foot_positions.append(((bbox[0] + bbox[2]) / 2, bbox[3]))
+
+        if not track_infos:
+            return
+        # Transform
+        positions_meters, inside = self.transform_points(foot_positions)
+        for track_info, position_meters, is_inside in zip(track_infos, positions_meters.tolist(), inside.tolist()):
+            if is_inside:
+                track_info['position_transformed'] = position_meters
\ No newline at end of file